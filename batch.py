@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing main also loads .env
+import main as reel
+from handlers.tiktok_status_watcher import PublishStatusWatcher
+from processors import metrics
+
+# Batch / daemon entry point: produce many reels from one process, so Python,
+# torch, BART and whisper are loaded once instead of once per reel.
+#
+#   python batch.py jobs.json                  # run a list of jobs, then exit
+#   python batch.py --watch jobs/              # daemon: pick up jobs/*.json as they appear
+#
+# A job is a JSON object overriding main.DEFAULT_REEL_JOB, e.g.
+#   {"name": "ai", "query": "artificial intelligence", "background_video": "bg2.mp4", "publish": false}
+#   {"name": "mix", "queries": [{"category": "technology"}, {"category": "science"}]}
+# NewsAPI listings are cached and budgeted across jobs (see handlers/news_api_client.py).
+# A job file may hold a single job or a list of them.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+WATCH_INTERVAL = float(os.getenv("BATCH_WATCH_INTERVAL", "10"))
+
+def _job_defaults(job, index):
+    # Each job renders into its own directory so intermediate files never collide
+    name = job.get("name") or f"job_{index}"
+    return {"name": name, "workdir": os.path.join("reels", name), **job}
+
+def load_jobs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    if isinstance(jobs, dict):
+        jobs = [jobs]
+    return jobs
+
+class ReelBatchRunner:
+    def __init__(self, render_workers=None):
+        self.summarizer = reel.load_models()
+        self.article_cache = reel.open_article_cache()
+        # Shared, so jobs in the same batch don't pick the same story either
+        self.story_index = reel.open_story_index()
+        # Renews the TikTok token in the background so uploads never wait on auth
+        self.token_store = reel.open_token_store().start_refresher()
+        # Asset building (model stages) runs on the caller's thread, one job at a time,
+        # while ffmpeg renders and uploads of earlier jobs proceed on this pool
+        self.render_pool = ThreadPoolExecutor(max_workers=render_workers or RENDER_WORKERS)
+        # Publish status is polled in the background so a render worker is free
+        # again as soon as its upload is published
+        self.status_watcher = PublishStatusWatcher().start()
+        self.jobs_started = 0
+
+    def submit(self, job):
+        job = _job_defaults(job, self.jobs_started)
+        self.jobs_started += 1
+        started = time.perf_counter()
+        print(f"[{job['name']}] Building assets")
+        assets = reel.build_reel_assets(job, self.summarizer, self.article_cache, self.token_store, self.story_index)
+        print(f"[{job['name']}] Assets ready in {time.perf_counter() - started:.1f}s, queued for render")
+        return self.render_pool.submit(reel.render_and_publish_reel, assets, self.status_watcher)
+
+    def run(self, jobs):
+        futures = []
+        for job in jobs:
+            try:
+                futures.append((job, self.submit(job)))
+            except Exception as e:
+                print(f"[{job.get('name')}] Building assets failed: {e}")
+                futures.append((job, None))
+
+        results = []
+        for job, future in futures:
+            try:
+                results.append(future.result() if future else None)
+            except Exception as e:
+                print(f"[{job.get('name')}] Render failed: {e}")
+                results.append(None)
+        return results
+
+    def watch(self, directory, interval=None):
+
+        # Poll a directory for job files; move each to done/ or failed/ once handled
+        interval = interval or WATCH_INTERVAL
+        for sub in ("done", "failed"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+        in_flight = {}
+        while True:
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if not name.endswith(".json") or path in in_flight:
+                    continue
+                try:
+                    in_flight[path] = [self.submit(job) for job in load_jobs(path)]
+                except Exception as e:
+                    print(f"Job file {name} failed: {e}")
+                    shutil.move(path, os.path.join(directory, "failed", name))
+
+            for path, futures in list(in_flight.items()):
+                if not all(future.done() for future in futures):
+                    continue
+                failed = any(future.exception() for future in futures)
+                shutil.move(path, os.path.join(directory, "failed" if failed else "done", os.path.basename(path)))
+                del in_flight[path]
+                # Flush per job file so a long-running daemon doesn't hold every span
+                metrics.get_recorder().export()
+
+            time.sleep(interval)
+
+    def close(self):
+        self.render_pool.shutdown(wait=True)
+        for status in self.status_watcher.wait_all():
+            print(f"Publish {status['publish_id']}: {status['status']} after {status['polls']} polls {status['metrics']}")
+        self.status_watcher.close()
+        self.token_store.close()
+        metrics.get_recorder().report()
+        metrics.get_recorder().export()
+        if self.article_cache is not None:
+            print(f"Article cache today: {self.article_cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render many reels with resident models")
+    parser.add_argument("jobs", nargs="?", help="JSON file with a job or a list of jobs")
+    parser.add_argument("--watch", metavar="DIR", help="Run as a daemon, picking up job files from DIR")
+    parser.add_argument("--render-workers", type=int, default=None, help="Concurrent ffmpeg renders")
+    args = parser.parse_args()
+    if not args.jobs and not args.watch:
+        parser.error("give a jobs file or --watch DIR")
+
+    runner = ReelBatchRunner(args.render_workers)
+    try:
+        if args.watch:
+            runner.watch(args.watch)
+        else:
+            runner.run(load_jobs(args.jobs))
+    finally:
+        runner.close()
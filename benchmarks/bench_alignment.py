@@ -0,0 +1,110 @@
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from difflib import SequenceMatcher
+
+from handlers import elevenlabs_api_handler
+from processors import audio_data_processor as audio_proc
+from processors import subtitle_aligner
+
+# Compares subtitle timing paths on voiceovers whose script is known:
+#   asr           - full whisper transcription (the old path)
+#   whisper-align - forced alignment of the script with whisper
+#   elevenlabs    - ElevenLabs character timings, when the clip has them
+# Accuracy is the mean absolute start/end error per matched word against a
+# reference: ElevenLabs timings when present, otherwise the ASR output.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_alignment                 # every timestamped clip in the TTS cache
+#   python -m benchmarks.bench_alignment --manifest m.json
+# A manifest is a JSON list of {"audio": path, "script": text, "alignment": optional path}.
+
+def _flatten(segments):
+    return [word for segment in segments for word in segment["words"]]
+
+def _timing_error(words, reference):
+    # Match words by normalized text, then compare their timings
+    norm = lambda ws: [w["word"].strip().lower().strip(".,!?;:\"'") for w in ws]
+    matcher = SequenceMatcher(None, norm(words), norm(reference), autojunk=False)
+    errors = []
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            word, ref = words[block.a + k], reference[block.b + k]
+            errors.append(abs(word["start"] - ref["start"]))
+            errors.append(abs(word["end"] - ref["end"]))
+    if not errors:
+        return None
+    return round(statistics.mean(errors), 3)
+
+def _cached_clips():
+    # Clips synthesized with timestamps carry their script in the alignment characters
+    for alignment_path in sorted(glob.glob(os.path.join(elevenlabs_api_handler.TTS_CACHE_DIR, "*.alignment.json"))):
+        audio = alignment_path[:-len(".alignment.json")] + ".mp3"
+        if not os.path.exists(audio):
+            continue
+        with open(alignment_path, "r", encoding="utf-8") as f:
+            alignment = json.load(f)
+        yield {"audio": audio, "script": "".join(alignment["characters"]), "alignment": alignment}
+
+def _manifest_clips(path):
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    for entry in entries:
+        alignment = None
+        if entry.get("alignment"):
+            with open(entry["alignment"], "r", encoding="utf-8") as f:
+                alignment = json.load(f)
+        yield {"audio": entry["audio"], "script": entry["script"], "alignment": alignment}
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+def bench_clip(clip):
+    duration = audio_proc.get_audio_length(clip["audio"])
+    results = {}
+
+    segments, seconds = _timed(lambda: audio_proc.transcribe_words(clip["audio"], use_cache=False))
+    results["asr"] = {"words": _flatten(segments), "seconds": seconds, "confidence": None}
+
+    (words, confidence), seconds = _timed(
+        lambda: subtitle_aligner.words_from_whisper_alignment(clip["audio"], clip["script"])
+    )
+    results["whisper-align"] = {"words": words, "seconds": seconds, "confidence": confidence}
+
+    if clip["alignment"]:
+        (words, confidence), seconds = _timed(
+            lambda: subtitle_aligner.words_from_elevenlabs(clip["alignment"], clip["script"])
+        )
+        results["elevenlabs"] = {"words": words, "seconds": seconds, "confidence": confidence}
+
+    reference = results.get("elevenlabs", results["asr"])["words"]
+    report = {"audio": clip["audio"], "duration": round(duration, 2)}
+    for name, result in results.items():
+        report[name] = {
+            "seconds": round(result["seconds"], 3),
+            "realtime_factor": round(duration / result["seconds"], 1) if result["seconds"] else None,
+            "words": len(result["words"]),
+            "confidence": None if result["confidence"] is None else round(result["confidence"], 3),
+            "mean_abs_error_s": _timing_error(result["words"], reference) if result["words"] else None,
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark subtitle alignment against whisper ASR")
+    parser.add_argument("--manifest", help="JSON list of clips; defaults to timestamped clips in the TTS cache")
+    args = parser.parse_args()
+
+    # Load the model before timing anything
+    audio_proc.warm_whisper_models()
+
+    clips = _manifest_clips(args.manifest) if args.manifest else _cached_clips()
+    for clip in clips:
+        print(json.dumps(bench_clip(clip)))
+
+if __name__ == "__main__":
+    main()
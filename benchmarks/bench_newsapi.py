@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fixture_server import FixtureServer
+
+# The NewsAPI client (handlers/news_api_client.py) against the local fixture
+# server, which answers NewsAPI only when the key comes in the X-Api-Key header:
+#   cold     every query once, one at a time and then concurrently on the pooled session
+#   warm     the same queries again inside the freshness window (no requests expected)
+#   budget   more queries than the token bucket holds (requests stop at its capacity,
+#            the rest fall back to cached listings)
+# Exits 1 if the warm run or the budget made unexpected requests.
+#
+#   python -m benchmarks.bench_newsapi
+#   python -m benchmarks.bench_newsapi --delay 0.5 --burst 2
+QUERIES = [{"category": "technology"}, {"category": "science"}, {"category": "business"}, {"query": "open source"}]
+
+def _search(server, client, queries, workers):
+    from handlers.news_api_client import news_queries
+    requests_before = server.newsapi_requests
+    started = time.perf_counter()
+    articles = client.search(news_queries(queries=queries), workers=workers)
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "requests": server.newsapi_requests - requests_before,
+        "articles": len(articles),
+        "counts": dict(client.counts),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="NewsAPI client: concurrency, response cache and request budget")
+    parser.add_argument("--delay", type=float, default=0.25, help="Seconds the fixture server takes per NewsAPI response")
+    parser.add_argument("--burst", type=int, default=2, help="Token bucket capacity for the budget check")
+    args = parser.parse_args()
+
+    media_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fixture_media")
+    server = FixtureServer(media_dir).start()
+    os.environ.update(server.environment())
+    server.set_newsapi_delay(args.delay)
+    from handlers.news_api_client import NewsApiClient
+
+    failures = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = {}
+            for name, workers in (("cold_sequential", 1), ("cold_concurrent", len(QUERIES))):
+                client = NewsApiClient("fixture-key", path=os.path.join(directory, f"{name}.sqlite3"))
+                results[name] = _search(server, client, QUERIES, workers)
+                if name == "cold_concurrent":
+                    results["warm"] = _search(server, client, QUERIES, workers)
+                client.close()
+            results["cold_concurrent"]["speedup"] = round(
+                results["cold_sequential"]["seconds"] / results["cold_concurrent"]["seconds"], 2
+            )
+            if results["warm"]["requests"]:
+                failures.append(f"warm run made {results['warm']['requests']} requests")
+            if not results["cold_concurrent"]["articles"]:
+                failures.append("no articles; was the key sent in X-Api-Key?")
+
+            # Budget: a bucket of `burst` tokens with no time to refill. The first search
+            # spends it; the second (freshness 0, so nothing is fresh) is all throttled and
+            # served from the listings the first one cached.
+            client = NewsApiClient(
+                "fixture-key", path=os.path.join(directory, "budget.sqlite3"),
+                freshness=0, daily_quota=args.burst, burst=args.burst
+            )
+            results["budget_first"] = _search(server, client, QUERIES, len(QUERIES))
+            results["budget_second"] = _search(server, client, QUERIES, len(QUERIES))
+            client.close()
+            spent = results["budget_first"]["requests"] + results["budget_second"]["requests"]
+            if spent != min(args.burst, len(QUERIES)):
+                failures.append(f"budget of {args.burst} allowed {spent} requests")
+
+            for name, result in results.items():
+                print(json.dumps({"run": name, **result}))
+    finally:
+        server.stop()
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
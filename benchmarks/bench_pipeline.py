@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixture_server import FixtureServer
+
+# End-to-end benchmark of the reel pipeline against recorded fixtures served by
+# a local stand-in for NewsAPI, the publisher sites, ElevenLabs and TikTok, so
+# runs are offline, repeatable and cost nothing. Each stage runs the same
+# functions the pipeline uses on the same inputs every time:
+#
+#   fetch       news_api_handler.fetch_tech_news
+#   images      image_handler.download_image
+#   summarize   news_data_processor.summarize_article        (needs transformers)
+#   voice       elevenlabs_api_handler.generate_voiceover
+#   transcribe  audio_data_processor.transcribe_with_whisper (needs whisper)
+#   render      video_renderer.render_reel (what main.create_video_with_ffmpeg runs)
+#   publish     tiktok_api_handler.post_video_to_tiktok
+#
+# Stages whose model libraries are missing are reported as skipped and later
+# stages get fixed stand-in inputs instead. Caches are emptied before every
+# repeat so each one measures a cold run; model loading is not timed.
+#
+#   python -m benchmarks.bench_pipeline --repeat 3 --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.bench_pipeline --repeat 3 --baseline benchmarks/baseline.json
+STAGES = ["fetch", "images", "summarize", "voice", "transcribe", "render", "publish"]
+DEFAULT_TOLERANCE = 0.2
+
+def _configure_environment(server, cache_dir):
+    # Module-level settings are read at import, so this runs before any pipeline import
+    os.environ.update(server.environment())
+    os.environ.update({
+        "CACHE_DIR": cache_dir,
+        "TTS_WITH_TIMESTAMPS": "0",
+        "TIKTOK_STATUS_INITIAL_DELAY": "0.05",
+        "METRICS_FORMAT": "off",
+    })
+
+class PipelineBench:
+    def __init__(self, server, workdir, profile="fast", summary_model=None, summary_backend=None):
+        self.server = server
+        self.workdir = workdir
+        self.profile = profile
+        self.summary_model = summary_model
+        self.summary_backend = summary_backend
+        self.summarizer = None
+        self.skipped = {}
+
+    def setup(self):
+        # Load models once, outside the timed region; a missing library skips its stage
+        try:
+            from processors import news_data_processor
+            self.summarizer = news_data_processor.load_summarizer(self.summary_backend, self.summary_model)
+        except Exception as e:
+            self.skipped["summarize"] = f"{type(e).__name__}: {e}"
+        try:
+            from processors import audio_data_processor
+            audio_data_processor.warm_whisper_models()
+        except Exception as e:
+            self.skipped["transcribe"] = f"{type(e).__name__}: {e}"
+
+    def fetch(self, state):
+        from handlers import news_api_handler
+        state["articles"] = news_api_handler.fetch_tech_news("fixture-key", article_count=3, cache=None)
+        return len(state["articles"]), "articles"
+
+    def images(self, state):
+        from handlers import image_handler
+        state["images"] = []
+        for i, article in enumerate(state["articles"]):
+            image = image_handler.download_image(article["urlToImage"], os.path.join(self.workdir, f"article_image_{i}.jpg"))
+            if image:
+                state["images"].append(image)
+        return len(state["images"]), "images"
+
+    def summarize(self, state):
+        if "summarize" in self.skipped:
+            # Fixed stand-in: the first two sentences of each article
+            state["summaries"] = [". ".join(a["content"].split(". ")[:2]) for a in state["articles"]]
+            return None
+        from processors import news_data_processor
+        state["summaries"] = [news_data_processor.summarize_article(a["content"], self.summarizer) for a in state["articles"]]
+        return len(state["summaries"]), "articles"
+
+    def voice(self, state):
+        from handlers import elevenlabs_api_handler
+        state["voiceovers"] = []
+        for i, summary in enumerate(state["summaries"]):
+            path = elevenlabs_api_handler.generate_voiceover("fixture-key", summary, os.path.join(self.workdir, f"voiceover_{i}.mp3"))
+            state["voiceovers"].append(path)
+        return len(state["voiceovers"]), "voiceovers"
+
+    def transcribe(self, state):
+        import pysrt
+        from processors import media_info
+        srt_file = os.path.join(self.workdir, "final_subtitles.srt")
+        state["srt_file"] = srt_file
+        infos = media_info.probe_many(state["voiceovers"])
+
+        if "transcribe" in self.skipped:
+            # Fixed stand-in: one caption per voiceover
+            subs = pysrt.SubRipFile()
+            offset = 0.0
+            for i, (summary, info) in enumerate(zip(state["summaries"], infos)):
+                start, end = pysrt.SubRipTime(seconds=offset), pysrt.SubRipTime(seconds=offset + info.duration)
+                subs.append(pysrt.SubRipItem(index=i + 1, start=start, end=end, text=summary[:60]))
+                offset += info.duration
+            subs.save(srt_file, encoding="utf-8")
+            return None
+
+        from processors import audio_data_processor
+        subs = pysrt.SubRipFile()
+        offset = 0.0
+        for voiceover, info in zip(state["voiceovers"], infos):
+            subs.extend(audio_data_processor.transcribe_with_whisper(voiceover, offset))
+            offset += info.duration
+        subs.save(srt_file, encoding="utf-8")
+        return round(offset, 2), "audio seconds"
+
+    def render(self, state):
+        from processors import media_info, video_renderer
+        output = os.path.join(self.workdir, "final_reel.mp4")
+        state["output"] = video_renderer.render_reel(
+            state["voiceovers"], state["srt_file"], self.server.media["background"], state["images"],
+            output, profile=self.profile, bg_start=0
+        )
+        if state["output"] is None:
+            raise RuntimeError("render failed")
+        return round(media_info.probe(output).duration, 2), "video seconds"
+
+    def publish(self, state):
+        from handlers import tiktok_api_handler
+        result = tiktok_api_handler.post_video_to_tiktok("fixture-token", state["output"], "benchmark reel")
+        if not result.startswith("Successfully"):
+            raise RuntimeError(result)
+        return round(os.path.getsize(state["output"]) / (1024 * 1024), 2), "MiB"
+
+    def run_once(self, trace_memory=False):
+        from processors import metrics
+        recorder = metrics.set_recorder(metrics.MetricsRecorder(run_id="bench"))
+        state = {}
+        results = {}
+        for name in STAGES:
+            first_record = len(recorder.records)
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            with metrics.span(f"bench_{name}") as span:
+                work = getattr(self, name)(state)
+            elapsed = time.perf_counter() - started
+            python_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+            # Nested spans (downloads, TTS requests, uploads...) carry the byte counts
+            records = recorder.records[first_record:]
+            result = {
+                "wall_seconds": round(elapsed, 4),
+                "cpu_seconds": span["cpu_seconds"],
+                "child_cpu_seconds": span["child_cpu_seconds"],
+                "peak_rss_mib": round(span["peak_rss_bytes"] / (1024 * 1024), 1),
+                "bytes_in": sum(r["bytes_in"] for r in records),
+                "bytes_out": sum(r["bytes_out"] for r in records),
+                "skipped": name in self.skipped,
+            }
+            if python_peak is not None:
+                result["python_peak_mib"] = round(python_peak / (1024 * 1024), 2)
+            if work is not None:
+                amount, unit = work
+                result["throughput"] = f"{amount / elapsed:.2f} {unit}/s"
+            results[name] = result
+        return results
+
+def summarize_runs(runs):
+    # Median per metric across repeats; the total is the median end-to-end time
+    summary = {"stages": {}, "repeats": len(runs)}
+    for name in STAGES:
+        stage_runs = [run[name] for run in runs]
+        stage = {
+            key: statistics.median(r[key] for r in stage_runs)
+            for key in stage_runs[0]
+            if isinstance(stage_runs[0][key], (int, float)) and not isinstance(stage_runs[0][key], bool)
+        }
+        stage["skipped"] = stage_runs[0]["skipped"]
+        if "throughput" in stage_runs[-1]:
+            stage["throughput"] = stage_runs[-1]["throughput"]
+        summary["stages"][name] = stage
+    summary["total_seconds"] = statistics.median(sum(run[name]["wall_seconds"] for name in STAGES) for run in runs)
+    return summary
+
+def compare_to_baseline(summary, baseline, tolerance=DEFAULT_TOLERANCE):
+
+    # Wall time per stage relative to the baseline; slower than 1 + tolerance is a regression
+    rows, regressions = [], []
+    pairs = [(name, summary["stages"][name]["wall_seconds"], baseline["stages"].get(name, {}).get("wall_seconds"))
+             for name in STAGES]
+    pairs.append(("total", summary["total_seconds"], baseline.get("total_seconds")))
+    for name, current, previous in pairs:
+        if not previous or summary["stages"].get(name, {}).get("skipped"):
+            continue
+        ratio = current / previous
+        rows.append({"stage": name, "baseline": previous, "current": current, "ratio": round(ratio, 3)})
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return rows, regressions
+
+def print_summary(summary, skipped):
+    print(f"{'stage':<11} {'wall s':>8} {'cpu s':>7} {'child s':>8} {'rss MiB':>8} {'in KiB':>8} {'out KiB':>8}  throughput")
+    for name in STAGES:
+        stage = summary["stages"][name]
+        note = f"skipped ({skipped[name][:60]})" if stage["skipped"] else stage.get("throughput", "")
+        print(
+            f"{name:<11} {stage['wall_seconds']:>8.3f} {stage['cpu_seconds']:>7.3f} {stage['child_cpu_seconds']:>8.3f} "
+            f"{stage['peak_rss_mib']:>8.1f} {stage['bytes_in'] / 1024:>8.1f} {stage['bytes_out'] / 1024:>8.1f}  {note}"
+        )
+    print(f"{'total':<11} {summary['total_seconds']:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the reel pipeline")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profile", default="fast", help="Render profile")
+    parser.add_argument("--summary-model", help="Default SUMMARY_MODEL")
+    parser.add_argument("--summary-backend", choices=["hf", "int8", "onnx"], help="Default SUMMARY_BACKEND")
+    parser.add_argument("--trace-memory", action="store_true", help="Also record Python peak memory per stage (slower)")
+    parser.add_argument("--baseline", help="Compare against this saved baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown, e.g. 0.2 for 20%%")
+    parser.add_argument("--save-baseline", help="Write this run's summary as a baseline")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_pipeline_")
+    media_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fixture_media")
+    server = FixtureServer(media_dir).start()
+    cache_dir = os.path.join(root, "cache")
+    _configure_environment(server, cache_dir)
+    try:
+        bench = PipelineBench(server, os.path.join(root, "work"), args.profile, args.summary_model, args.summary_backend)
+        bench.setup()
+        runs = []
+        for _ in range(args.repeat):
+            # Cold caches and a clean work directory for every repeat
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            shutil.rmtree(bench.workdir, ignore_errors=True)
+            os.makedirs(bench.workdir)
+            runs.append(bench.run_once(args.trace_memory))
+    finally:
+        server.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+    summary = summarize_runs(runs)
+    summary["skipped"] = bench.skipped
+    summary["profile"] = args.profile
+    if args.json:
+        print(json.dumps(summary, indent=1))
+    else:
+        print_summary(summary, bench.skipped)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=1)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare_to_baseline(summary, baseline, args.tolerance)
+        for row in rows:
+            flag = "  REGRESSION" if row["stage"] in regressions else ""
+            print(f"{row['stage']:<11} {row['baseline']:>8.3f} -> {row['current']:>8.3f} ({row['ratio']:.2f}x){flag}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
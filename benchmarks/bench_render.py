@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from processors import media_info, video_renderer
+
+# Renders a fixed synthetic reel with each render profile and reports encode
+# speed (output fps and realtime factor) and output size. The fixture is
+# generated with ffmpeg's test sources, so no API keys or stock footage are needed.
+#
+#   python -m benchmarks.bench_render                     # every profile
+#   python -m benchmarks.bench_render --profiles draft fast --segments 4 --segment-seconds 8
+#   python -m benchmarks.bench_render --profiles fast --segment-workers 1 2 4 8
+#
+# With --segment-workers each profile is also rendered segment-parallel; those
+# rows report the speedup over single-pass and check frame counts and PSNR
+# against the single-pass output.
+
+def _ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *args], check=True)
+
+def make_fixture(directory, segments=3, segment_seconds=6.0, background_size="1920x1080"):
+    # A landscape background (so the scale/crop path is exercised), one tone per
+    # voiceover, one image per article and subtitles spanning the whole reel
+    background = os.path.join(directory, "background.mp4")
+    total = segments * segment_seconds
+    _ffmpeg("-f", "lavfi", "-i", f"testsrc2=size={background_size}:rate=30:duration={total + 10}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", "60", background)
+
+    voiceovers, images = [], []
+    for i in range(segments):
+        voiceover = os.path.join(directory, f"voiceover_{i}.mp3")
+        _ffmpeg("-f", "lavfi", "-i", f"sine=frequency={300 + 100 * i}:duration={segment_seconds}", voiceover)
+        voiceovers.append(voiceover)
+        if i < segments - 1:
+            # The last segment stands in for the outro, which has no image
+            image = os.path.join(directory, f"article_image_{i}.jpg")
+            _ffmpeg("-f", "lavfi", "-i", "mandelbrot=size=1200x800", "-frames:v", "1", image)
+            images.append(image)
+
+    srt_file = os.path.join(directory, "final_subtitles.srt")
+    with open(srt_file, "w", encoding="utf-8") as f:
+        for k in range(int(total // 2)):
+            start, end = 2 * k, 2 * k + 2
+            f.write(f"{k + 1}\n00:00:{start:02d},000 --> 00:00:{end:02d},000\nbenchmark caption {k}\n\n")
+    return voiceovers, srt_file, background, images
+
+def _render(fixture, profile, output, codec=None, mode="single", workers=None):
+    voiceovers, srt_file, background, images = fixture
+    if mode == "segments":
+        return video_renderer.render_reel_segments(
+            voiceovers, srt_file, background, images, output, profile, codec, workers, bg_start=0
+        )
+    command = video_renderer.build_render_command(
+        voiceovers, srt_file, background, images, output, profile, codec, bg_start=0
+    )
+    subprocess.run(command, check=True, capture_output=True)
+    return output
+
+def bench_profile(fixture, profile, directory, codec=None, mode="single", workers=None):
+    output = os.path.join(directory, f"reel_{profile}_{mode}_{workers or 0}.mp4")
+    started = time.perf_counter()
+    _render(fixture, profile, output, codec, mode, workers)
+    elapsed = time.perf_counter() - started
+
+    info = media_info.probe(output)
+    return {
+        "profile": profile,
+        "codec": codec or video_renderer.RENDER_VIDEO_CODEC,
+        "mode": mode,
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "duration": round(info.duration, 2),
+        "fps": round(count_frames(output) / elapsed, 1),
+        "realtime_factor": round(info.duration / elapsed, 2),
+        "bytes": os.path.getsize(output),
+        "output": output,
+    }
+
+def count_frames(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-count_packets",
+         "-show_entries", "stream=nb_read_packets", "-of", "csv=p=0", path],
+        capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.strip())
+
+def compare_outputs(reference, candidate):
+    # Frame counts must match exactly; PSNR shows the two encodes are the same picture
+    result = subprocess.run(
+        ["ffmpeg", "-v", "info", "-i", candidate, "-i", reference, "-lavfi", "[0:v][1:v]psnr", "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    psnr_line = next((line for line in result.stderr.splitlines() if "PSNR" in line and "average:" in line), "")
+    average = psnr_line.split("average:")[1].split()[0] if psnr_line else None
+    return {
+        "reference_frames": count_frames(reference),
+        "candidate_frames": count_frames(candidate),
+        "psnr_average": average,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render profiles on a synthetic reel")
+    parser.add_argument("--profiles", nargs="+", default=list(video_renderer.RENDER_PROFILES))
+    parser.add_argument("--codec", default=None, help="Video encoder, default RENDER_VIDEO_CODEC")
+    parser.add_argument("--segments", type=int, default=3)
+    parser.add_argument("--segment-seconds", type=float, default=6.0)
+    parser.add_argument(
+        "--segment-workers", type=int, nargs="*", default=[],
+        help="Also render segment-parallel with these worker counts and compare against single-pass"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = make_fixture(directory, args.segments, args.segment_seconds)
+        for profile in args.profiles:
+            single = bench_profile(fixture, profile, directory, args.codec)
+            print(json.dumps(single))
+            for workers in args.segment_workers:
+                parallel = bench_profile(fixture, profile, directory, args.codec, "segments", workers)
+                parallel["speedup"] = round(single["seconds"] / parallel["seconds"], 2)
+                parallel.update(compare_outputs(single["output"], parallel["output"]))
+                print(json.dumps(parallel))
+
+if __name__ == "__main__":
+    main()
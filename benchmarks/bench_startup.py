@@ -0,0 +1,111 @@
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup cost of each main.py subcommand, from `python -X importtime main.py
+# <command> --imports-only`: everything imported at module level plus the heavy
+# libraries that command needs, without doing any work. The totals are checked
+# against benchmarks/startup_budget.json so a stray top-level import of torch,
+# transformers, whisper or newspaper shows up as a failure rather than as a
+# slow CLI weeks later.
+#
+#   python -m benchmarks.bench_startup                  # check against the budget
+#   python -m benchmarks.bench_startup --update         # re-record the budget
+#   python -m benchmarks.bench_startup --top 15 render  # where render's time goes
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(ROOT, "benchmarks", "startup_budget.json")
+COMMANDS = ["help", "fetch", "summarize", "voice", "subtitle", "render", "publish", "all"]
+# Recorded budgets leave this much room over the measured time; import times on a
+# shared machine easily vary by a third between runs
+BUDGET_HEADROOM = 0.5
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def parse_importtime(stderr):
+    # Top-level imports (no indentation) add up to the total; nested ones are inside them
+    top_level = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            top_level[match.group(4)] = int(match.group(2))
+    return top_level
+
+def measure(command, repeat=5):
+    argv = ["--help"] if command == "help" else [command, "--imports-only"]
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py", *argv],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - started
+        if result.returncode != 0:
+            # Typically a heavy dependency that is not installed here
+            return {"error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+        runs.append((parse_importtime(result.stderr), wall))
+
+    # The fastest run is the one least disturbed by other load (and by writing .pyc files)
+    imports, _ = min(runs, key=lambda run: sum(run[0].values()))
+    return {
+        "import_ms": round(sum(imports.values()) / 1000, 1),
+        "wall_ms": round(statistics.median(wall for _, wall in runs) * 1000, 1),
+        "top": sorted(imports.items(), key=lambda item: item[1], reverse=True),
+    }
+
+def load_budget():
+    if not os.path.exists(BUDGET_FILE):
+        return {}
+    with open(BUDGET_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget for main.py subcommands")
+    parser.add_argument("commands", nargs="*", metavar="command", help=f"Any of {', '.join(COMMANDS)} (default all of them)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Show this many of the costliest top-level imports")
+    parser.add_argument("--update", action="store_true", help="Record the measured times (plus headroom) as the budget")
+    args = parser.parse_args()
+    unknown = set(args.commands) - set(COMMANDS)
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+    args.commands = args.commands or COMMANDS
+
+    budget = load_budget()
+    over_budget = []
+    for command in args.commands:
+        result = measure(command, args.repeat)
+        if "error" in result:
+            print(f"{command:<10} unavailable: {result['error']}")
+            continue
+
+        limit = budget.get("import_ms", {}).get(command)
+        status = ""
+        if limit is not None:
+            status = f"budget {limit:.0f} ms"
+            if result["import_ms"] > limit:
+                status += " OVER"
+                over_budget.append(command)
+        top = ", ".join(f"{name} {us / 1000:.0f}" for name, us in result["top"][:args.top])
+        print(f"{command:<10} imports {result['import_ms']:>7.1f} ms  process {result['wall_ms']:>7.1f} ms  {status:<18} {top}")
+
+        if args.update:
+            budget.setdefault("import_ms", {})[command] = math.ceil(result["import_ms"] * (1 + BUDGET_HEADROOM))
+
+    if args.update:
+        with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Saved budget to {BUDGET_FILE}")
+    elif over_budget:
+        print(f"Over the import-time budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from html.parser import HTMLParser
+
+# Compares the summarizer backends (processors.news_data_processor.SUMMARIZER_BACKENDS)
+# on the fixed articles in benchmarks/fixtures/articles: load time, resident memory,
+# per-article latency, batched throughput, and ROUGE-1/2/L of each backend's
+# summaries against the fp32 "hf" baseline's, i.e. how much quantization or the
+# ONNX export changes the output. Each backend runs in its own process so peak RSS
+# is its own.
+#
+#   python -m benchmarks.bench_summarizer
+#   SUMMARY_THREADS=4 python -m benchmarks.bench_summarizer --backends hf,int8 --repeat 5
+ARTICLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "articles")
+BASELINE_BACKEND = "hf"
+RESULT_PREFIX = "RESULT "
+
+class _ArticleText(HTMLParser):
+    # Body paragraphs of an <article>, without the byline
+    def __init__(self):
+        super().__init__()
+        self.paragraphs = []
+        self._in_article = False
+        self._in_paragraph = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "article":
+            self._in_article = True
+        elif tag == "p" and self._in_article and dict(attrs).get("class") != "byline":
+            self._in_paragraph = True
+            self.paragraphs.append("")
+
+    def handle_endtag(self, tag):
+        if tag == "article":
+            self._in_article = False
+        elif tag == "p":
+            self._in_paragraph = False
+
+    def handle_data(self, data):
+        if self._in_paragraph:
+            self.paragraphs[-1] += data
+
+def load_articles():
+    articles = []
+    for name in sorted(os.listdir(ARTICLE_DIR)):
+        parser = _ArticleText()
+        with open(os.path.join(ARTICLE_DIR, name), "r", encoding="utf-8") as f:
+            parser.feed(f.read())
+        articles.append("\n\n".join(p.strip() for p in parser.paragraphs))
+    return articles
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _f1(overlap, hyp_count, ref_count):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / hyp_count, overlap / ref_count
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_n(reference, hypothesis, n):
+    ref, hyp = _tokens(reference), _tokens(hypothesis)
+    ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+    hyp_ngrams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+    overlap = sum((ref_ngrams & hyp_ngrams).values())
+    return _f1(overlap, sum(hyp_ngrams.values()), sum(ref_ngrams.values()))
+
+def rouge_l(reference, hypothesis):
+    # F1 over the longest common subsequence of tokens
+    ref, hyp = _tokens(reference), _tokens(hypothesis)
+    previous = [0] * (len(hyp) + 1)
+    for r in ref:
+        current = [0]
+        for j, h in enumerate(hyp):
+            current.append(previous[j] + 1 if r == h else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(hyp), len(ref))
+
+def rouge(references, hypotheses):
+    # Mean F1 over the article set
+    scores = {"rouge1": [], "rouge2": [], "rougeL": []}
+    for reference, hypothesis in zip(references, hypotheses):
+        scores["rouge1"].append(rouge_n(reference, hypothesis, 1))
+        scores["rouge2"].append(rouge_n(reference, hypothesis, 2))
+        scores["rougeL"].append(rouge_l(reference, hypothesis))
+    return {name: round(statistics.mean(values), 4) for name, values in scores.items()}
+
+def _rss_mib():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(backend, repeat):
+
+    # Runs in a child process: load one backend, time it, print a result line
+    from processors import news_data_processor
+
+    articles = load_articles()
+    started = time.perf_counter()
+    summarizer = news_data_processor.load_summarizer(backend)
+    load_seconds = time.perf_counter() - started
+    load_rss = _rss_mib()
+
+    # One warm-up pass; first calls allocate buffers and (for ORT) pick kernels
+    news_data_processor.summarize_articles(articles[:1], summarizer, batch_size=1)
+
+    latencies = []
+    for _ in range(repeat):
+        for article in articles:
+            started = time.perf_counter()
+            summaries = news_data_processor.summarize_articles([article], summarizer, batch_size=1)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    summaries = news_data_processor.summarize_articles(articles, summarizer)
+    batch_seconds = time.perf_counter() - started
+
+    print(RESULT_PREFIX + json.dumps({
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "load_rss_mib": round(load_rss),
+        "peak_rss_mib": round(_rss_mib()),
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_max": round(max(latencies), 3),
+        "batch_seconds": round(batch_seconds, 3),
+        "summaries": summaries,
+    }))
+
+def measure(backend, repeat):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_summarizer", "--worker", backend, "--repeat", str(repeat)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {"backend": backend, "error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, memory and ROUGE of the summarizer backends")
+    parser.add_argument("--backends", default="hf,int8,onnx", help="Comma-separated; hf is the ROUGE baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the article set for latency")
+    parser.add_argument("--save", help="Write all results, summaries included, to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.repeat)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if BASELINE_BACKEND not in backends:
+        backends.insert(0, BASELINE_BACKEND)
+    results = {backend: measure(backend, args.repeat) for backend in backends}
+
+    baseline = results[BASELINE_BACKEND]
+    print(f"{'backend':<8} {'load s':>7} {'load MiB':>9} {'peak MiB':>9} {'p50 s':>7} {'max s':>7} {'batch s':>8}  ROUGE-1/2/L vs {BASELINE_BACKEND}")
+    for backend, result in results.items():
+        if "error" in result:
+            print(f"{backend:<8} unavailable: {result['error']}")
+            continue
+        if "error" not in baseline:
+            result["rouge"] = rouge(baseline["summaries"], result["summaries"])
+            scores = "/".join(f"{result['rouge'][k]:.3f}" for k in ("rouge1", "rouge2", "rougeL"))
+        else:
+            scores = "n/a"
+        print(
+            f"{backend:<8} {result['load_seconds']:>7.1f} {result['load_rss_mib']:>9} {result['peak_rss_mib']:>9} "
+            f"{result['latency_p50']:>7.2f} {result['latency_max']:>7.2f} {result['batch_seconds']:>8.2f}  {scores}"
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Saved results to {args.save}")
+
+if __name__ == "__main__":
+    main()
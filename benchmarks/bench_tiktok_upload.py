@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from handlers import tiktok_api_handler
+
+# Measures chunked upload throughput and peak Python memory against a local
+# stand-in for TikTok's upload endpoint (no credentials or network needed).
+#
+#   python -m benchmarks.bench_tiktok_upload --size-mb 200 --chunk-mb 10
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self):
+        remaining = int(self.headers["Content-Length"])
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 256 * 1024)))
+        last, total = self.headers["Content-Range"].split(" ")[1].split("-")[1].split("/")
+        self.send_response(201 if int(last) == int(total) - 1 else 206)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def start_upload_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/upload"
+
+def bench_upload(video_path, chunk_size=None):
+    server, upload_url = start_upload_server()
+    try:
+        video_size = os.path.getsize(video_path)
+        chunk_size, total_chunk_count = tiktok_api_handler.plan_chunks(video_size, chunk_size)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        ok, message = tiktok_api_handler.upload_video_chunks(
+            upload_url, video_path, chunk_size, total_chunk_count
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        server.shutdown()
+
+    return {
+        "ok": ok,
+        "message": message,
+        "bytes": video_size,
+        "chunk_size": chunk_size,
+        "chunks": total_chunk_count,
+        "seconds": round(elapsed, 3),
+        "mib_per_s": round(video_size / tiktok_api_handler.MB / max(elapsed, 1e-6), 1),
+        "peak_python_mib": round(peak / tiktok_api_handler.MB, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked TikTok uploads against a local server")
+    parser.add_argument("--video", help="File to upload; a random file is generated when omitted")
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--chunk-mb", type=int, default=None)
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_mb * tiktok_api_handler.MB if args.chunk_mb else None
+    if args.video:
+        print(json.dumps(bench_upload(args.video, chunk_size)))
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+        block = os.urandom(tiktok_api_handler.MB)
+        for _ in range(args.size_mb):
+            f.write(block)
+        f.flush()
+        print(json.dumps(bench_upload(f.name, chunk_size)))
+
+if __name__ == "__main__":
+    main()
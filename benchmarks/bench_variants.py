@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+from benchmarks.bench_render import count_frames, make_fixture
+from processors import media_info, video_renderer
+
+# One render that writes the reel plus its variants (OUTPUT_VARIANTS: preview,
+# square, poster, thumbnail) against what the pipeline did before: a whole
+# separate ffmpeg run per output, each decoding the background, overlaying the
+# images and burning in the subtitles again. Reports wall and CPU time of both
+# and checks that every output has the same frame count either way.
+#
+#   python -m benchmarks.bench_variants
+#   python -m benchmarks.bench_variants --profile fast --variants preview poster --segments 4
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _timed(commands):
+    started, cpu_started = time.perf_counter(), _children_cpu()
+    for command in commands:
+        subprocess.run(command, check=True, capture_output=True)
+    return round(time.perf_counter() - started, 2), round(_children_cpu() - cpu_started, 2)
+
+def standalone_variant_command(fixture, plan, spec, path, profile):
+
+    # The full reel graph again, but ending in just this variant
+    voiceovers, srt_file, background, images = fixture
+    command = video_renderer.build_render_command(
+        voiceovers, srt_file, background, images, path, profile, plan=plan
+    )
+    graph_at = command.index("-filter_complex")
+    graph = command[graph_at + 1]
+    if spec["kind"] == "image":
+        frame = round(video_renderer.poster_time(spec, plan) * plan["fps"])
+        graph += f";[v]trim=start_frame={frame}:end_frame={frame + 1},setpts=PTS-STARTPTS,{video_renderer.variant_filter(spec)}[out]"
+        graph += ";[audio_out]anullsink"
+        maps = ["-map", "[out]"]
+    else:
+        graph += f";[v]{video_renderer.variant_filter(spec)}[out]"
+        maps = ["-map", "[out]", "-map", "[audio_out]", "-t", f"{plan['total_length']:.6f}"]
+    return (
+        command[:graph_at] + ["-filter_complex", graph] + maps
+        + video_renderer.variant_output_args(spec, profile) + [path]
+    )
+
+def _frames(path):
+    return count_frames(path) if path.endswith(".mp4") else media_info.probe(path).width
+
+def main():
+    parser = argparse.ArgumentParser(description="Variants from one render vs one render per output")
+    parser.add_argument("--profile", default="draft", choices=sorted(video_renderer.RENDER_PROFILES))
+    parser.add_argument("--variants", nargs="+", default=list(video_renderer.OUTPUT_VARIANTS))
+    parser.add_argument("--segments", type=int, default=3)
+    parser.add_argument("--segment-seconds", type=float, default=6.0)
+    args = parser.parse_args()
+    profile = video_renderer.get_render_profile(args.profile)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = make_fixture(directory, args.segments, args.segment_seconds)
+        voiceovers, srt_file, background, images = fixture
+        plan = video_renderer.render_plan(voiceovers, background, bg_start=0)
+
+        combined_dir, separate_dir = os.path.join(directory, "combined"), os.path.join(directory, "separate")
+        os.makedirs(combined_dir)
+        os.makedirs(separate_dir)
+
+        reel = os.path.join(combined_dir, "final_reel.mp4")
+        combined_outputs = video_renderer.variant_outputs(reel, args.variants)
+        combined = _timed([video_renderer.build_render_command(
+            voiceovers, srt_file, background, images, reel, profile, plan=plan, variants=combined_outputs
+        )])
+
+        separate_reel = os.path.join(separate_dir, "final_reel.mp4")
+        separate_outputs = video_renderer.variant_outputs(separate_reel, args.variants)
+        separate = _timed(
+            [video_renderer.build_render_command(voiceovers, srt_file, background, images, separate_reel, profile, plan=plan)]
+            + [standalone_variant_command(fixture, plan, spec, path, profile) for spec, path in separate_outputs]
+        )
+
+        # Frame counts for videos, widths for images
+        mismatched = [
+            spec["name"]
+            for (spec, path), (_, other) in zip(combined_outputs, separate_outputs)
+            if _frames(path) != _frames(other)
+        ]
+        if count_frames(reel) != count_frames(separate_reel):
+            mismatched.insert(0, "reel")
+
+        print(json.dumps({
+            "profile": args.profile,
+            "outputs": 1 + len(combined_outputs),
+            "reel_seconds": round(plan["total_length"], 2),
+            "combined": {"seconds": combined[0], "cpu_seconds": combined[1]},
+            "separate": {"seconds": separate[0], "cpu_seconds": separate[1]},
+            "speedup": round(separate[0] / combined[0], 2),
+            "cpu_saved": round(1 - combined[1] / separate[1], 3),
+            "mismatched": mismatched,
+        }))
+
+if __name__ == "__main__":
+    main()
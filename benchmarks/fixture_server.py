@@ -0,0 +1,236 @@
+import base64
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One local HTTP server standing in for every external service the pipeline
+# talks to, replaying the recorded fixtures in benchmarks/fixtures:
+#   GET  /v2/top-headlines, /v2/everything    NewsAPI JSON (key in X-Api-Key, as NewsAPI accepts it)
+#   GET  /articles/<slug>.html                 publisher pages
+#   GET  /images/<name>.jpg                    article images
+#   POST /v1/text-to-speech/<voice>[/...]      ElevenLabs MP3 (or JSON with timestamps)
+#   POST /v2/post/publish/video/init/, PUT /upload/<id>, POST /v2/post/publish/,
+#   POST /v2/post/publish/status/fetch/        TikTok direct post
+# Binary media (MP3s, images) are generated deterministically with ffmpeg the
+# first time, since the recorded responses were large and add nothing to timing.
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Voiceover lengths cycle through these, picked by a hash of the requested text
+VOICE_SECONDS = (6.0, 8.0, 10.0)
+
+def _ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *args], check=True)
+
+def generate_media(directory):
+    os.makedirs(directory, exist_ok=True)
+    voices = []
+    for i, seconds in enumerate(VOICE_SECONDS):
+        path = os.path.join(directory, f"voice_{i}.mp3")
+        if not os.path.exists(path):
+            _ffmpeg("-f", "lavfi", "-i", f"sine=frequency={220 * (i + 1)}:duration={seconds}",
+                    "-ac", "1", "-b:a", "128k", path)
+        voices.append(path)
+    image = os.path.join(directory, "image.jpg")
+    if not os.path.exists(image):
+        _ffmpeg("-f", "lavfi", "-i", "mandelbrot=size=1600x1000", "-frames:v", "1", image)
+    background = os.path.join(directory, "background.mp4")
+    if not os.path.exists(background):
+        _ffmpeg("-f", "lavfi", "-i", "testsrc2=size=1920x1080:rate=30:duration=60",
+                "-c:v", "libx264", "-preset", "ultrafast", "-g", "30", background)
+    return {"voices": voices, "image": image, "background": background}
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        if path in ("/v2/top-headlines", "/v2/everything"):
+            with server.lock:
+                server.newsapi_requests += 1
+            if server.newsapi_delay:
+                time.sleep(server.newsapi_delay)
+            if not self.headers.get("X-Api-Key"):
+                return self._send(401, {"status": "error", "code": "apiKeyMissing"})
+            if server.newsapi_response is not None:
+                return self._send(*server.newsapi_response)
+            with open(os.path.join(FIXTURE_DIR, "newsapi_top_headlines.json"), "r", encoding="utf-8") as f:
+                body = f.read().replace("{base}", server.base_url)
+            return self._send(200, body.encode("utf-8"))
+        if path.startswith("/articles/"):
+            article = os.path.join(FIXTURE_DIR, "articles", os.path.basename(path))
+            if not os.path.exists(article):
+                return self._send(404, b"not found", "text/plain")
+            with open(article, "rb") as f:
+                return self._send(200, f.read(), "text/html; charset=utf-8")
+        if path.startswith("/images/"):
+            with open(server.media["image"], "rb") as f:
+                return self._send(200, f.read(), "image/jpeg")
+        self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        payload = json.loads(self._read_body() or b"{}")
+        if path.startswith("/v1/text-to-speech/"):
+            with server.lock:
+                server.tts_requests += 1
+                server.tts_connections.add(self.client_address)
+            if server.tts_failure == "error":
+                return self._send(500, {"detail": "synthesis failed"})
+            digest = hashlib.sha256(payload.get("text", "").encode("utf-8")).digest()
+            with open(server.media["voices"][digest[0] % len(server.media["voices"])], "rb") as f:
+                audio = f.read()
+            if server.tts_failure == "truncate":
+                # Promise the whole MP3, send half of it and drop the connection
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(len(audio)))
+                self.end_headers()
+                self.wfile.write(audio[:len(audio) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            if server.tts_failure == "not_json":
+                return self._send(200, b"<html>proxy error</html>", "text/html")
+            if server.tts_failure == "no_audio":
+                return self._send(200, {"alignment": None})
+            if path.endswith("/with-timestamps"):
+                return self._send(200, {"audio_base64": base64.b64encode(audio).decode("ascii"), "alignment": None})
+            return self._send(200, audio, "audio/mpeg")
+        if path == "/v2/post/publish/video/init/":
+            with server.lock:
+                server.publish_count += 1
+                publish_id = f"fixture_{server.publish_count}"
+            return self._send(200, {"data": {"publish_id": publish_id, "upload_url": f"{server.base_url}/upload/{publish_id}"}})
+        if path == "/v2/post/publish/":
+            return self._send(200, {"data": {}})
+        if path == "/v2/post/publish/status/fetch/":
+            with server.lock:
+                server.status_requests += 1
+                response = server.status_responses.pop(0) if server.status_responses else None
+            if response is not None:
+                return self._send(*response)
+            return self._send(200, {"data": {"status": "PUBLISH_COMPLETE"}})
+        self._send(404, {"error": "not found"})
+
+    def do_PUT(self):
+        server = self.server
+        remaining = int(self.headers["Content-Length"])
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 256 * 1024)))
+        first, rest = self.headers["Content-Range"].split(" ")[1].split("-")
+        last, total = rest.split("/")
+        with server.lock:
+            failing = server.upload_fail_after == 0
+            if failing:
+                server.upload_fail_after = None
+            else:
+                if server.upload_fail_after is not None:
+                    server.upload_fail_after -= 1
+                server.upload_ranges.append((os.path.basename(self.path), int(first), int(last)))
+        if failing:
+            return self._send(503, b"upload interrupted", "text/plain")
+        self._send(201 if int(last) == int(total) - 1 else 206, b"", "text/plain")
+
+    def log_message(self, *args):
+        pass
+
+class FixtureServer:
+    def __init__(self, media_dir):
+        self.media = generate_media(media_dir)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+        self._server.media = self.media
+        self._server.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._server.lock = threading.Lock()
+        self._server.publish_count = 0
+        self._server.newsapi_requests = 0
+        # Seconds each NewsAPI response takes, to make request concurrency visible
+        self._server.newsapi_delay = 0.0
+        # (status, body, content type) replacing the recorded NewsAPI listing
+        self._server.newsapi_response = None
+        self._server.tts_requests = 0
+        # Client (host, port) pairs seen by text-to-speech; one per kept-alive connection
+        self._server.tts_connections = set()
+        # None, "error" (HTTP 500), "truncate" (connection dropped mid-MP3), or a 200
+        # that is "not_json" or JSON with "no_audio" (for the timestamped endpoint)
+        self._server.tts_failure = None
+        # (publish_id, first byte, last byte) of every accepted upload chunk
+        self._server.upload_ranges = []
+        # Chunks accepted before the next one is answered with a 503 (once)
+        self._server.upload_fail_after = None
+        self._server.status_requests = 0
+        # (status, body) answers for the next status fetches, then PUBLISH_COMPLETE
+        self._server.status_responses = []
+        self.base_url = self._server.base_url
+
+    @property
+    def newsapi_requests(self):
+        return self._server.newsapi_requests
+
+    def set_newsapi_delay(self, seconds):
+        self._server.newsapi_delay = seconds
+
+    @property
+    def tts_requests(self):
+        return self._server.tts_requests
+
+    @property
+    def tts_connections(self):
+        return set(self._server.tts_connections)
+
+    def set_tts_failure(self, failure=None):
+        self._server.tts_failure = failure
+
+    @property
+    def upload_ranges(self):
+        return list(self._server.upload_ranges)
+
+    def set_upload_failure(self, after=None):
+        # Fail the upload chunk that comes after `after` accepted ones; None uploads everything
+        with self._server.lock:
+            self._server.upload_fail_after = after
+
+    @property
+    def status_requests(self):
+        return self._server.status_requests
+
+    def set_status_responses(self, responses=()):
+        # e.g. [(503, {...}), (200, {"data": {"status": "FAILED"}})] for the next polls
+        with self._server.lock:
+            self._server.status_responses = list(responses)
+
+    def set_newsapi_response(self, status=None, body=b"", content_type="application/json"):
+        # Answer NewsAPI queries with this instead (errors, rate limits); no status restores the listing
+        self._server.newsapi_response = None if status is None else (status, body, content_type)
+
+    def environment(self):
+        # Settings that point every handler at this server; set before importing them
+        return {
+            "NEWS_API_BASE": self.base_url,
+            "ELEVENLABS_API_BASE": self.base_url,
+            "TIKTOK_API_BASE": self.base_url,
+        }
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
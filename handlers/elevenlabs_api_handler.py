@@ -1,20 +1,171 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unicodedata
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from processors import metrics
+
+# API_BASE can point at a local fake server when exercising the handler offline
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io")
+ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "TX3LPaxmHKxFdv7VOQHJ")
+ELEVENLABS_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_flash_v2_5")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+TTS_TIMEOUT = (float(os.getenv("TTS_CONNECT_TIMEOUT", "5")), float(os.getenv("TTS_READ_TIMEOUT", "60")))
+# Ask for character timings alongside the audio so subtitles can skip speech recognition.
+# Off by default: that endpoint returns JSON with base64 audio, so the MP3 is no
+# longer streamed to disk as it arrives.
+TTS_WITH_TIMESTAMPS = os.getenv("TTS_WITH_TIMESTAMPS", "0") == "1"
+# Synthesized audio is content-addressed by (voice id, model id, normalized text)
+TTS_CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "tts")
+)
+
+_session = None
+_session_lock = threading.Lock()
+# Per cache key, so concurrent requests for the same text only pay for it once
+_key_locks = {}
+
+def get_session():
+
+    # One keep-alive session for all synthesis calls, sized for the worker pool
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(TTS_WORKERS, 1))
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def normalize_text(text):
+    # Same speech for text that only differs in unicode form or whitespace
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+def tts_cache_key(text, voice_id=None, model_id=None):
+    key = json.dumps([
+        voice_id or ELEVENLABS_VOICE_ID,
+        model_id or ELEVENLABS_MODEL_ID,
+        normalize_text(text)
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _cached_voiceover_path(text, voice_id=None, model_id=None):
+    return os.path.join(TTS_CACHE_DIR, f"{tts_cache_key(text, voice_id, model_id)}.mp3")
+
+def _cached_alignment_path(text, voice_id=None, model_id=None):
+    return os.path.join(TTS_CACHE_DIR, f"{tts_cache_key(text, voice_id, model_id)}.alignment.json")
+
+def load_alignment(text, voice_id=None, model_id=None):
+
+    # Character timings ElevenLabs returned for this text, or None if we never got any
+    path = _cached_alignment_path(text, voice_id or ELEVENLABS_VOICE_ID, model_id or ELEVENLABS_MODEL_ID)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_atomic(path, chunks):
+    # Write to a temp file in the cache and rename, so readers never see a partial file
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=TTS_CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
 
 # Generate Voiceover
-def generate_voiceover(api_key, text, filename="voiceover.mp3"):
-    url = "https://api.elevenlabs.io/v1/text-to-speech/TX3LPaxmHKxFdv7VOQHJ"
+def generate_voiceover(api_key, text, filename="voiceover.mp3", voice_id=None, model_id=None, session=None):
+    voice_id = voice_id or ELEVENLABS_VOICE_ID
+    model_id = model_id or ELEVENLABS_MODEL_ID
+    cached_path = _cached_voiceover_path(text, voice_id, model_id)
+
+    with _session_lock:
+        key_lock = _key_locks.setdefault(cached_path, threading.Lock())
+
+    with key_lock:
+        # Text we already paid for is copied out of the cache
+        metrics.cache_event("tts", os.path.exists(cached_path))
+        if not os.path.exists(cached_path):
+            if not _synthesize_to_cache(api_key, text, cached_path, voice_id, model_id, session):
+                return None
+
+    shutil.copyfile(cached_path, filename)
+    return filename
+
+def _counted(chunks):
+    for chunk in chunks:
+        metrics.add_bytes(len(chunk))
+        yield chunk
+
+def _synthesize_to_cache(api_key, text, cached_path, voice_id, model_id, session=None):
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}"
+    if TTS_WITH_TIMESTAMPS:
+        url += "/with-timestamps"
     headers = {
         "xi-api-key": api_key,
         "Content-Type": "application/json"
     }
     data = {
         "text": text,
-        "model_id": "eleven_flash_v2_5",
+        "model_id": model_id,
     }
-    response = requests.post(url, json=data, headers=headers)
-    print(f"Response status code: {response.status_code}")
-    if response.status_code == 200:
-        with open(filename, "wb") as f:
-            f.write(response.content)
-    else:
-        print(f"Error: {response.status_code}, {response.text}")
\ No newline at end of file
+    session = session or get_session()
+    try:
+        return _stream_to_cache(session, url, data, headers, text, cached_path, voice_id, model_id)
+    except requests.RequestException as e:
+        # e.g. the connection dropped mid-stream; _write_atomic has removed the partial file
+        print(f"Error: synthesis failed: {e}")
+        return False
+
+def _stream_to_cache(session, url, data, headers, text, cached_path, voice_id, model_id):
+    with metrics.span("tts_request", article=os.path.basename(cached_path)), \
+            session.post(url, json=data, headers=headers, stream=True, timeout=TTS_TIMEOUT) as response:
+        metrics.add_bytes(len(json.dumps(data)), "out")
+        if response.status_code != 200:
+            print(f"Error: {response.status_code}, {response.text}")
+            return False
+
+        if not TTS_WITH_TIMESTAMPS:
+            # Stream the MP3 straight to disk, then publish it to the cache atomically
+            _write_atomic(cached_path, _counted(response.iter_content(chunk_size=64 * 1024)))
+            return True
+
+        # The timestamped endpoint returns JSON with base64 audio, so it cannot be streamed
+        metrics.add_bytes(len(response.content))
+        try:
+            payload = response.json()
+            audio = base64.b64decode(payload["audio_base64"])
+        except (ValueError, KeyError, TypeError) as e:
+            # Not JSON, or no audio in it; binascii.Error is a ValueError too
+            print(f"Error: unexpected timestamped response: {e!r}")
+            return False
+        alignment = payload.get("alignment") or payload.get("normalized_alignment")
+        if alignment:
+            alignment_path = _cached_alignment_path(text, voice_id, model_id)
+            _write_atomic(alignment_path, [json.dumps(alignment).encode("utf-8")])
+        _write_atomic(cached_path, [audio])
+    return True
+
+def generate_voiceovers(api_key, texts, filenames, voice_id=None, model_id=None, max_workers=None):
+
+    # Synthesize several voiceovers concurrently over the shared session, preserving order
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=max_workers or TTS_WORKERS) as executor:
+        futures = [
+            executor.submit(generate_voiceover, api_key, text, filename, voice_id, model_id, session)
+            for text, filename in zip(texts, filenames)
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from processors import metrics
+from processors.video_renderer import IMAGE_WIDTH
+
+# Article images are fetched once, validated, pre-resized to the overlay width and
+# stored by the SHA-256 of their bytes. A small per-URL pointer file records which
+# content a URL returned, so a publisher image reused across articles and runs is
+# neither downloaded nor resized again.
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "images")
+)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "4"))
+IMAGE_TIMEOUT = (float(os.getenv("IMAGE_CONNECT_TIMEOUT", "5")), float(os.getenv("IMAGE_READ_TIMEOUT", "15")))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(15 * 1024 * 1024)))
+# Decompression-bomb guard, checked from the header before any pixels are decoded
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif"}
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+_session = None
+_session_lock = threading.Lock()
+# Per URL, so two articles sharing an image only fetch it once
+_url_locks = {}
+
+def get_session():
+
+    # One keep-alive session for all image downloads, sized for the stage's workers
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = "Mozilla/5.0 (compatible; tech-news-gram)"
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(IMAGE_WORKERS, 1))
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def _url_pointer_path(url):
+    return os.path.join(IMAGE_CACHE_DIR, "urls", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+def _stored_image_path(content_hash, extension):
+    return os.path.join(IMAGE_CACHE_DIR, f"{content_hash}_{IMAGE_WIDTH}w.{extension}")
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def _lookup_url(url):
+    try:
+        with open(_url_pointer_path(url), "r", encoding="utf-8") as f:
+            path = f.read().strip()
+    except OSError:
+        return None
+    return path if os.path.exists(path) else None
+
+def _download(url, session=None):
+
+    # Stream the body, giving up early on a wrong content type or an oversized file
+    session = session or get_session()
+    with session.get(url, stream=True, timeout=IMAGE_TIMEOUT) as response:
+        if response.status_code != 200:
+            print(f"Failed to download image: {response.status_code}")
+            return None
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        # Some CDNs send octet-stream for images; the decoder check below still applies
+        if content_type and content_type not in ALLOWED_CONTENT_TYPES and content_type != "application/octet-stream":
+            print(f"Skipping image with content type {content_type}: {url}")
+            return None
+        if int(response.headers.get("Content-Length") or 0) > IMAGE_MAX_BYTES:
+            print(f"Skipping image over {IMAGE_MAX_BYTES} bytes: {url}")
+            return None
+
+        body = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            body.extend(chunk)
+            metrics.add_bytes(len(chunk))
+            if len(body) > IMAGE_MAX_BYTES:
+                print(f"Skipping image over {IMAGE_MAX_BYTES} bytes: {url}")
+                return None
+    return bytes(body)
+
+def prepare_image(data):
+
+    # Header-only check of format and dimensions, then one decode and resize to the
+    # overlay width. Returns (bytes, extension) or None if this isn't a usable image.
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception as e:
+        print(f"Unreadable image: {e}")
+        return None
+    width, height = image.size
+    if image.format not in ALLOWED_FORMATS or width * height > IMAGE_MAX_PIXELS or not width or not height:
+        print(f"Rejecting image {image.format} {width}x{height}")
+        return None
+
+    target_height = max(1, round(height * IMAGE_WIDTH / width))
+    if image.format == "JPEG":
+        # Let libjpeg decode at a reduced scale when the source is much larger
+        image.draft("RGB", (IMAGE_WIDTH, target_height))
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if image.size != (IMAGE_WIDTH, target_height):
+        image = image.resize((IMAGE_WIDTH, target_height), Image.LANCZOS)
+
+    out = io.BytesIO()
+    if has_alpha:
+        # Keep transparency for the overlay
+        image.save(out, "PNG", optimize=False)
+        return out.getvalue(), "png"
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue(), "jpg"
+
+def fetch_image(url, session=None):
+
+    # Path of the stored, pre-resized image for this URL, downloading it if needed
+    with _session_lock:
+        url_lock = _url_locks.setdefault(url, threading.Lock())
+
+    with url_lock:
+        stored = _lookup_url(url)
+        metrics.cache_event("image", stored is not None)
+        if stored:
+            return stored
+
+        try:
+            data = _download(url, session)
+        except requests.RequestException as e:
+            print(f"Failed to download image: {e}")
+            return None
+        if data is None:
+            return None
+
+        content_hash = hashlib.sha256(data).hexdigest()
+        stored = next(
+            (p for p in (_stored_image_path(content_hash, ext) for ext in ("jpg", "png")) if os.path.exists(p)),
+            None
+        )
+        if stored is None:
+            prepared = prepare_image(data)
+            if prepared is None:
+                return None
+            image_bytes, extension = prepared
+            stored = _stored_image_path(content_hash, extension)
+            _write_atomic(stored, image_bytes)
+
+        _write_atomic(_url_pointer_path(url), stored.encode("utf-8"))
+        return stored
+
+def download_image(url, filename, session=None):
+    # Copy the stored image to filename, keeping the extension of the stored format
+    stored = fetch_image(url, session)
+    if stored is None:
+        return None
+    filename = os.path.splitext(filename)[0] + os.path.splitext(stored)[1]
+    shutil.copyfile(stored, filename)
+    return filename
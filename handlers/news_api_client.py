@@ -0,0 +1,280 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from processors import metrics
+
+# NewsAPI listings for one or more queries (top-headlines categories and
+# "everything" searches), run concurrently on one keep-alive session with the key
+# in the X-Api-Key header rather than the URL. Responses are kept in SQLite with
+# their fetch time: within NEWSAPI_FRESHNESS a repeated query costs no request,
+# and an older response is still served when the request budget is spent or
+# NewsAPI fails. Requests draw from a token bucket persisted next to the cache,
+# shared by every thread and process, sized so no 24 hours can spend more than
+# NEWSAPI_DAILY_QUOTA (100 on the free plan).
+# NEWS_API_BASE can point at a local stand-in server (see benchmarks/fixture_server.py)
+NEWS_API_BASE = os.getenv("NEWS_API_BASE", "https://newsapi.org")
+NEWSAPI_CACHE_PATH = os.getenv(
+    "NEWSAPI_CACHE_PATH",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "newsapi.sqlite3")
+)
+NEWSAPI_FRESHNESS = float(os.getenv("NEWSAPI_FRESHNESS", str(15 * 60)))
+NEWSAPI_STALE_MAX_AGE = float(os.getenv("NEWSAPI_STALE_MAX_AGE", str(24 * 60 * 60)))
+NEWSAPI_DAILY_QUOTA = int(os.getenv("NEWSAPI_DAILY_QUOTA", "100"))
+# Requests that may go out back to back; the rest of the quota refills evenly over the day
+NEWSAPI_BURST = int(os.getenv("NEWSAPI_BURST", "10"))
+# How long a request may wait for a token before the stale response (or nothing) is used
+NEWSAPI_MAX_WAIT = float(os.getenv("NEWSAPI_MAX_WAIT", "0"))
+NEWSAPI_WORKERS = int(os.getenv("NEWSAPI_WORKERS", "4"))
+NEWSAPI_PAGE_SIZE = int(os.getenv("NEWSAPI_PAGE_SIZE", "50"))
+NEWSAPI_TIMEOUT = (float(os.getenv("NEWSAPI_CONNECT_TIMEOUT", "5")), float(os.getenv("NEWSAPI_READ_TIMEOUT", "10")))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+
+    # One keep-alive session for all NewsAPI queries, sized for the query workers
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(NEWSAPI_WORKERS, 1))
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def news_query(category=None, query=None):
+    # (endpoint, params): an "everything" search when a query is given, otherwise
+    # top headlines for the category
+    if query:
+        return "everything", {"q": query, "language": "en", "sortBy": "publishedAt", "pageSize": NEWSAPI_PAGE_SIZE}
+    return "top-headlines", {"category": category or "technology", "language": "en", "pageSize": NEWSAPI_PAGE_SIZE}
+
+def news_queries(category="technology", query=None, queries=None):
+    # A job's queries, e.g. [{"category": "technology"}, {"query": "open source"}],
+    # or the single category/query pair
+    if not queries:
+        return [news_query(category, query)]
+    return [news_query(q.get("category"), q.get("query")) for q in queries]
+
+def is_valid_article(article):
+    # Skip removed or empty articles
+    return not (
+        article.get("title") == "[Removed]" or
+        article.get("content") == "[Removed]" or
+        not article.get("url") or
+        not article.get("publishedAt")
+    )
+
+def merge_articles(results):
+
+    # One list from every query's articles, each URL once. Newest hour first; within
+    # an hour, stories found by more queries first (ISO 8601 strings sort chronologically).
+    merged, hits = {}, {}
+    for articles in results:
+        for article in articles or []:
+            if not is_valid_article(article):
+                continue
+            url = article["url"]
+            merged.setdefault(url, article)
+            hits[url] = hits.get(url, 0) + 1
+    return sorted(
+        merged.values(),
+        key=lambda a: (a["publishedAt"][:13], hits[a["url"]], a["publishedAt"], a["url"]),
+        reverse=True
+    )
+
+def _request_key(endpoint, params):
+    return hashlib.sha256(json.dumps([endpoint, params], sort_keys=True).encode("utf-8")).hexdigest()
+
+class NewsApiClient:
+    def __init__(self, api_key, path=None, freshness=None, daily_quota=None, burst=None, max_wait=None, session=None):
+        self.api_key = api_key
+        self.path = path or NEWSAPI_CACHE_PATH
+        self.freshness = NEWSAPI_FRESHNESS if freshness is None else freshness
+        self.max_wait = NEWSAPI_MAX_WAIT if max_wait is None else max_wait
+        self.session = session or get_session()
+        # NewsAPI counts requests per key
+        self._budget_name = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+        # Bucket capacity plus what refills in a day never exceeds the daily quota
+        daily_quota = NEWSAPI_DAILY_QUOTA if daily_quota is None else daily_quota
+        self.capacity = min(NEWSAPI_BURST if burst is None else burst, daily_quota)
+        self.refill_rate = (daily_quota - self.capacity) / 86400
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Query workers share one connection behind a lock; the budget is updated in
+        # BEGIN IMMEDIATE transactions so concurrent processes never overspend it
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.counts = {"fresh": 0, "requests": 0, "not_modified": 0, "stale": 0, "throttled": 0, "failed": 0}
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    articles TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS budget (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def _update_budget(self, take=False, drain=False):
+
+        # Refill for the time since the last update, then take a token if asked and
+        # one is there, or empty the bucket. Returns (taken, tokens left).
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM budget WHERE name = ?", (self._budget_name,)
+                ).fetchone()
+                tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.refill_rate)
+                taken = take and tokens >= 1
+                if taken:
+                    tokens -= 1
+                if drain:
+                    tokens = 0.0
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO budget (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self._budget_name, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return taken, tokens
+
+    def acquire(self):
+        # Take a request token, waiting up to max_wait for one to refill
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            taken, tokens = self._update_budget(take=True)
+            if taken:
+                return True
+            wait = (1 - tokens) / self.refill_rate if self.refill_rate else math.inf
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def remaining(self):
+        return self._update_budget()[1]
+
+    def _cached(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT articles, etag, last_modified, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"articles": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+
+    def _store(self, key, endpoint, params, articles, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, params, articles, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(params, sort_keys=True), json.dumps(articles), etag, last_modified, time.time())
+            )
+            self._conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - NEWSAPI_STALE_MAX_AGE,))
+
+    def _fallback(self, cached):
+        # The last response for this query, if it is not too old to be useful
+        if cached is not None and time.time() - cached["fetched_at"] < NEWSAPI_STALE_MAX_AGE:
+            self._count("stale")
+            return cached["articles"]
+        return None
+
+    def get(self, endpoint, params):
+
+        # Articles for one query, or None if NewsAPI could not be asked and nothing is cached
+        key = _request_key(endpoint, params)
+        cached = self._cached(key)
+        fresh = cached is not None and time.time() - cached["fetched_at"] < self.freshness
+        metrics.cache_event("newsapi", fresh)
+        if fresh:
+            self._count("fresh")
+            return cached["articles"]
+
+        if not self.acquire():
+            self._count("throttled")
+            print(f"NewsAPI request budget spent ({endpoint} {params.get('category') or params.get('q')}); using the cached listing if any")
+            return self._fallback(cached)
+
+        # Revalidate instead of refetching where the server gave us validators
+        headers = {"X-Api-Key": self.api_key}
+        if cached is not None and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        self._count("requests")
+        try:
+            with metrics.span("newsapi", article=params.get("q") or params.get("category")):
+                response = self.session.get(
+                    f"{NEWS_API_BASE}/v2/{endpoint}", params=params, headers=headers, timeout=NEWSAPI_TIMEOUT
+                )
+                metrics.add_bytes(len(response.content))
+        except requests.RequestException as e:
+            self._count("failed")
+            print(f"Error fetching news: {e}")
+            return self._fallback(cached)
+
+        if response.status_code == 304 and cached is not None:
+            self._count("not_modified")
+            self._store(key, endpoint, params, cached["articles"], cached["etag"], cached["last_modified"])
+            return cached["articles"]
+        if response.status_code == 429:
+            # NewsAPI's own count says the quota is gone; stop spending until it refills
+            self._update_budget(drain=True)
+        if response.status_code != 200:
+            self._count("failed")
+            print(f"Error fetching news: {response.status_code}")
+            return self._fallback(cached)
+
+        try:
+            articles = response.json().get("articles", [])
+        except ValueError:
+            # e.g. a captive portal or proxy error page served with a 200
+            self._count("failed")
+            print("Error fetching news: response is not JSON")
+            return self._fallback(cached)
+        self._store(
+            key, endpoint, params, articles, response.headers.get("ETag"), response.headers.get("Last-Modified")
+        )
+        return articles
+
+    def search(self, queries, workers=None):
+        # All (endpoint, params) queries at once, merged into one ranked list
+        workers = min(workers or NEWSAPI_WORKERS, max(len(queries), 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda q: self.get(*q), queries))
+        return merge_articles(results)
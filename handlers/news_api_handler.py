@@ -1,56 +1,156 @@
+import os
 import requests
-from newspaper.api import Article
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from handlers.news_api_client import NewsApiClient, news_queries
+from processors import metrics
+from processors.story_dedup import StoryDeduper, body_signature, headline_signature
+
+# Article fetch tuning; timeouts are (connect, read) seconds per publisher request
+ARTICLE_COUNT = int(os.getenv("NEWS_ARTICLE_COUNT", "3"))
+FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", "8"))
+CONNECT_TIMEOUT = float(os.getenv("NEWS_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("NEWS_READ_TIMEOUT", "15"))
+
+def fetch_full_article(article, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+
+    # Download and parse one candidate, returning None if it has no usable content.
+    # newspaper (and its lxml/nltk stack) is imported here so importing this module stays cheap.
+    from newspaper.api import Article
+
+    news_article = Article(article.get("url"))
+    with metrics.span("article_download", article=article.get("url")):
+        response = requests.get(
+            article.get("url"),
+            headers={"User-Agent": news_article.config.browser_user_agent},
+            timeout=timeout
+        )
+        metrics.add_bytes(len(response.content))
+        response.raise_for_status()
+
+    # Same rule as newspaper's own downloader: let it sniff the charset when
+    # the server did not declare one
+    with metrics.span("article_parse", article=article.get("url")):
+        html = response.content if response.encoding == "ISO-8859-1" else response.text
+        news_article.download(input_html=html)
+        news_article.parse()
+
+    # Validate article has meaningful content
+    if not news_article.text or len(news_article.text) < 100 or article.get("urlToImage") is None:
+        return None
+
+    return {
+        "title": news_article.title,
+        "content": news_article.text,
+        "url": article.get("url"),
+        "urlToImage": article.get("urlToImage"),
+        "publishedAt": article.get("publishedAt")
+    }
+
+def fetch_cached_article(article, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), cache=None):
+
+    # Articles parsed recently are served from the cache without touching the network
+    with metrics.span("fetch_article", article=article["url"]):
+        if cache is None:
+            return fetch_full_article(article, timeout)
+
+        cached = cache.get_article(article["url"])
+        if cached is not None:
+            return cached
+
+        full_article = fetch_full_article(article, timeout)
+        if full_article is not None:
+            cache.put_article(article["url"], full_article)
+        return full_article
 
 # Fetch Tech News with Full Content
-def fetch_tech_news(api_key):
+def fetch_tech_news(api_key, **kwargs):
+    return list(iter_tech_news(api_key, **kwargs))
+
+def iter_tech_news(
+    api_key,
+    category="technology",
+    query=None,
+    article_count=None,
+    max_workers=None,
+    connect_timeout=None,
+    read_timeout=None,
+    cache=None,
+    story_index=None,
+    queries=None,
+    client=None
+):
+    article_count = article_count or ARTICLE_COUNT
+    max_workers = max_workers or FETCH_WORKERS
+    timeout = (connect_timeout or CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT)
+
     # url = f"https://newsapi.org/v2/everything?q=(programming OR coding OR development) AND (features OR updates OR news) AND (languages OR frameworks) NOT (hiring OR jobs OR careers OR vacancies OR Gold OR economics)&from=2025-01-01&to=2025-01-14&language=en&sortBy=publishedAt&apiKey={api_key}"
-    # url for top technology news
-    url = f"https://newsapi.org/v2/top-headlines?category=technology&language=en&apiKey={api_key}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        print(f"Error fetching news: {response.status_code}")
-        return []
-        
-    articles = response.json().get("articles", [])
-    
-    # Sort articles by date, newest first
-    valid_articles = []
-    for article in articles:
-        # Skip removed or empty articles
-        if (article.get("title") == "[Removed]" or 
-            article.get("content") == "[Removed]" or 
-            not article.get("url") or
-            not article.get("publishedAt")):
-            continue
-            
-        valid_articles.append(article)
-    
-    # Sort by publishedAt date descending
-    
-    full_articles = []
+    # Listings for every query (top technology news by default), fetched together,
+    # merged and ranked newest first; repeats within the freshness window are cached
+    own_client = client is None
+    client = client or NewsApiClient(api_key)
+    try:
+        valid_articles = client.search(news_queries(category, query, queries))
+    finally:
+        if own_client:
+            client.close()
+
+    # Drop stories published in a recent reel on the listing's title and description
+    # alone, before paying for any download. Syndicated copies within this listing
+    # are kept as fallbacks until one of them has actually been selected.
+    deduper = StoryDeduper(story_index)
+    unique_articles = []
     for article in valid_articles:
-        try:
-            news_article = Article(article.get("url"))
-            news_article.download()
-            news_article.parse()
-            
-            # Validate article has meaningful content
-            if not news_article.text or len(news_article.text) < 100 or article.get("urlToImage") is None:
-                continue
-                
-            full_articles.append({
-                "title": news_article.title,
-                "content": news_article.text,
-                "urlToImage": article.get("urlToImage"),
-                "publishedAt": article.get("publishedAt")
-            })
-            
-            # Break once we have 3 valid articles
-            if len(full_articles) >= 3:
-                break
-                
-        except Exception as e:
-            print(f"Failed to fetch article from {article.get('url')}: {e}")
+        headline = headline_signature(article)
+        match = deduper.duplicate_headline(headline)
+        if match:
+            print(f"Skipping duplicate story {article['title']!r} (matches {match[0]!r}, {match[1]:.2f})")
             continue
-    
-    return full_articles
\ No newline at end of file
+        unique_articles.append({**article, "headline_signature": headline})
+    valid_articles = unique_articles
+
+    # Fetch candidates concurrently, but select the newest article_count that parse,
+    # so the result does not depend on which publisher happens to answer first.
+    # Each article is yielded as soon as everything newer than it has settled.
+    results = {}
+    settled = 0
+    yielded = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {
+            executor.submit(fetch_cached_article, article, timeout, cache): idx
+            for idx, article in enumerate(valid_articles)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = pending.pop(future)
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    print(f"Failed to fetch article from {valid_articles[idx].get('url')}: {e}")
+                    results[idx] = None
+
+            # Release the settled prefix; stop once it already fills the quota.
+            # Headlines and bodies are checked against what was already selected and
+            # recently published; bodies catch the same wire story under different
+            # headlines. Only selected stories are added, so a copy whose first URL
+            # failed to parse can still be picked.
+            while settled in results and yielded < article_count:
+                full_article = results[settled]
+                if full_article is not None:
+                    headline = valid_articles[settled]["headline_signature"]
+                    body = body_signature(full_article["content"])
+                    match = deduper.duplicate_headline(headline) or deduper.duplicate_body(body)
+                    if match:
+                        print(f"Skipping duplicate story {full_article['title']!r} (matches {match[0]!r}, {match[1]:.2f})")
+                    else:
+                        deduper.add(full_article["url"], full_article["title"], headline, body)
+                        yield {**full_article, "headline_signature": headline, "body_signature": body}
+                        yielded += 1
+                settled += 1
+            if yielded >= article_count:
+                break
+    finally:
+        # Drop queued downloads; in-flight ones end at their timeout without blocking us
+        executor.shutdown(wait=False, cancel_futures=True)
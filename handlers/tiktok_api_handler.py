@@ -1,6 +1,163 @@
+import asyncio
+import json
 import os
+import random
+import time
 import requests
 
+from handlers.tiktok_status_watcher import PublishStatusWatcher
+from processors import metrics
+
+# API_BASE can point at a local stand-in server when exercising uploads offline
+TIKTOK_API_BASE = os.getenv("TIKTOK_API_BASE", "https://open.tiktokapis.com")
+
+# Chunking rules from TikTok's media transfer guide: files under 5 MB go up whole,
+# other chunks are 5-64 MB, and the final chunk absorbs the remainder (up to 128 MB)
+MB = 1024 * 1024
+MIN_CHUNK_SIZE = 5 * MB
+MAX_CHUNK_SIZE = 64 * MB
+MAX_CHUNK_COUNT = 1000
+UPLOAD_CHUNK_SIZE = int(os.getenv("TIKTOK_CHUNK_SIZE", str(10 * MB)))
+UPLOAD_RETRIES = int(os.getenv("TIKTOK_UPLOAD_RETRIES", "5"))
+UPLOAD_BACKOFF = float(os.getenv("TIKTOK_UPLOAD_BACKOFF", "1.0"))
+UPLOAD_TIMEOUT = (10, 120)
+# (connect, read) seconds for the post init and publish calls
+API_TIMEOUT = (10, 30)
+# Upload URLs are valid for an hour; don't try to resume anything older than that
+UPLOAD_URL_TTL = 55 * 60
+
+class _FileRange:
+    # File-like view of bytes [start, start + length) so requests streams a chunk
+    # from disk in small blocks instead of holding it in memory
+    def __init__(self, path, start, length, block_size=64 * 1024):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = length
+        self._length = length
+        self._block_size = block_size
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(min(size, self._block_size))
+        self._remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            block = self.read(self._block_size)
+            if not block:
+                break
+            yield block
+
+    def close(self):
+        self._file.close()
+
+def plan_chunks(video_size, chunk_size=None):
+
+    # Return (chunk_size, total_chunk_count) within TikTok's limits
+    if video_size < MIN_CHUNK_SIZE:
+        return video_size, 1
+    chunk_size = max(chunk_size or UPLOAD_CHUNK_SIZE, MIN_CHUNK_SIZE, -(-video_size // MAX_CHUNK_COUNT))
+    chunk_size = min(chunk_size, MAX_CHUNK_SIZE, video_size)
+    return chunk_size, video_size // chunk_size
+
+def chunk_ranges(video_size, chunk_size, total_chunk_count):
+    # (first byte, last byte) per chunk; the last chunk runs to the end of the file
+    for index in range(total_chunk_count):
+        first = index * chunk_size
+        last = video_size - 1 if index == total_chunk_count - 1 else first + chunk_size - 1
+        yield first, last
+
+def _state_path(video_path):
+    return f"{video_path}.upload.json"
+
+def _load_upload_state(video_path, video_size, chunk_size):
+
+    # Resume state from an interrupted upload of this exact file, if still usable
+    try:
+        with open(_state_path(video_path), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (state.get("video_size") != video_size or
+        state.get("chunk_size") != chunk_size or
+        state.get("mtime") != os.path.getmtime(video_path) or
+        time.time() - state.get("created_at", 0) > UPLOAD_URL_TTL):
+        return None
+    return state
+
+def _save_upload_state(video_path, state):
+    tmp_path = _state_path(video_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _state_path(video_path))
+
+def _clear_upload_state(video_path):
+    if os.path.exists(_state_path(video_path)):
+        os.remove(_state_path(video_path))
+
+def _put_chunk(session, upload_url, video_path, first, last, video_size):
+
+    # PUT one chunk, retrying connection errors, 429 and 5xx with exponential backoff and jitter
+    length = last - first + 1
+    headers = {
+        "Content-Type": "video/mp4",
+        "Content-Length": str(length),
+        "Content-Range": f"bytes {first}-{last}/{video_size}"
+    }
+    for attempt in range(UPLOAD_RETRIES + 1):
+        body = _FileRange(video_path, first, length)
+        try:
+            resp = session.put(upload_url, headers=headers, data=body, timeout=UPLOAD_TIMEOUT)
+            if resp.status_code in [200, 201, 204, 206]:
+                return resp
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            print(f"Chunk {first}-{last} got {resp.status_code}, retrying")
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f"Chunk {first}-{last} failed: {e}, retrying")
+            resp = None
+        finally:
+            body.close()
+        if attempt < UPLOAD_RETRIES:
+            time.sleep(UPLOAD_BACKOFF * (2 ** attempt) * (0.5 + random.random()))
+    return resp
+
+def upload_video_chunks(upload_url, video_path, chunk_size, total_chunk_count, state=None, session=None):
+
+    # Stream the file up chunk by chunk, recording each acknowledged byte so a
+    # later call can resume. Returns (ok, message).
+    session = session or requests.Session()
+    video_size = os.path.getsize(video_path)
+    state = state or {}
+    next_byte = state.get("next_byte", 0)
+
+    started = time.perf_counter()
+    sent = 0
+    for first, last in chunk_ranges(video_size, chunk_size, total_chunk_count):
+        if last < next_byte:
+            continue  # acknowledged by an earlier attempt
+        resp = _put_chunk(session, upload_url, video_path, first, last, video_size)
+        if resp is None or resp.status_code not in [200, 201, 204, 206]:
+            return False, f"Upload failed: {resp.text if resp is not None else 'connection error'}"
+
+        sent += last - first + 1
+        metrics.add_bytes(last - first + 1, "out")
+        if state:
+            state["next_byte"] = last + 1
+            _save_upload_state(video_path, state)
+
+    elapsed = time.perf_counter() - started
+    if sent:
+        print(f"Uploaded {sent} bytes in {elapsed:.1f}s ({sent / MB / max(elapsed, 1e-6):.1f} MiB/s)")
+    return True, "Upload complete"
+
 def post_video_to_tiktok(
     access_token,
     video_path,
@@ -8,88 +165,119 @@ def post_video_to_tiktok(
     privacy_level="SELF_ONLY",
     disable_duet=False,
     disable_comment=False,
-    disable_stitch=False
+    disable_stitch=False,
+    chunk_size=None,
+    status_watcher=None,
+    on_status=None
 ):
-    
+    # With a status_watcher (e.g. in batch mode) the post is handed to the watcher
+    # and this returns right after publishing; otherwise it waits for a final status.
+    # Either way on_status, if given, is called with the watcher's final status.
+
     print(f"Posting video to TikTok: {video_path}")
     file_size = os.path.getsize(video_path)
+    chunk_size, total_chunk_count = plan_chunks(file_size, chunk_size)
 
-    # 1. Initialize post
-    init_url = "https://open.tiktokapis.com/v2/post/publish/video/init/"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json; charset=UTF-8",
     }
-    init_payload = {
-        "post_info": {
-            "title": title,
-            "privacy_level": privacy_level,
-            "disable_duet": disable_duet,
-            "disable_comment": disable_comment,
-            "disable_stitch": disable_stitch
-        },
-        "source_info": {
-            "source": "FILE_UPLOAD",
-            "video_size": file_size,
-            "chunk_size": file_size,     # single-chunk example
-            "total_chunk_count": 1
+
+    # Milestones for init -> upload -> publish -> live latency
+    timestamps = {"init": time.time()}
+
+    # 1. Initialize post, unless an interrupted upload of this file can be resumed
+    state = _load_upload_state(video_path, file_size, chunk_size)
+    if state:
+        publish_id = state["publish_id"]
+        upload_url = state["upload_url"]
+        print(f"Resuming upload of publish_id {publish_id} at byte {state['next_byte']}")
+    else:
+        init_url = f"{TIKTOK_API_BASE}/v2/post/publish/video/init/"
+        init_payload = {
+            "post_info": {
+                "title": title,
+                "privacy_level": privacy_level,
+                "disable_duet": disable_duet,
+                "disable_comment": disable_comment,
+                "disable_stitch": disable_stitch
+            },
+            "source_info": {
+                "source": "FILE_UPLOAD",
+                "video_size": file_size,
+                "chunk_size": chunk_size,
+                "total_chunk_count": total_chunk_count
+            }
         }
-    }
 
-    init_resp = requests.post(init_url, headers=headers, json=init_payload)
-    if init_resp.status_code != 200:
-        print(f"Init failed: {init_resp.text}")
-        return f"Init failed: {init_resp.text}"
+        init_resp = requests.post(init_url, headers=headers, json=init_payload, timeout=API_TIMEOUT)
+        if init_resp.status_code != 200:
+            print(f"Init failed: {init_resp.text}")
+            return f"Init failed: {init_resp.text}"
 
-    init_data = init_resp.json().get("data", {})
-    publish_id = init_data.get("publish_id")
-    upload_url = init_data.get("upload_url")
+        init_data = init_resp.json().get("data", {})
+        publish_id = init_data.get("publish_id")
+        upload_url = init_data.get("upload_url")
 
-    print(f"publish_id: {publish_id}")
-    print(f"upload_url: {upload_url}")
+        print(f"publish_id: {publish_id}")
+        print(f"upload_url: {upload_url}")
 
-    if not upload_url:
-        return f"Publish init error: {init_resp.text}"
+        if not upload_url:
+            return f"Publish init error: {init_resp.text}"
 
-    # 2. Upload the file in one chunk
-    with open(video_path, "rb") as f:
-        chunk_data = f.read()
-    upload_headers = {
-        "Content-Type": "video/mp4",
-        "Content-Length": str(file_size),
-        "Content-Range": f"bytes 0-{file_size-1}/{file_size}"
-    }
-    print(f"Uploading {file_size} bytes to TikTok...")
-    upload_resp = requests.put(upload_url, headers=upload_headers, data=chunk_data)
-    if upload_resp.status_code not in [200, 201, 204]:
-        return f"Upload failed: {upload_resp.text}"
-    print("Upload successful, now publishing...")
+        state = {
+            "publish_id": publish_id,
+            "upload_url": upload_url,
+            "video_size": file_size,
+            "chunk_size": chunk_size,
+            "mtime": os.path.getmtime(video_path),
+            "created_at": time.time(),
+            "next_byte": 0
+        }
+        _save_upload_state(video_path, state)
+
+    # 2. Upload the file in chunks
+    print(f"Uploading {file_size} bytes to TikTok in {total_chunk_count} chunk(s)...")
+    with metrics.span("tiktok_upload", article=publish_id):
+        ok, message = upload_video_chunks(upload_url, video_path, chunk_size, total_chunk_count, state)
+    if not ok:
+        return message
+    _clear_upload_state(video_path)
+    timestamps["uploaded"] = time.time()
 
     print("Upload successful, now publishing...")
 
     # 3. Publish the video
-    publish_url = "https://open.tiktokapis.com/v2/post/publish/"
+    publish_url = f"{TIKTOK_API_BASE}/v2/post/publish/"
     publish_payload = {
         "publish_id": publish_id
     }
-    publish_resp = requests.post(publish_url, headers=headers, json=publish_payload)
+    publish_resp = requests.post(publish_url, headers=headers, json=publish_payload, timeout=API_TIMEOUT)
     if publish_resp.status_code != 200:
         return f"Publish failed: {publish_resp.text}"
-    
-    #4. Check post status
-    status_resp = check_post_status(access_token, publish_id)
-    if status_resp.get("status") != "SUCCESS":
-        return f"Post status check failed: {status_resp.text}"
-    
+    timestamps["published"] = time.time()
+
+    #4. Watch post status until TikTok finishes processing
+    if status_watcher is not None:
+        status_watcher.submit(access_token, publish_id, timestamps, on_status)
+        return f"Uploaded publish_id: {publish_id}, status is being watched"
+
+    watcher = PublishStatusWatcher()
+    try:
+        status = asyncio.run(watcher.watch(access_token, publish_id, timestamps, on_status))
+    finally:
+        watcher.close()
+    if status["status"] not in ["PUBLISH_COMPLETE", "SEND_TO_USER_INBOX"]:
+        return f"Post status check failed: {status['status']} {status['fail_reason'] or ''}".strip()
 
     #5. Return success message
     return f"Successfully uploaded to publish_id: {publish_id}"
 
 def check_post_status(access_token, publish_id):
-    status_url = "https://open.tiktokapis.com/v2/post/publish/status/fetch/"
+    status_url = f"{TIKTOK_API_BASE}/v2/post/publish/status/fetch/"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json; charset=UTF-8"
     }
-    resp = requests.post(status_url, headers=headers, json={"publish_id": publish_id})
-    return resp.json()
\ No newline at end of file
+    resp = requests.post(status_url, headers=headers, json={"publish_id": publish_id}, timeout=API_TIMEOUT)
+    return resp.json()
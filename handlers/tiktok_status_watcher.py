@@ -0,0 +1,143 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Read from the environment here too, since tiktok_api_handler imports this module
+TIKTOK_API_BASE = os.getenv("TIKTOK_API_BASE", "https://open.tiktokapis.com")
+
+# TikTok processes a post for a while after upload; poll status/fetch with
+# exponential backoff and jitter until it reaches one of these states
+TERMINAL_STATUSES = {"PUBLISH_COMPLETE", "FAILED", "SEND_TO_USER_INBOX"}
+STATUS_INITIAL_DELAY = float(os.getenv("TIKTOK_STATUS_INITIAL_DELAY", "2"))
+STATUS_MAX_DELAY = float(os.getenv("TIKTOK_STATUS_MAX_DELAY", "60"))
+STATUS_TIMEOUT = float(os.getenv("TIKTOK_STATUS_TIMEOUT", str(30 * 60)))
+STATUS_POOL_SIZE = int(os.getenv("TIKTOK_STATUS_POOL_SIZE", "8"))
+# Status fetches that failed this way are worth asking again; any other 4xx
+# (expired token, unknown publish_id) will not change with more polling
+RETRYABLE_HTTP_STATUSES = {429}
+
+def publish_latency_metrics(timestamps):
+    # Seconds between the milestones recorded by post_video_to_tiktok and the watcher
+    steps = [("init", "uploaded"), ("uploaded", "published"), ("published", "live"), ("init", "live")]
+    return {
+        f"{start}_to_{end}_s": round(timestamps[end] - timestamps[start], 3)
+        for start, end in steps
+        if start in timestamps and end in timestamps
+    }
+
+class PublishStatusWatcher:
+    # Tracks any number of in-flight publish_ids on one pooled session. Used either
+    # directly with asyncio (watch / watch_many) or as a background thread that
+    # publishers hand ids to without blocking (start / submit / wait_all).
+    def __init__(self, initial_delay=None, max_delay=None, timeout=None):
+        self.initial_delay = initial_delay or STATUS_INITIAL_DELAY
+        self.max_delay = max_delay or STATUS_MAX_DELAY
+        self.timeout = timeout or STATUS_TIMEOUT
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=STATUS_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._loop = None
+        self._thread = None
+        self._futures = []
+
+    def _fetch_status(self, access_token, publish_id):
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json; charset=UTF-8"
+        }
+        resp = self.session.post(
+            f"{TIKTOK_API_BASE}/v2/post/publish/status/fetch/",
+            headers=headers,
+            json={"publish_id": publish_id},
+            timeout=(5, 30)
+        )
+        if resp.status_code == 200:
+            return resp.json().get("data", {})
+        error = f"HTTP {resp.status_code}: {resp.text}"
+        if resp.status_code >= 500 or resp.status_code in RETRYABLE_HTTP_STATUSES:
+            return {"status": None, "error": error}
+        return {"status": "FAILED", "fail_reason": error}
+
+    async def watch(self, access_token, publish_id, timestamps=None, on_status=None):
+        timestamps = dict(timestamps or {})
+        timestamps.setdefault("published", time.time())
+        delay = self.initial_delay
+        deadline = time.monotonic() + self.timeout
+        polls = 0
+
+        while True:
+            try:
+                data = await asyncio.to_thread(self._fetch_status, access_token, publish_id)
+            except requests.RequestException as e:
+                data = {"status": None, "error": str(e)}
+            polls += 1
+            status = data.get("status")
+            if status in TERMINAL_STATUSES:
+                break
+            if time.monotonic() >= deadline:
+                status = "TIMEOUT"
+                break
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, self.max_delay)
+
+        # Only a post that actually went live gets a live latency
+        if status == "PUBLISH_COMPLETE":
+            timestamps["live"] = time.time()
+        result = {
+            "publish_id": publish_id,
+            "status": status,
+            "fail_reason": data.get("fail_reason") or data.get("error"),
+            "polls": polls,
+            "metrics": publish_latency_metrics(timestamps),
+        }
+        print(f"Publish status for {publish_id}: {status} {result['metrics']}")
+        # e.g. record the post's stories once it is live; a failing callback must not
+        # lose the status for wait_all
+        if on_status is not None:
+            try:
+                on_status(result)
+            except Exception as e:
+                print(f"Error handling publish status for {publish_id}: {e}")
+        return result
+
+    async def watch_many(self, access_token, publish_ids, timestamps_by_id=None):
+        timestamps_by_id = timestamps_by_id or {}
+        return await asyncio.gather(*[
+            self.watch(access_token, publish_id, timestamps_by_id.get(publish_id))
+            for publish_id in publish_ids
+        ])
+
+    def start(self):
+        # Run an event loop on a daemon thread so submit() never blocks the caller
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="tiktok-status", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, access_token, publish_id, timestamps=None, on_status=None):
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(
+            self.watch(access_token, publish_id, timestamps, on_status), self._loop
+        )
+        self._futures.append(future)
+        return future
+
+    def wait_all(self):
+        # Block until every submitted publish_id reaches a terminal state
+        return [future.result() for future in self._futures]
+
+    def close(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+        self.session.close()
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import requests
+
+TOKEN_URL = "https://open.tiktokapis.com/v2/oauth/token/"
+
+# Tokens written by tiktok_authentication_server's /callback and kept fresh here,
+# so a long render never ends with an expired access token at the upload step
+TIKTOK_TOKEN_FILE = os.getenv(
+    "TIKTOK_TOKEN_FILE",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "tiktok_token.json")
+)
+# Refresh this long before the access token expires (TikTok issues 24h tokens)
+TOKEN_REFRESH_MARGIN = int(os.getenv("TIKTOK_TOKEN_REFRESH_MARGIN", str(30 * 60)))
+TOKEN_RETRY_INTERVAL = int(os.getenv("TIKTOK_TOKEN_RETRY_INTERVAL", "60"))
+
+def token_record(token_info, now=None):
+    # Turn a token endpoint response into what we store: relative expiries become absolute
+    now = now or time.time()
+    return {
+        "open_id": token_info.get("open_id"),
+        "access_token": token_info.get("access_token"),
+        "expires_at": now + int(token_info.get("expires_in") or 0),
+        "refresh_token": token_info.get("refresh_token"),
+        "refresh_expires_at": now + int(token_info.get("refresh_expires_in") or 0),
+        "scope": token_info.get("scope"),
+        "token_type": token_info.get("token_type"),
+    }
+
+def save_token(record, path=None):
+    # Atomic and owner-only, since the file holds live credentials
+    path = path or TIKTOK_TOKEN_FILE
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_token(path=None):
+    try:
+        with open(path or TIKTOK_TOKEN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def refresh_token_info(client_key, client_secret, refresh_token, session=None):
+    # Exchange a refresh token for a new access token (and possibly a new refresh token)
+    resp = (session or requests).post(
+        TOKEN_URL,
+        data={
+            "client_key": client_key,
+            "client_secret": client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=(5, 30)
+    )
+    token_info = resp.json() if resp.content else {}
+    if resp.status_code != 200 or not token_info.get("access_token"):
+        raise RuntimeError(f"Token refresh failed: {resp.text}")
+    return token_info
+
+class TikTokTokenStore:
+    # Holds the current token in memory. get_access_token() is a lock and a
+    # comparison on the hot path; network refreshes happen ahead of expiry on a
+    # background thread (start_refresher) or, failing that, inline when needed.
+    def __init__(self, path=None, client_key=None, client_secret=None, refresh_margin=None):
+        self.path = path or TIKTOK_TOKEN_FILE
+        self.client_key = client_key or os.getenv("TIKTOK_CLIENT_KEY")
+        self.client_secret = client_secret or os.getenv("TIKTOK_CLIENT_SECRET")
+        self.refresh_margin = TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._record = load_token(self.path)
+
+    def _needs_refresh(self, now=None):
+        now = now or time.time()
+        return self._record is not None and now >= self._record["expires_at"] - self.refresh_margin
+
+    def refresh(self):
+        with self._lock:
+            # Pick up tokens written by the auth server (a fresh login) since we last looked
+            stored = load_token(self.path)
+            if stored and (self._record is None or stored["expires_at"] > self._record["expires_at"]):
+                self._record = stored
+            if not self._needs_refresh():
+                return self._record
+            if time.time() >= self._record.get("refresh_expires_at", 0):
+                raise RuntimeError("TikTok refresh token expired, log in again via the auth server")
+
+            token_info = refresh_token_info(
+                self.client_key, self.client_secret, self._record["refresh_token"], self.session
+            )
+            record = token_record(token_info)
+            record["open_id"] = record["open_id"] or self._record.get("open_id")
+            save_token(record, self.path)
+            self._record = record
+            print(f"Refreshed TikTok access token, valid for {int(record['expires_at'] - time.time())}s")
+            return record
+
+    def get_access_token(self):
+        # Falls back to the static TIKTOK_ACCESS_TOKEN when no login has been stored
+        with self._lock:
+            record = self._record
+            fresh = record is not None and not self._needs_refresh()
+        if fresh:
+            return record["access_token"]
+        if record is None and load_token(self.path) is None:
+            return os.getenv("TIKTOK_ACCESS_TOKEN")
+        return self.refresh()["access_token"]
+
+    def seconds_until_refresh(self):
+        with self._lock:
+            if self._record is None:
+                return None
+            return self._record["expires_at"] - self.refresh_margin - time.time()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            wait = self.seconds_until_refresh()
+            if wait is None:
+                # Nothing stored yet; check again for a login
+                wait = TOKEN_RETRY_INTERVAL
+                self._reload_if_missing()
+            elif wait <= 0:
+                try:
+                    self.refresh()
+                    continue
+                except Exception as e:
+                    print(f"TikTok token refresh failed: {e}")
+                    wait = TOKEN_RETRY_INTERVAL
+            self._stop.wait(min(wait, TOKEN_RETRY_INTERVAL * 10))
+
+    def _reload_if_missing(self):
+        with self._lock:
+            if self._record is None:
+                self._record = load_token(self.path)
+
+    def start_refresher(self):
+        # Keep the token fresh for the lifetime of a long-running process
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="tiktok-token", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.session.close()
@@ -1,216 +1,73 @@
-import requests
-from transformers import pipeline
-import subprocess
+import argparse
+import functools
+import json
 import os
-import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import pysrt
-import unicodedata
+
+# Load environment variables from .env file before the handlers and processors
+# read their settings at import time
+load_dotenv()
+
+# Nothing imported at module level may pull in transformers, torch, whisper or
+# newspaper: the modules below import those where they are first used, so
+# "--help", "publish" or a helper like combine_srt_files start in well under a
+# second. benchmarks/bench_startup.py tracks this per subcommand.
 
 from handlers import (
     news_api_handler as news_api_handler, 
     elevenlabs_api_handler as elevenlabs_api_handler,
+    image_handler,
     tiktok_api_handler as tiktok_api_handler
 )
 from processors import (
     news_data_processor as news_proc, 
-    audio_data_processor as audio_proc
+    audio_data_processor as audio_proc,
+    background_library,
+    media_info,
+    metrics,
+    subtitle_aligner,
+    video_renderer
 )
+from handlers.tiktok_token_store import TikTokTokenStore
+from processors.article_cache import ArticleCache
+from processors.story_dedup import StoryIndex
+from processors.stage_executor import Stage, StagePipeline
 
 
 # Download Main Image
 def download_main_image(image_url, filename="article_image.jpg"):
-    response = requests.get(image_url, stream=True)
-    if response.status_code == 200:
-        with open(filename, "wb") as file:
-            for chunk in response.iter_content(1024):
-                file.write(chunk)
-        return filename
-    else:
-        print(f"Failed to download image: {response.status_code}")
-        return None
+    # Validated, pre-resized and deduplicated by content; PNGs with transparency stay PNG
+    return image_handler.download_image(image_url, filename)
         
-# Replace existing generate_subtitles_with_subsai function
-def generate_subtitles_with_subsai(audio_file, offset=0.0):
-    return audio_proc.transcribe_with_whisper(audio_file, offset)
-
 # Replace existing generate_single_srt function  
 def generate_single_srt(audio_file, output_path, offset=0.0):
     subs = audio_proc.transcribe_with_whisper(audio_file, offset)
     subs.save(output_path)
     return subs
 
-def escape_text(text):
-
-    # Escapes special characters in the text for FFmpeg's drawtext filter.
-    # Converts curly apostrophes to straight ones and escapes single quotes, colons, and backslashes.
-
-    # Normalize text to NFKC to standardize characters
-    text = unicodedata.normalize('NFKC', text)
-    # Escape backslashes first
-    text = text.replace("\\", "\\\\")
-    # Escape single quotes
-    text = text.replace("'", "\\'")
-    # Escape colons
-    text = text.replace(":", " - ")
-    return text
-
-def create_video_with_ffmpeg(voiceover_files, srt_file, background_video, image_files, titles, output="final_reel.mp4"):
-    durations = [audio_proc.get_audio_length(v) for v in voiceover_files]
-
-    offsets = []
-    current_start = 0.0
-    for d in durations:
-        offsets.append((current_start, current_start + d))
-        current_start += d
-
-    # Total video length based on combined voiceovers
-    total_voice_length = offsets[-1][1] if offsets else 0
-
-    total_bg_length = audio_proc.get_audio_length(background_video)
-    
-    # Validate background video length and calculate random start
-    if total_bg_length <= total_voice_length:
-        randomstart = 0  # If background is too short, start from beginning
-    else:
-        max_start = int(total_bg_length - total_voice_length)
-        randomstart = random.randint(0, max_start)
-
-    # Rest of the function remains the same
-    ffmpeg_command = [
-        "ffmpeg",
-        "-ss", str(randomstart),
-        "-i", background_video
-    ]
-
-    # Add all voiceovers
-    for v in voiceover_files:
-        ffmpeg_command.extend(["-i", v])
-
-    # Add all images
-    for img in image_files:
-        ffmpeg_command.extend(["-i", img])
-
-    # Build audio concat filter
-    concat_parts = []
-    for i in range(len(voiceover_files)):
-        concat_parts.append(f"[{i+1}:a]")
-    
-    n = len(voiceover_files)
-    audio_concat = ''.join(concat_parts) + f"concat=n={n}:v=0:a=1[audio_out];"
-
-    # Build video filter to scale and crop background
-    video_filter = (
-        "[0:v]"
-        "scale=1080:1920:force_original_aspect_ratio=increase,"
-        "crop=1080:1920:(in_w-1080)/2:(in_h-1920)/2"
-        "[bg];"
-    )
-
-    # Add title overlays
-    last_label = "bg"
-    for i, title in enumerate(titles):
-        if i >= len(offsets):
-            continue
-        
-        # Skip empty titles
-        if not title.strip():
-            continue
-
-        start_t, end_t = offsets[i]
-        #title_label = f"title{i}"
-
-        # Escape special characters in title
-        escaped_title = escape_text(title)
-        print(f"Escaped Title {i}: {escaped_title}")  # Debugging line
-
-        # Create title overlay using drawtext filter
-        # video_filter += (
-        #     f"[{last_label}]drawtext="
-        #     f"text='{escaped_title}':"
-        #     "fontfile=/System/Library/Fonts/Helvetica.ttc:"
-        #     "fontsize=48:"
-        #     "fontcolor=white:"
-        #     "x=(w-text_w)/2:"
-        #     "y=80:"  # Position from top
-        #     "box=1:"
-        #     "boxcolor=black@0.5:"
-        #     "boxborderw=10:"
-        #     f"enable='between(t,{start_t},{end_t})':"
-        #     f"[{title_label}];"
-        # )
-        # last_label = title_label
-
-    # Continue with image overlays
-    overlay_chains = []
-    for i, _ in enumerate(image_files):
-        img_label = f"img{i}"
-        ov_label = f"ov{i}"
-        image_idx = 1 + n + i  # shift index for images
-
-        # Scale the overlay image to take up more of the screen (e.g., 900 width)
-        video_filter += f"[{image_idx}:v]scale=900:-1[{img_label}];"
-
-        if i < len(offsets):
-            start_t, end_t = offsets[i]
-        else:
-            start_t, end_t = (0, 0)
-
-        overlay_chains.append(
-            f"[{last_label}][{img_label}]overlay=(W-w)/2:(H-h)/4:enable='between(t,{start_t},{end_t})'[{ov_label}];"
-        )
-        last_label = ov_label
-
-    video_filter += "".join(overlay_chains)
-    final_label = last_label if image_files else "bg"
-
-    # Combine all filter parts
-    filter_complex = audio_concat + video_filter
-    print(filter_complex)
-
-    # Generate subtitles using SubsAI for all voiceovers
-    all_subs = []
-    current_offset = 0.0
-    
-    for voice_file in voiceover_files:
-        subs = generate_subtitles_with_subsai(voice_file, current_offset)
-        all_subs.extend(subs)
-        current_offset += audio_proc.get_audio_length(voice_file)
-    
-    # Save combined subtitles
-    srt_path = os.path.abspath(srt_file)
-    combined_subs = pysrt.SubRipFile(all_subs)
-    combined_subs.save(srt_path, encoding='utf-8')
-
-    # Add subtitles using the subtitles filter
-    # Ensure the SRT file path is correct and escape any special characters
-    # It's recommended to provide the absolute path to the SRT file
-    srt_path = os.path.abspath(srt_file).replace('\\', '/')
-    filter_complex += (
-        f"[{final_label}]subtitles='{srt_path}':"
-        "force_style='FontName=Arial,FontSize=24,PrimaryColour=&HFFFFFF&,"
-        "OutlineColour=&H000000&,Outline=2,Shadow=1,MarginV=40,MarginL=20,MarginR=20'"
-        "[v];"
+def create_video_with_ffmpeg(voiceover_files, srt_file, background_video, image_files, output="final_reel.mp4", profile=None, mode=None, bg_start=None, variants=None):
+    # The profile (draft/fast/final, default RENDER_PROFILE) sets the encoder settings;
+    # mode "segments" renders the voiceover segments in parallel (default RENDER_MODE).
+    # variants (e.g. ["preview", "poster"], default RENDER_VARIANTS) are rendered
+    # alongside as final_reel.preview.mp4, final_reel.poster.jpg, ...
+    return video_renderer.render_reel(
+        voiceover_files,
+        srt_file,
+        background_video,
+        image_files,
+        output,
+        profile=profile,
+        mode=mode,
+        bg_start=bg_start,
+        variants=variants
     )
 
-    ffmpeg_command.extend([
-        "-filter_complex", filter_complex,
-        # Use the video with subtitles
-        "-map", "[v]",
-        "-map", "[audio_out]",
-        # Set duration to the end of the last voiceover
-        "-t", str(total_voice_length),
-        "-c:v", "libx264",
-        "-c:a", "aac",
-        "-b:a", "192k",
-        output
-    ])
-
-    try:
-        subprocess.run(ffmpeg_command, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred during FFmpeg execution: {e}")
-
 def combine_srt_files(srt_paths, final_srt_path):
     """Combine multiple SRT files into one"""
     combined_subs = pysrt.SubRipFile()
@@ -219,89 +76,522 @@ def combine_srt_files(srt_paths, final_srt_path):
         combined_subs.extend(subs)
     combined_subs.save(final_srt_path, encoding='utf-8')
 
-if __name__ == "__main__":
-    
-    # Load environment variables from .env file
-    load_dotenv()
-
-    # Fetch API keys from environment variables
-    newsapi_api_key = os.getenv("NEWSAPI_KEY")
-    elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+# Per-article pipeline. Each item is a dict that the stages below fill in:
+# image_file, summary, voiceover_file and finally word-timed segments.
+FOLLOW_VOICE_FILE = "follow_for_more.mp3"
+FOLLOW_TEXT = "Follow for more tech news!"
+SUBTITLE_MODE = os.getenv("SUBTITLE_MODE", "align")
+# Render from pre-normalized backgrounds; a job's background_video may then also be a directory
+BACKGROUND_LIBRARY = os.getenv("BACKGROUND_LIBRARY", "1") == "1"
+
+def reel_sources(articles, workdir="."):
+    idx = -1
+    for idx, article in enumerate(articles):
+        yield {
+            "idx": idx,
+            "workdir": workdir,
+            "title": article['title'],
+            "content": article['content'] or article.get('description'),
+            "url": article.get('url'),
+            "image_url": article.get('urlToImage'),
+            # MinHash signatures, recorded in the story index once the reel is published
+            "headline_signature": article.get('headline_signature'),
+            "body_signature": article.get('body_signature'),
+            "summary": None,
+            "voiceover_file": os.path.join(workdir, f"voiceover_{idx}.mp3"),
+        }
+    # The outro always comes last; its voiceover and transcript are cached after the first run
+    yield {
+        "idx": idx + 1,
+        "workdir": workdir,
+        "title": "",
+        "content": None,
+        "url": None,
+        "image_url": None,
+        "summary": FOLLOW_TEXT,
+        "voiceover_file": os.path.join(workdir, FOLLOW_VOICE_FILE),
+    }
+
+def download_image_stage(item):
+    if item["image_url"]:
+        item["image_file"] = download_main_image(
+            item["image_url"],
+            filename=os.path.join(item["workdir"], f"article_image_{item['idx']}.jpg")
+        )
+    return item
+
+def summarize_stage(items, summarizer, article_cache=None):
+    # Batch whatever articles are waiting; the outro already has its text
+    pending = [item for item in items if item["summary"] is None]
+    summaries = news_proc.summarize_articles(
+        [item["content"] for item in pending],
+        summarizer,
+        cache=article_cache,
+        urls=[item["url"] for item in pending]
+    )
+    for item, summary in zip(pending, summaries):
+        item["summary"] = summary
+    return items
+
+def synthesize_stage(item, elevenlabs_api_key):
+    if not elevenlabs_api_handler.generate_voiceover(elevenlabs_api_key, item["summary"], item["voiceover_file"]):
+        raise RuntimeError(f"voiceover failed for {item['voiceover_file']}")
+    return item
+
+def transcribe_stage(item):
+    # In "align" mode the known summary is aligned to the audio; whisper ASR is the fallback
+    if SUBTITLE_MODE == "align":
+        alignment = elevenlabs_api_handler.load_alignment(item["summary"])
+        item["segments"] = subtitle_aligner.align_words(item["voiceover_file"], item["summary"], alignment)
+    else:
+        item["segments"] = audio_proc.transcribe_words(item["voiceover_file"])
+    return item
+
+def build_reel_pipeline(summarizer, elevenlabs_api_key, article_cache=None):
+    # Network stages get thread pools; model stages get one dedicated worker each
+    return StagePipeline([
+        Stage("download_image", download_image_stage, workers=image_handler.IMAGE_WORKERS),
+        Stage(
+            "summarize",
+            functools.partial(summarize_stage, summarizer=summarizer, article_cache=article_cache),
+            batch_size=news_proc.SUMMARY_BATCH_SIZE
+        ),
+        Stage(
+            "synthesize",
+            functools.partial(synthesize_stage, elevenlabs_api_key=elevenlabs_api_key),
+            workers=elevenlabs_api_handler.TTS_WORKERS
+        ),
+        Stage("transcribe", transcribe_stage),
+    ])
 
+def report_reel_stats(reel_started):
+    # Wall time since the reel started and peak resident memory (ru_maxrss is KiB on Linux)
+    wall_time = time.perf_counter() - reel_started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Reel wall time: {wall_time:.1f}s, peak RSS: {peak_rss_mb:.0f} MiB")
+
+# A reel job; batch.py runs many of these against the same resident models
+DEFAULT_REEL_JOB = {
+    "name": "tech",
+    "category": "technology",
+    "query": None,
+    # Several NewsAPI queries merged into one listing, e.g.
+    # [{"category": "technology"}, {"category": "science"}, {"query": "open source"}]
+    "queries": None,
+    "background_video": "stock_video.mp4",
+    "workdir": ".",
+    "output": "final_reel.mp4",
+    "profile": video_renderer.RENDER_PROFILE,
+    "render_mode": video_renderer.RENDER_MODE,
+    "variants": video_renderer.RENDER_VARIANTS,
+    "caption": "Tech news reel",
+    "publish": True,
+}
+
+def load_summarizer():
+    # SUMMARY_BACKEND picks fp32, int8 or ONNX Runtime; transformers is only imported
+    # here, so only commands that summarize pay for it
+    return news_proc.load_summarizer()
+
+def load_models():
     # Initialize the summarizer once
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-
-    tech_articles = news_api_handler.fetch_tech_news(newsapi_api_key)
-    
-    voiceover_files = []
-    image_files = []
-    subtitles = []
-    titles = []
-
-    for idx, article in enumerate(tech_articles):
-        title = article['title']
-        titles.append(title)
-        content = article['content'] or article['description']
-        image_url = article.get('urlToImage')
-        
-        summary = news_proc.summarize_article(content, summarizer)
-
-        # Generate voiceover
-        voiceover_file = f"voiceover_{idx}.mp3"
-        elevenlabs_api_handler.generate_voiceover(elevenlabs_api_key, summary, voiceover_file)
-        voiceover_files.append(voiceover_file)
-
-        # Collect subtitle text
-        subtitles.append(summary)
-
-        # Download article image
-        if image_url:
-            image_file = download_main_image(image_url, filename=f"article_image_{idx}.jpg")
-            if image_file:
-                image_files.append(image_file)
+    summarizer = load_summarizer()
+
+    # Load the whisper model once up front; every transcription reuses it
+    if os.getenv("WHISPER_WARM_START", "1") == "1":
+        audio_proc.warm_whisper_models()
+    return summarizer
+
+def open_article_cache():
+    # Local cache of parsed articles and summaries, shared across runs
+    if os.getenv("ARTICLE_CACHE", "1") == "1":
+        return ArticleCache()
+    return None
+
+def open_story_index():
+    # Stories from recently published reels, so the next reels don't repeat them
+    if os.getenv("STORY_INDEX", "1") == "1":
+        return StoryIndex()
+    return None
+
+def record_published_stories(story_index, items):
+    for item in items:
+        # The outro has no URL
+        if item.get("url"):
+            story_index.record(item["url"], item["title"], item.get("headline_signature"), item.get("body_signature"))
+
+def open_token_store():
+    # TikTok tokens saved by the auth server, refreshed before they expire
+    return TikTokTokenStore()
+
+def build_reel_assets(job, summarizer, article_cache=None, token_store=None, story_index=None):
+
+    # Fetch, summarize, synthesize, download images and transcribe as overlapping stages
+    job = {**DEFAULT_REEL_JOB, **job}
+
+    # Fail before any expensive work if the reel could not be published anyway
+    if job["publish"] and token_store is not None and not token_store.get_access_token():
+        raise RuntimeError("No TikTok access token; log in via the auth server or set TIKTOK_ACCESS_TOKEN")
+
+    workdir = job["workdir"]
+    os.makedirs(workdir, exist_ok=True)
+
+    reel_pipeline = build_reel_pipeline(summarizer, os.getenv("ELEVENLABS_API_KEY"), article_cache)
+    reel_items = reel_pipeline.run(
+        reel_sources(
+            news_api_handler.iter_tech_news(
+                os.getenv("NEWSAPI_KEY"),
+                category=job["category"],
+                query=job["query"],
+                queries=job["queries"],
+                cache=article_cache,
+                story_index=story_index
+            ),
+            workdir
+        ),
+        source_name="fetch"
+    )
 
-    # Generate "Follow for more" voiceover and subtitle
-    follow_voice_file = "follow_for_more.mp3"
-    follow_text = "Follow for more tech news!"
-    
-    if not os.path.exists(follow_voice_file):
-        elevenlabs_api_handler.generate_voiceover(elevenlabs_api_key, follow_text, follow_voice_file)
-    
-    voiceover_files.append(follow_voice_file)
-    subtitles.append(follow_text)
+    srt_file = write_reel_subtitles(reel_items, workdir)
+    assets = reel_assets(job, reel_items, srt_file, token_store, reel_pipeline)
+    assets["story_index"] = story_index
+    return assets
 
-    # Add empty title for "Follow for more" segment
-    titles.append("")
+def write_reel_subtitles(reel_items, workdir):
 
-    # Create SRT file
-    srt_filename = "subtitles.srt"
-    
-    # Generate individual SRTs
+    # Build individual SRTs from the transcripts the pipeline produced
+    voiceover_files = [item["voiceover_file"] for item in reel_items]
     srt_paths = []
     current_offset = 0.0
     
-    for idx, voiceover in enumerate(voiceover_files):
-        srt_path = f"subtitle_{idx}.srt"
-        generate_single_srt(voiceover, srt_path, current_offset)
+    for item, info in zip(reel_items, media_info.probe_many(voiceover_files)):
+        srt_path = os.path.join(workdir, f"subtitle_{item['idx']}.srt")
+        audio_proc.words_to_srt(item["segments"], current_offset).save(srt_path)
         srt_paths.append(srt_path)
-        current_offset += audio_proc.get_audio_length(voiceover)
+        current_offset += info.duration
     
     # Combine all SRTs
-    combine_srt_files(srt_paths, "final_subtitles.srt")
-    
+    srt_file = os.path.join(workdir, "final_subtitles.srt")
+    combine_srt_files(srt_paths, srt_file)
+    return srt_file
+
+def reel_assets(job, reel_items, srt_file, token_store=None, reel_pipeline=None, background=None):
+    return {
+        "job": job,
+        "pipeline": reel_pipeline,
+        "items": reel_items,
+        "background": background,
+        "voiceover_files": [item["voiceover_file"] for item in reel_items],
+        # One per segment, None where the image was rejected or missing, so later
+        # images stay on their own article
+        "image_files": [item.get("image_file") for item in reel_items],
+        "srt_file": srt_file,
+        "token_store": token_store,
+    }
+
+def pick_reel_background(job, assets):
+
+    # Background clip and start point for the reel. A re-render keeps the earlier
+    # pick (recorded in assets["background"]), so incremental renders can reuse segments.
+    previous = assets.get("background")
+    if previous and previous["source"] == job["background_video"] and os.path.exists(previous["path"]):
+        return previous["path"], previous["start"]
+
+    total_length = sum(info.duration for info in media_info.probe_many(assets["voiceover_files"]))
+    if BACKGROUND_LIBRARY:
+        # A pre-normalized copy of the clip (or the least recently used clip of a
+        # directory) and a random keyframe to start from
+        background_video, bg_start = background_library.pick_background(job["background_video"], total_length)
+    else:
+        background_video = job["background_video"]
+        bg_start = video_renderer.background_start(media_info.probe(background_video).duration, total_length)
+    assets["background"] = {"source": job["background_video"], "path": background_video, "start": bg_start}
+    return background_video, bg_start
+
+def render_reel_output(assets):
+    job = assets["job"]
+    output = os.path.join(job["workdir"], job["output"])
+
+    # A reel or variant left in the workdir by an earlier run must not outlive a failed render
+    variants = video_renderer.RENDER_VARIANTS if job["variants"] is None else job["variants"]
+    for path in [output] + [path for _, path in video_renderer.variant_outputs(output, variants)]:
+        if os.path.exists(path):
+            os.remove(path)
+
     # Create video with combined subtitles
-    create_video_with_ffmpeg(
-        voiceover_files, 
-        "final_subtitles.srt", 
-        "stock_video.mp4", 
-        image_files,
-        titles
-    )
+    render_started = time.perf_counter()
+    with metrics.span("render", article=job["name"]):
+        background_video, bg_start = pick_reel_background(job, assets)
+        rendered = create_video_with_ffmpeg(
+            assets["voiceover_files"], 
+            assets["srt_file"], 
+            background_video, 
+            assets["image_files"],
+            output=output,
+            profile=job["profile"],
+            mode=job["render_mode"],
+            bg_start=bg_start,
+            variants=job["variants"]
+        )
+        if rendered:
+            metrics.add_bytes(os.path.getsize(output), "out")
+    if assets.get("pipeline") is not None:
+        assets["pipeline"].record("render", render_started, time.perf_counter())
+    # Never hand on a reel from an earlier run as this one's
+    if not rendered:
+        raise RuntimeError(f"Render of {output} failed")
+    return output
+
+def publish_reel_output(job, output, token_store=None, status_watcher=None, story_index=None, items=None):
+    def record_if_live(status):
+        # These stories are only taken once TikTok has actually published the post;
+        # with a status watcher that is after this function has returned
+        if status["status"] == "PUBLISH_COMPLETE":
+            record_published_stories(story_index, items)
+
+    with metrics.span("publish", article=job["name"]):
+        # In-memory unless the token is about to expire and no refresher got to it first
+        access_token = token_store.get_access_token() if token_store else os.getenv("TIKTOK_ACCESS_TOKEN")
+        result = tiktok_api_handler.post_video_to_tiktok(
+            access_token, output, job["caption"], status_watcher=status_watcher,
+            on_status=record_if_live if story_index is not None and items else None
+        )
+    print(f"[{job['name']}] {result}")
+    return result
 
-    access_token = os.getenv("TIKTOK_ACCESS_TOKEN")
+def render_and_publish_reel(assets, status_watcher=None):
+    job = assets["job"]
+    output = render_reel_output(assets)
 
     # Post video to TikTok
-    tiktok_api_handler.post_video_to_tiktok(access_token, "final_reel.mp4", "Tech news reel")
-    
+    if job["publish"]:
+        publish_reel_output(
+            job, output, assets.get("token_store"), status_watcher, assets.get("story_index"), assets.get("items")
+        )
+
+    if assets.get("pipeline") is not None:
+        for stage_name, stage_timing in assets["pipeline"].timings().items():
+            print(f"[{job['name']}] Stage {stage_name}: {stage_timing}")
+    return output
+
+# Command line. "all" (the default) runs the whole reel in one process; the other
+# subcommands run one step each against the reel manifest in the job's workdir, so
+# e.g. a render can be redone without loading BART or whisper.
+#
+#   python main.py fetch --category science
+#   python main.py summarize && python main.py voice && python main.py subtitle
+#   python main.py render --profile draft
+#   python main.py publish [--video some.mp4]
+#
+# For an editorial fix, edit the summary in reel.json and rerun voice, subtitle and
+# "render --render-mode incremental": unchanged voiceovers, transcripts and
+# segments all come from their caches, so only the edited article is redone.
+REEL_MANIFEST = "reel.json"
+COMMANDS = ["fetch", "summarize", "voice", "subtitle", "render", "publish", "all"]
+
+# Heavy third-party modules each command needs; they are imported up front so a
+# missing one fails before any work is done, and so --imports-only shows what a
+# command really costs to start
+COMMAND_DEPENDENCIES = {
+    "fetch": ["newspaper"],
+    # transformers is imported when a summary is actually missing from the article cache
+    "summarize": [],
+    "voice": [],
+    # In "align" mode whisper is only loaded if ElevenLabs' timings are unusable
+    "subtitle": [] if SUBTITLE_MODE == "align" else ["whisper"],
+    "render": [],
+    "publish": [],
+    "all": ["newspaper", "transformers", "torch", "whisper"],
+}
+
+def import_command_dependencies(command):
+    for module in COMMAND_DEPENDENCIES[command]:
+        try:
+            __import__(module)
+        except ImportError as e:
+            raise SystemExit(f"'{command}' needs {module}: {e} (pip install -r requirements.txt)")
+
+def manifest_path(workdir):
+    return os.path.join(workdir, REEL_MANIFEST)
+
+def load_manifest(workdir):
+    path = manifest_path(workdir)
+    if not os.path.exists(path):
+        raise SystemExit(f"No reel manifest at {path}; run 'python main.py fetch' first")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(workdir, manifest):
+    # Word segments live in the transcript cache; the manifest only keeps file paths and text
+    manifest = {
+        **manifest,
+        "items": [{k: v for k, v in item.items() if k != "segments"} for item in manifest["items"]],
+    }
+    os.makedirs(workdir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=workdir, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path(workdir))
+
+def _require(manifest, key, command):
+    missing = [item["idx"] for item in manifest["items"] if not item.get(key)]
+    if missing:
+        raise SystemExit(f"Items {missing} have no {key}; run 'python main.py {command}' first")
+
+def fetch_command(job):
+    article_cache = open_article_cache()
+    articles = news_api_handler.iter_tech_news(
+        os.getenv("NEWSAPI_KEY"),
+        category=job["category"],
+        query=job["query"],
+        queries=job["queries"],
+        cache=article_cache,
+        story_index=open_story_index()
+    )
+    os.makedirs(job["workdir"], exist_ok=True)
+    items = list(reel_sources(articles, job["workdir"]))
+    with ThreadPoolExecutor(max_workers=image_handler.IMAGE_WORKERS) as executor:
+        items = list(executor.map(download_image_stage, items))
+    save_manifest(job["workdir"], {"job": job, "items": items})
+    print(f"Fetched {len(items) - 1} articles into {manifest_path(job['workdir'])}")
+
+def summarize_command(job):
+    manifest = load_manifest(job["workdir"])
+    article_cache = open_article_cache()
+    # No summarizer given: summarize_articles only loads BART if some article has
+    # neither a summary nor a cached one
+    summarize_stage(manifest["items"], None, article_cache)
+    save_manifest(job["workdir"], manifest)
+
+def voice_command(job):
+    manifest = load_manifest(job["workdir"])
+    _require(manifest, "summary", "summarize")
+    items = manifest["items"]
+    results = elevenlabs_api_handler.generate_voiceovers(
+        os.getenv("ELEVENLABS_API_KEY"),
+        [item["summary"] for item in items],
+        [item["voiceover_file"] for item in items]
+    )
+    failed = [item["voiceover_file"] for item, result in zip(items, results) if not result]
+    if failed:
+        raise SystemExit(f"Voiceover failed for {failed}")
+    save_manifest(job["workdir"], manifest)
+
+def subtitle_command(job):
+    manifest = load_manifest(job["workdir"])
+    _require(manifest, "summary", "summarize")
+    for item in manifest["items"]:
+        if not os.path.exists(item["voiceover_file"]):
+            raise SystemExit(f"Missing {item['voiceover_file']}; run 'python main.py voice' first")
+        transcribe_stage(item)
+    manifest["srt_file"] = write_reel_subtitles(manifest["items"], job["workdir"])
+    save_manifest(job["workdir"], manifest)
+
+def render_command(job):
+    manifest = load_manifest(job["workdir"])
+    if not manifest.get("srt_file"):
+        raise SystemExit("No subtitles yet; run 'python main.py subtitle' first")
+    assets = reel_assets(job, manifest["items"], manifest["srt_file"], background=manifest.get("background"))
+    # Forget the earlier reel first, so 'publish' cannot pick it up if this render fails
+    manifest.pop("output", None)
+    save_manifest(job["workdir"], manifest)
+    try:
+        manifest["output"] = render_reel_output(assets)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    manifest["background"] = assets["background"]
+    save_manifest(job["workdir"], manifest)
+
+def publish_command(job, video=None):
+    items = None
+    if video is None:
+        manifest = load_manifest(job["workdir"])
+        video, items = manifest.get("output"), manifest.get("items")
+        if not video:
+            raise SystemExit("Nothing rendered yet; run 'python main.py render' or pass --video")
+    token_store = open_token_store()
+    if not token_store.get_access_token():
+        raise SystemExit("No TikTok access token; log in via the auth server or set TIKTOK_ACCESS_TOKEN")
+    publish_reel_output(job, video, token_store, story_index=open_story_index(), items=items)
+
+def all_command(job):
+    summarizer = load_models()
+    article_cache = open_article_cache()
+    token_store = open_token_store()
+
+    assets = build_reel_assets(job, summarizer, article_cache, token_store, open_story_index())
+    try:
+        output = render_and_publish_reel(assets)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    # Leave a manifest behind so single steps can be redone, e.g. after an editorial fix
+    save_manifest(job["workdir"], {
+        "job": job,
+        "items": assets["items"],
+        "srt_file": assets["srt_file"],
+        "output": output,
+        "background": assets["background"],
+    })
 
     print("Tech news reel with subtitles created!")
+    if article_cache is not None:
+        print(f"Article cache today: {article_cache.stats()}")
+
+def build_parser():
+    # Job options go on every subcommand, so they can follow its name. Unset options are
+    # left out of the namespace, so a subcommand's defaults never mask earlier values.
+    job_options = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    job_options.add_argument("--workdir", help=f"Directory for the reel's files (default {DEFAULT_REEL_JOB['workdir']})")
+    job_options.add_argument("--category", help="NewsAPI top-headlines category")
+    job_options.add_argument("--query", help="NewsAPI search query instead of top headlines")
+    job_options.add_argument("--background", dest="background_video", help="Background clip or directory of clips")
+    job_options.add_argument("--output", help="Output file name inside the workdir")
+    job_options.add_argument("--profile", choices=sorted(video_renderer.RENDER_PROFILES), help="Render profile")
+    job_options.add_argument("--render-mode", choices=["single", "segments", "incremental"],
+                             help="Render in one pass, per segment, or per segment reusing unchanged ones")
+    job_options.add_argument("--variants", type=lambda value: [v for v in value.split(",") if v],
+                             help=f"Also render these, comma-separated: {', '.join(video_renderer.OUTPUT_VARIANTS)}")
+    job_options.add_argument("--caption", help="TikTok caption")
+    job_options.add_argument("--no-publish", dest="publish", action="store_false", help="With 'all', stop after rendering")
+    job_options.add_argument("--imports-only", action="store_true",
+                             help="Import what the command needs and exit (startup time checks)")
+
+    parser = argparse.ArgumentParser(description="Make a tech news reel", parents=[job_options])
+    subcommands = parser.add_subparsers(dest="command", metavar="command")
+    subcommands.add_parser("fetch", parents=[job_options], help="Fetch articles and their images")
+    subcommands.add_parser("summarize", parents=[job_options], help="Summarize the fetched articles")
+    subcommands.add_parser("voice", parents=[job_options], help="Synthesize voiceovers for the summaries")
+    subcommands.add_parser("subtitle", parents=[job_options], help="Time subtitles to the voiceovers")
+    subcommands.add_parser("render", parents=[job_options], help="Render the reel")
+    publish = subcommands.add_parser("publish", parents=[job_options], help="Post the rendered reel to TikTok")
+    publish.add_argument("--video", default=None, help="Publish this file instead of the workdir's rendered reel")
+    subcommands.add_parser("all", parents=[job_options], help="Run every step (the default)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    command = args.command or "all"
+    import_command_dependencies(command)
+    if getattr(args, "imports_only", False):
+        return
+
+    overrides = {
+        key: getattr(args, key)
+        for key in ("workdir", "category", "query", "background_video", "output", "profile", "variants", "caption", "publish")
+        if hasattr(args, key)
+    }
+    if hasattr(args, "render_mode"):
+        overrides["render_mode"] = args.render_mode
+    job = {**DEFAULT_REEL_JOB, **overrides}
+
+    started = time.perf_counter()
+    if command == "publish":
+        publish_command(job, getattr(args, "video", None))
+    else:
+        globals()[f"{command}_command"](job)
+    report_reel_stats(started)
+    metrics.get_recorder().report()
+    metrics.get_recorder().export()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
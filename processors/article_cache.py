@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from processors import metrics
+
+# SQLite cache for parsed articles and their summaries.
+# Articles are keyed by URL and expire after ARTICLE_CACHE_TTL seconds; summaries
+# are keyed by URL plus a hash of the extracted text, so an edited article is
+# re-summarized while an unchanged one never touches the model again, and by the
+# summarizer (backend and model) that wrote them.
+ARTICLE_CACHE_PATH = os.getenv(
+    "ARTICLE_CACHE_PATH",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "articles.sqlite3")
+)
+ARTICLE_CACHE_TTL = float(os.getenv("ARTICLE_CACHE_TTL", str(6 * 60 * 60)))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 60 * 60)))
+ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "2000"))
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+class ArticleCache:
+    def __init__(self, path=None, article_ttl=None, summary_ttl=None, max_entries=None):
+        self.path = path or ARTICLE_CACHE_PATH
+        self.article_ttl = ARTICLE_CACHE_TTL if article_ttl is None else article_ttl
+        self.summary_ttl = SUMMARY_CACHE_TTL if summary_ttl is None else summary_ttl
+        self.max_entries = max_entries or ARTICLE_CACHE_MAX_ENTRIES
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Fetch workers and the main thread share one connection behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS summaries (
+                    url TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    summarizer TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    model_seconds REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (url, content_hash, summarizer)
+                );
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    day TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0,
+                    saved_seconds REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, kind)
+                );
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _count(self, kind, hit, saved_seconds=0.0):
+        metrics.cache_event(kind, hit)
+        self._conn.execute(
+            "INSERT INTO cache_stats (day, kind) VALUES (?, ?) ON CONFLICT(day, kind) DO NOTHING",
+            (date.today().isoformat(), kind)
+        )
+        column = "hits" if hit else "misses"
+        self._conn.execute(
+            f"UPDATE cache_stats SET {column} = {column} + 1, saved_seconds = saved_seconds + ? "
+            "WHERE day = ? AND kind = ?",
+            (saved_seconds, date.today().isoformat(), kind)
+        )
+
+    def _evict(self, table, ttl):
+        # Drop expired rows, then keep the table within max_entries by least recent use
+        self._conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (time.time() - ttl,))
+        self._conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN ("
+            f"SELECT rowid FROM {table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def get_article(self, url):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM articles WHERE url = ? AND created_at >= ?",
+                (url, now - self.article_ttl)
+            ).fetchone()
+            if row is None:
+                self._count("article", hit=False)
+                return None
+            self._conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (now, url))
+            self._count("article", hit=True)
+        return json.loads(row[0])
+
+    def put_article(self, url, article):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (url, content_hash, data, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, content_hash(article.get("content")), json.dumps(article), now, now)
+            )
+            self._evict("articles", self.article_ttl)
+
+    def get_summary(self, url, text, summarizer=""):
+        now = time.time()
+        key = (url or "", content_hash(text), summarizer)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT summary, model_seconds FROM summaries "
+                "WHERE url = ? AND content_hash = ? AND summarizer = ? AND created_at >= ?",
+                (*key, now - self.summary_ttl)
+            ).fetchone()
+            if row is None:
+                self._count("summary", hit=False)
+                return None
+            self._conn.execute(
+                "UPDATE summaries SET accessed_at = ? WHERE url = ? AND content_hash = ? AND summarizer = ?",
+                (now, *key)
+            )
+            # A hit saves the model time the summary originally cost
+            self._count("summary", hit=True, saved_seconds=row[1])
+        return row[0]
+
+    def put_summary(self, url, text, summary, model_seconds=0.0, summarizer=""):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries "
+                "(url, content_hash, summarizer, summary, model_seconds, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url or "", content_hash(text), summarizer, summary, model_seconds, now, now)
+            )
+            self._evict("summaries", self.summary_ttl)
+
+    def stats(self, day=None):
+
+        # Hit/miss counters and model seconds saved, per cache kind, for one day
+        day = day or date.today().isoformat()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, hits, misses, saved_seconds FROM cache_stats WHERE day = ?",
+                (day,)
+            ).fetchall()
+        return {
+            kind: {"hits": hits, "misses": misses, "saved_seconds": round(saved, 2)}
+            for kind, hits, misses, saved in rows
+        }
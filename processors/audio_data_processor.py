@@ -1,25 +1,101 @@
 import pysrt
-import whisper
-import json
-import subprocess
+import os
+import threading
+from collections import OrderedDict
+
+from processors import media_info, metrics, transcript_cache
+
+# Whisper model registry shared by every caller in the process.
+# Models are keyed by (name, device, compute_type) and evicted LRU once more
+# than WHISPER_MODEL_CACHE_SIZE distinct models have been loaded.
+DEFAULT_WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv("WHISPER_MODEL_CACHE_SIZE", "2"))
+
+_whisper_models = OrderedDict()
+_whisper_registry_lock = threading.Lock()
+# One lock per model key, so concurrent first requests load a model only once
+# and worker threads never run inference on the same model at the same time.
+_whisper_model_locks = {}
+
+
+def _whisper_model_key(name, device, compute_type):
+    if device is None:
+        device = os.getenv("WHISPER_DEVICE") or None
+    if compute_type is None:
+        compute_type = os.getenv("WHISPER_COMPUTE_TYPE", "float32")
+    return (name or DEFAULT_WHISPER_MODEL, device, compute_type)
+
+
+def get_whisper_model(name=None, device=None, compute_type=None):
+
+    # Return a loaded whisper model and the lock guarding it, loading it on first use
+    key = _whisper_model_key(name, device, compute_type)
+
+    with _whisper_registry_lock:
+        model_lock = _whisper_model_locks.setdefault(key, threading.Lock())
+
+    with model_lock:
+        with _whisper_registry_lock:
+            model = _whisper_models.get(key)
+            if model is not None:
+                _whisper_models.move_to_end(key)
+                return model, model_lock
+
+        # whisper pulls in torch; import it on first load, not when this module is imported
+        import whisper
+
+        model_name, model_device, _ = key
+        model = whisper.load_model(model_name, device=model_device)
+
+        with _whisper_registry_lock:
+            _whisper_models[key] = model
+            _whisper_models.move_to_end(key)
+            while len(_whisper_models) > max(WHISPER_MODEL_CACHE_SIZE, 1):
+                evicted_key, _ = _whisper_models.popitem(last=False)
+                print(f"Evicted whisper model {evicted_key} from cache")
+
+    return model, model_lock
+
+
+def warm_whisper_models(names=None, device=None, compute_type=None):
+
+    # Load models ahead of time, e.g. at startup before the first reel is transcribed
+    for name in names or [DEFAULT_WHISPER_MODEL]:
+        get_whisper_model(name, device, compute_type)
+
 
 def get_audio_length(filepath):
 
-    # Return length in seconds of an audio file.
-    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", filepath]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode == 0:
-        info = json.loads(result.stdout)
-        return float(info["format"]["duration"])
-    return 0.0
+    # Return length in seconds of an audio file (probed once per file version)
+    return media_info.probe(filepath).duration
 
-def transcribe_with_whisper(audio_file, offset=0.0):
+def transcribe_words(audio_file, model_name=None, device=None, compute_type=None, use_cache=True):
 
-    # Transcribe audio file using whisper with shorter, more precise segments
-    model = whisper.load_model("base")
+    # Return word-timed segments for an audio file, transcribing at most once per unique audio
+    audio_hash = transcript_cache.audio_content_hash(audio_file)
+    key_name, _, model_compute_type = _whisper_model_key(model_name, device, compute_type)
+    transcript = transcript_cache.load_transcript(audio_hash, "whisper", key_name) if use_cache else None
+    if transcript is not None:
+        return transcript["segments"]
+
+    model, model_lock = get_whisper_model(model_name, device, compute_type)
     
     # Transcribe with word-level timestamps
-    result = model.transcribe(audio_file, word_timestamps=True)
+    with model_lock, metrics.span("whisper_asr", article=os.path.basename(audio_file)):
+        result = model.transcribe(
+            audio_file,
+            word_timestamps=True,
+            fp16=(model_compute_type == "float16")
+        )
+
+    if not use_cache:
+        return result["segments"]
+    transcript = transcript_cache.save_transcript(
+        audio_hash, result["segments"], source="whisper", model=key_name, mode="whisper"
+    )
+    return transcript["segments"]
+
+def words_to_srt(segments, offset=0.0):
     
     # Convert to srt format with shorter segments
     subs = pysrt.SubRipFile()
@@ -28,7 +104,7 @@ def transcribe_with_whisper(audio_file, offset=0.0):
     current_start = None
     word_count = 0
     
-    for segment in result["segments"]:
+    for segment in segments:
         for word_info in segment["words"]:
             word = word_info["word"].strip()
             if current_start is None:
@@ -55,4 +131,10 @@ def transcribe_with_whisper(audio_file, offset=0.0):
                 current_start = None
                 word_count = 0
     
-    return subs
\ No newline at end of file
+    return subs
+
+def transcribe_with_whisper(audio_file, offset=0.0, model_name=None, device=None, compute_type=None):
+
+    # Transcribe audio file using whisper with shorter, more precise segments
+    segments = transcribe_words(audio_file, model_name, device, compute_type)
+    return words_to_srt(segments, offset)
\ No newline at end of file
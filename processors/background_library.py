@@ -0,0 +1,174 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+
+from processors import media_info
+from processors.video_renderer import REEL_WIDTH, REEL_HEIGHT
+
+# Stock backgrounds are transcoded once to the reel frame (1080x1920) at a fixed
+# frame rate with a short, fixed GOP, so renders skip the scale/crop pass and can
+# seek straight to a keyframe. The index records each clip's duration and
+# keyframe times, plus when it was last used for least-recently-used rotation.
+BACKGROUND_LIBRARY_DIR = os.getenv(
+    "BACKGROUND_LIBRARY_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "backgrounds")
+)
+BACKGROUND_FPS = int(os.getenv("BACKGROUND_FPS", "30"))
+# Keyframe every second: random starts land on one, and the segment seeks that
+# fall between keyframes decode at most a second of pre-roll
+BACKGROUND_GOP_SECONDS = float(os.getenv("BACKGROUND_GOP_SECONDS", "1"))
+BACKGROUND_CRF = int(os.getenv("BACKGROUND_CRF", "18"))
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm", ".m4v")
+
+def _source_key(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def normalize_background(source, output):
+    # Scale/crop to the reel frame, constant frame rate, closed fixed-length GOPs, no audio
+    gop = max(1, round(BACKGROUND_FPS * BACKGROUND_GOP_SECONDS))
+    command = [
+        "ffmpeg", "-y", "-v", "error", "-i", source,
+        "-vf", (
+            f"scale={REEL_WIDTH}:{REEL_HEIGHT}:force_original_aspect_ratio=increase,"
+            f"crop={REEL_WIDTH}:{REEL_HEIGHT}:(in_w-{REEL_WIDTH})/2:(in_h-{REEL_HEIGHT})/2,"
+            f"setsar=1,fps={BACKGROUND_FPS}"
+        ),
+        "-an",
+        "-c:v", "libx264", "-preset", "medium", "-crf", str(BACKGROUND_CRF), "-pix_fmt", "yuv420p",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-movflags", "+faststart",
+        output
+    ]
+    subprocess.run(command, check=True)
+    return output
+
+def keyframe_times(path):
+    # Presentation times of every keyframe, read from the packet flags without decoding
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path],
+        capture_output=True, text=True, check=True
+    )
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.append(float(pts_time))
+    return sorted(times)
+
+class BackgroundLibrary:
+    def __init__(self, directory=None):
+        self.directory = directory or BACKGROUND_LIBRARY_DIR
+        self.index_path = os.path.join(self.directory, "index.json")
+        self._lock = threading.Lock()
+        # One normalization per source at a time; concurrent renders wait for it
+        self._source_locks = {}
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # Called with self._lock held
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _source_lock(self, source):
+        with self._lock:
+            return self._source_locks.setdefault(source, threading.Lock())
+
+    def entry(self, source):
+
+        # Index entry for a source clip, normalizing it first if it is new or changed
+        source = os.path.abspath(source)
+        with self._source_lock(source):
+            key = _source_key(source)
+            with self._lock:
+                entry = self._index.get(source)
+            if entry and entry["source_key"] == key and os.path.exists(entry["path"]):
+                return entry
+
+            os.makedirs(self.directory, exist_ok=True)
+            name = os.path.splitext(os.path.basename(source))[0]
+            output = os.path.join(self.directory, f"{name}_{key['mtime_ns']:x}_{REEL_WIDTH}x{REEL_HEIGHT}.mp4")
+            print(f"Normalizing background {source} -> {output}")
+            started = time.perf_counter()
+            normalize_background(source, output + ".tmp.mp4")
+            os.replace(output + ".tmp.mp4", output)
+
+            entry = {
+                "source_key": key,
+                "path": output,
+                "duration": media_info.probe(output).duration,
+                "fps": BACKGROUND_FPS,
+                "keyframes": keyframe_times(output),
+                "last_used": (entry or {}).get("last_used", 0),
+            }
+            with self._lock:
+                if self._index.get(source, {}).get("path") not in (None, output):
+                    old_path = self._index[source]["path"]
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+                self._index[source] = entry
+                self._save_index()
+            print(f"Background ready in {time.perf_counter() - started:.1f}s, {len(entry['keyframes'])} keyframes")
+            return entry
+
+    def sources(self, background):
+        # A single clip, or every video in a directory
+        if os.path.isdir(background):
+            return sorted(
+                os.path.join(background, name)
+                for name in os.listdir(background)
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        return [background]
+
+    def pick(self, background, total_length):
+
+        # Return (normalized path, start) for a reel of total_length seconds.
+        # Among clips long enough for the reel, the least recently used wins;
+        # the start is a random keyframe that leaves room for the whole reel.
+        sources = [os.path.abspath(s) for s in self.sources(background)]
+        if not sources:
+            raise FileNotFoundError(f"No background videos in {background}")
+        with self._lock:
+            last_used = {s: self._index.get(s, {}).get("last_used", 0) for s in sources}
+        durations = {s: media_info.probe(s).duration for s in sources}
+        long_enough = [s for s in sources if durations[s] > total_length] or sources
+        source = min(long_enough, key=lambda s: (last_used[s], random.random()))
+
+        entry = self.entry(source)
+        latest_start = entry["duration"] - total_length
+        starts = [t for t in entry["keyframes"] if t <= latest_start] or [0.0]
+        start = random.choice(starts)
+
+        with self._lock:
+            self._index[source]["last_used"] = time.time()
+            self._save_index()
+        return entry["path"], start
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_library():
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = BackgroundLibrary()
+        return _library
+
+def pick_background(background, total_length):
+    return get_library().pick(background, total_length)
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from processors import metrics
+
+# Make-style reuse for the render. Every node (a rendered segment, the muxed
+# reel) is stored under the fingerprint of everything it was built from: the
+# content hashes of its input files and the exact parameters of the command
+# that builds it. A rerun recomputes the fingerprints, which is cheap, and only
+# runs the nodes whose fingerprint has no artifact yet. Upstream artifacts are
+# already keyed the same way by their own caches: summaries by article text
+# (article_cache), voiceovers by text/voice/model (elevenlabs_api_handler),
+# transcripts by audio hash (transcript_cache) and images by content
+# (image_handler), so an edited summary re-synthesizes and re-times only itself.
+BUILD_CACHE_DIR = os.getenv(
+    "BUILD_CACHE_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "build")
+)
+# Artifacts not used for this long are removed by prune()
+BUILD_CACHE_MAX_AGE_DAYS = float(os.getenv("BUILD_CACHE_MAX_AGE_DAYS", "14"))
+
+# Content hashes by (path, size, mtime), so a file is hashed once per process
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+def fingerprint(*parts):
+    # Stable hash of JSON-able parts; dict key order does not matter
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        cached = _file_hashes.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    with _file_hashes_lock:
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+def source_fingerprint(path):
+    # For large, rarely edited sources (background clips) size and mtime stand in for content
+    stat = os.stat(path)
+    return fingerprint(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+class BuildGraph:
+    def __init__(self, directory=None):
+        self.directory = directory or BUILD_CACHE_DIR
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def artifact_path(self, kind, key, extension):
+        return os.path.join(self.directory, kind, f"{key}.{extension}")
+
+    def build(self, kind, key, extension, build_fn):
+
+        # Path of the artifact for this fingerprint, running build_fn(tmp_path) only
+        # if there is none yet. build_fn returns False on failure; the result is None then.
+        path = self.artifact_path(kind, key, extension)
+        fresh = os.path.exists(path)
+        metrics.cache_event(f"build_{kind}", fresh)
+        with self._lock:
+            counts = self.counts.setdefault(kind, {"reused": 0, "built": 0})
+            counts["reused" if fresh else "built"] += 1
+        if fresh:
+            # Touch it so prune() sees it as recently used
+            os.utime(path)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=f".part.{extension}")
+        os.close(fd)
+        try:
+            if build_fn(tmp_path) is False:
+                return None
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def report(self):
+        for kind, counts in self.counts.items():
+            print(f"Build {kind}: {counts['built']} built, {counts['reused']} reused")
+
+    def prune(self, max_age_days=None):
+        # Drop artifacts no build has used recently; returns the number of files removed
+        max_age_days = BUILD_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+def copy_artifact(path, output):
+    # Outputs are copies, so editing or deleting one never corrupts the cache
+    if os.path.abspath(path) != os.path.abspath(output):
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        shutil.copyfile(path, output)
+    return output
@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from processors import metrics
+
+# Everything the pipeline needs to know about a media file, from one ffprobe call
+MediaInfo = namedtuple("MediaInfo", [
+    "path",
+    "duration",
+    "video_codec",
+    "width",
+    "height",
+    "fps",
+    "audio_codec",
+    "sample_rate",
+    "channels",
+])
+
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", "8"))
+
+# Memoized by (path, mtime, size) so a rewritten file is probed again
+_probe_cache = {}
+_probe_cache_lock = threading.Lock()
+
+def _parse_rate(rate):
+    # ffprobe reports frame rates as fractions such as "30000/1001"
+    num, _, den = (rate or "0").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def _empty_info(path):
+    return MediaInfo(path, 0.0, None, 0, 0, 0.0, None, 0, 0)
+
+def _run_ffprobe(path):
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,avg_frame_rate,r_frame_rate,sample_rate,channels",
+        "-of", "json",
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"ffprobe failed for {path}: {result.stderr.strip()}")
+        return None
+
+    info = json.loads(result.stdout)
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+
+    return MediaInfo(
+        path=path,
+        duration=float(info.get("format", {}).get("duration") or 0.0),
+        video_codec=video.get("codec_name"),
+        width=int(video.get("width") or 0),
+        height=int(video.get("height") or 0),
+        fps=_parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+        audio_codec=audio.get("codec_name"),
+        sample_rate=int(audio.get("sample_rate") or 0),
+        channels=int(audio.get("channels") or 0),
+    )
+
+def probe(path):
+
+    # Return MediaInfo for a file, running ffprobe only the first time we see this version of it
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return _empty_info(path)
+
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _probe_cache_lock:
+        cached = _probe_cache.get(key)
+    metrics.cache_event("ffprobe", cached is not None)
+    if cached is not None:
+        return cached._replace(path=path)
+
+    info = _run_ffprobe(path)
+    if info is None:
+        return _empty_info(path)
+
+    with _probe_cache_lock:
+        _probe_cache[key] = info
+    return info
+
+def probe_many(paths, max_workers=None):
+
+    # Probe several files concurrently, returning MediaInfo in input order
+    paths = list(paths)
+    if len(paths) <= 1:
+        return [probe(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=max_workers or PROBE_WORKERS) as executor:
+        return list(executor.map(probe, paths))
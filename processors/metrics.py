@@ -0,0 +1,241 @@
+import copy
+import cProfile
+import json
+import os
+import re
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Structured per-stage / per-article telemetry. Code wraps a unit of work in
+# metrics.span(stage, article) and, inside it, reports bytes moved and cache
+# hits with add_bytes() / cache_event(); those land on the innermost span open
+# on the current thread. Each finished span records wall time, CPU time of its
+# thread, CPU time of child processes (ffmpeg) and the process's peak RSS.
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "jsonl")  # jsonl, prometheus or off
+METRICS_FILE = os.getenv(
+    "METRICS_FILE",
+    os.path.join(CACHE_DIR, "metrics.prom" if METRICS_FORMAT == "prometheus" else "metrics.jsonl")
+)
+# Comma-separated stage names (or "*") to run under cProfile; one .prof file per span.
+# For sampling instead, attach py-spy to the process: worker threads are named
+# after their stage (e.g. "summarize-0"), so its output groups the same way.
+PROFILE_STAGES = {s.strip() for s in os.getenv("PROFILE_STAGES", "").split(",") if s.strip()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+# Finished spans kept for the next JSON lines export; beyond this the oldest are
+# dropped (per-stage totals still count them), so a long-running daemon that
+# exports rarely, or never (prometheus, off), stays bounded
+METRICS_MAX_RECORDS = int(os.getenv("METRICS_MAX_RECORDS", "10000"))
+
+_local = threading.local()
+
+def _peak_rss_bytes(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(who).ru_maxrss * 1024
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _stack():
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+class MetricsRecorder:
+    def __init__(self, run_id=None):
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+        # Spans not yet exported, and per-stage totals over every span of the run;
+        # exporting empties the former, never the latter
+        self.records = []
+        self.totals = {}
+        self.dropped_records = 0
+        # Events reported outside any span, e.g. from a plain executor thread
+        self.unattributed = {"bytes_in": 0, "bytes_out": 0, "cache": {}}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, article=None, profile=None):
+        record = {
+            "run_id": self.run_id,
+            "stage": stage,
+            "article": article,
+            "thread": threading.current_thread().name,
+            "started_at": time.time(),
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "cache": {},
+            "error": None,
+        }
+        stack = _stack()
+        record["parent"] = stack[-1]["stage"] if stack else None
+        stack.append(record)
+
+        profiler = None
+        if profile or (profile is None and (stage in PROFILE_STAGES or "*" in PROFILE_STAGES)):
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        children_started = _children_cpu()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_started, 4)
+            record["cpu_seconds"] = round(time.thread_time() - cpu_started, 4)
+            # Process-wide, so concurrent renders each see the others' ffmpeg time too
+            record["child_cpu_seconds"] = round(_children_cpu() - children_started, 4)
+            record["peak_rss_bytes"] = _peak_rss_bytes()
+            if profiler is not None:
+                profiler.disable()
+                record["profile"] = self._dump_profile(profiler, stage, article)
+            stack.pop()
+            with self._lock:
+                self._add_to_totals(record)
+                self.records.append(record)
+                if len(self.records) > METRICS_MAX_RECORDS:
+                    overflow = len(self.records) - METRICS_MAX_RECORDS
+                    del self.records[:overflow]
+                    self.dropped_records += overflow
+
+    def _dump_profile(self, profiler, stage, article):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        label = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(article))[:40] if article is not None else "all"
+        path = os.path.join(PROFILE_DIR, f"{self.run_id}-{stage}-{label}-{threading.get_ident()}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def add_bytes(self, count, direction="in"):
+        stack = _stack()
+        key = f"bytes_{direction}"
+        if stack:
+            stack[-1][key] += count
+        else:
+            with self._lock:
+                self.unattributed[key] += count
+
+    def cache_event(self, cache, hit):
+        stack = _stack()
+        if stack:
+            counts = stack[-1]["cache"]
+        else:
+            counts = self.unattributed["cache"]
+        with self._lock:
+            entry = counts.setdefault(cache, {"hits": 0, "misses": 0})
+            entry["hits" if hit else "misses"] += 1
+
+    def _add_to_totals(self, record):
+        # Called with the lock held
+        stage = self.totals.setdefault(record["stage"], {
+            "spans": 0, "errors": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+            "child_cpu_seconds": 0.0, "bytes_in": 0, "bytes_out": 0, "cache": {},
+        })
+        stage["spans"] += 1
+        stage["errors"] += record["error"] is not None
+        for key in ("wall_seconds", "cpu_seconds", "child_cpu_seconds"):
+            stage[key] = round(stage[key] + record[key], 4)
+        stage["bytes_in"] += record["bytes_in"]
+        stage["bytes_out"] += record["bytes_out"]
+        for cache, counts in record["cache"].items():
+            total = stage["cache"].setdefault(cache, {"hits": 0, "misses": 0})
+            total["hits"] += counts["hits"]
+            total["misses"] += counts["misses"]
+
+    def summary(self):
+        # Totals per stage over the whole run, the shape printed at the end of a run
+        # and exported to Prometheus
+        with self._lock:
+            return copy.deepcopy(self.totals)
+
+    def prometheus_text(self):
+        # Text exposition format, e.g. for node_exporter's textfile collector
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        summary = self.summary()
+        metric("reel_stage_spans_total", "counter", "Units of work per stage",
+               [({"stage": s}, v["spans"]) for s, v in summary.items()])
+        metric("reel_stage_errors_total", "counter", "Failed units of work per stage",
+               [({"stage": s}, v["errors"]) for s, v in summary.items()])
+        metric("reel_stage_wall_seconds_total", "counter", "Wall time per stage",
+               [({"stage": s}, v["wall_seconds"]) for s, v in summary.items()])
+        metric("reel_stage_cpu_seconds_total", "counter", "Thread CPU time per stage",
+               [({"stage": s}, v["cpu_seconds"]) for s, v in summary.items()])
+        metric("reel_stage_child_cpu_seconds_total", "counter", "Child process CPU time per stage",
+               [({"stage": s}, v["child_cpu_seconds"]) for s, v in summary.items()])
+        metric("reel_stage_bytes_total", "counter", "Bytes transferred per stage",
+               [({"stage": s, "direction": d}, v[f"bytes_{d}"]) for s, v in summary.items() for d in ("in", "out")])
+        metric("reel_cache_requests_total", "counter", "Cache lookups per stage and cache",
+               [({"stage": s, "cache": c, "result": r}, counts[key])
+                for s, v in summary.items() for c, counts in v["cache"].items()
+                for r, key in (("hit", "hits"), ("miss", "misses"))])
+        metric("reel_peak_rss_bytes", "gauge", "Peak resident memory of the process",
+               [({"run_id": self.run_id}, _peak_rss_bytes())])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None, fmt=None):
+
+        # JSON lines append the spans finished since the last export; Prometheus text
+        # replaces the file with the run's totals
+        fmt = fmt or METRICS_FORMAT
+        if fmt == "off":
+            return None
+        path = path or METRICS_FILE
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if fmt == "prometheus":
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+            # The totals carry everything this format exports
+            with self._lock:
+                self.records.clear()
+        else:
+            with self._lock:
+                records = list(self.records)
+                self.records.clear()
+            with open(path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+        return path
+
+    def report(self):
+        for stage, totals in self.summary().items():
+            cache = " ".join(f"{c}={v['hits']}/{v['hits'] + v['misses']}" for c, v in totals["cache"].items())
+            print(
+                f"Metrics {stage}: {totals['spans']} spans, wall {totals['wall_seconds']:.2f}s, "
+                f"cpu {totals['cpu_seconds']:.2f}s (+{totals['child_cpu_seconds']:.2f}s children), "
+                f"in {totals['bytes_in']}B out {totals['bytes_out']}B {cache}".rstrip()
+            )
+
+# Process-wide recorder used by the module-level helpers below
+_recorder = MetricsRecorder()
+
+def get_recorder():
+    return _recorder
+
+def set_recorder(recorder):
+    global _recorder
+    _recorder = recorder
+    return recorder
+
+def span(stage, article=None, profile=None):
+    return _recorder.span(stage, article, profile)
+
+def add_bytes(count, direction="in"):
+    _recorder.add_bytes(count, direction)
+
+def cache_event(cache, hit):
+    _recorder.cache_event(cache, hit)
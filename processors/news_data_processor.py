@@ -1,10 +1,193 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Articles per generate() call; padded batches amortise the model overhead on CPU
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "4"))
+# Fallback input limit when the tokenizer does not report one (BART's is 1024 tokens)
+DEFAULT_MAX_INPUT_TOKENS = 1024
+
+# Summarizer backends, all exposing the transformers pipeline interface that
+# summarize_articles uses (a .tokenizer and a call returning summary_text dicts):
+#   hf    the fp32 PyTorch pipeline
+#   int8  the same model with its Linear layers dynamically quantized to int8;
+#         about a quarter of the weight memory and faster matmuls on CPU
+#   onnx  the model exported once to ONNX (encoder, decoder and decoder-with-past
+#         graphs) and run by ONNX Runtime; needs optimum[onnxruntime]
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "hf")
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "facebook/bart-large-cnn")
+# Intra-op threads for torch / ONNX Runtime; 0 leaves each library's default
+SUMMARY_THREADS = int(os.getenv("SUMMARY_THREADS", "0"))
+SUMMARY_ONNX_DIR = os.getenv(
+    "SUMMARY_ONNX_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "onnx")
+)
+
+# Loaded summarizers by (backend, model), so the batch runner and benchmarks reuse
+# one set of weights / ONNX Runtime sessions per process
+_summarizers = {}
+_summarizers_lock = threading.Lock()
+
+def _load_hf(model_name):
+    import torch
+    from transformers import pipeline
+
+    if SUMMARY_THREADS:
+        torch.set_num_threads(SUMMARY_THREADS)
+    return pipeline("summarization", model=model_name)
+
+def _load_int8(model_name):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    if SUMMARY_THREADS:
+        torch.set_num_threads(SUMMARY_THREADS)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    # Nearly all of BART's weights are in Linear layers; embeddings and layer norms stay fp32
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    del model
+    return pipeline("summarization", model=quantized, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+def _onnx_export_dir(model_name):
+    return os.path.join(SUMMARY_ONNX_DIR, model_name.replace("/", "--"))
+
+def _load_onnx(model_name):
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError("SUMMARY_BACKEND=onnx needs optimum[onnxruntime] (pip install 'optimum[onnxruntime]')") from e
+    from transformers import AutoTokenizer, pipeline
+
+    session_options = onnxruntime.SessionOptions()
+    if SUMMARY_THREADS:
+        session_options.intra_op_num_threads = SUMMARY_THREADS
+
+    export_dir = _onnx_export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, "config.json")):
+        # Export once and keep the graphs; later loads only create the sessions.
+        # Exported into a temp dir and renamed, so an interrupted export is never loaded.
+        os.makedirs(SUMMARY_ONNX_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=SUMMARY_ONNX_DIR, suffix=".export")
+        try:
+            ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(tmp_dir)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+            os.replace(tmp_dir, export_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # use_cache runs the decoder-with-past graph, so each generated token only
+    # attends over the new position instead of re-running the whole prefix
+    model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, session_options=session_options, use_cache=True)
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(export_dir))
+
+SUMMARIZER_BACKENDS = {
+    "hf": _load_hf,
+    "int8": _load_int8,
+    "onnx": _load_onnx,
+}
+
+def summarizer_id(backend=None, model_name=None):
+    # Which backend and model made a summary; part of the summary cache key, so
+    # switching SUMMARY_BACKEND or SUMMARY_MODEL never serves another one's output
+    return f"{backend or SUMMARY_BACKEND}:{model_name or SUMMARY_MODEL}"
+
+def load_summarizer(backend=None, model_name=None):
+
+    # The summarizer for this backend and model, loaded on first use
+    backend = backend or SUMMARY_BACKEND
+    model_name = model_name or SUMMARY_MODEL
+    if backend not in SUMMARIZER_BACKENDS:
+        raise ValueError(f"Unknown summarizer backend {backend!r}, expected one of {sorted(SUMMARIZER_BACKENDS)}")
+    with _summarizers_lock:
+        key = (backend, model_name)
+        if key not in _summarizers:
+            started = time.perf_counter()
+            _summarizers[key] = SUMMARIZER_BACKENDS[backend](model_name)
+            _summarizers[key].summarizer_id = summarizer_id(backend, model_name)
+            print(f"Loaded {backend} summarizer {model_name} in {time.perf_counter() - started:.1f}s")
+        return _summarizers[key]
+
+def _max_input_tokens(tokenizer, max_input_tokens=None):
+    if max_input_tokens:
+        return max_input_tokens
+    env_limit = os.getenv("SUMMARY_MAX_INPUT_TOKENS")
+    if env_limit:
+        return int(env_limit)
+    # Some tokenizers report a huge sentinel instead of a real limit
+    model_limit = getattr(tokenizer, "model_max_length", None)
+    if not model_limit or model_limit > 100_000:
+        return DEFAULT_MAX_INPUT_TOKENS
+    return model_limit
+
+def truncate_to_tokens(article_text, tokenizer, max_input_tokens=None):
+
+    # Token ids of the article, truncated to the model's input limit. These go to
+    # generate() as they are, so each article is tokenized exactly once.
+    limit = _max_input_tokens(tokenizer, max_input_tokens)
+    return tokenizer(article_text, truncation=True, max_length=limit)["input_ids"]
+
+# Summarize Articles
+def summarize_articles(article_texts, summarizer, batch_size=None, max_input_tokens=None, cache=None, urls=None):
+
+    # Summarize many articles in padded batches, returning summaries in input order.
+    # With a cache, articles whose (url, text) this backend and model summarized
+    # before skip the model. With summarizer None the default one (SUMMARY_BACKEND,
+    # SUMMARY_MODEL) is loaded only if some article is not cached.
+    if not article_texts:
+        return []
+    batch_size = batch_size or SUMMARY_BATCH_SIZE
+    urls = urls or [None] * len(article_texts)
+    model_id = getattr(summarizer, "summarizer_id", None) or summarizer_id()
+
+    summaries = [None] * len(article_texts)
+    if cache is not None:
+        for i, text in enumerate(article_texts):
+            summaries[i] = cache.get_summary(urls[i], text, model_id)
+
+    if summarizer is None and None in summaries:
+        summarizer = load_summarizer()
+    truncated = {
+        i: truncate_to_tokens(text, summarizer.tokenizer, max_input_tokens)
+        for i, text in enumerate(article_texts)
+        if summaries[i] is None
+    }
+
+    # Sort by token length so each batch pads to a similar length
+    order = sorted(truncated, key=lambda i: len(truncated[i]))
+
+    if not order:
+        return summaries
+
+    # Already loaded by the summarizer; imported here so the module itself is cheap to import
+    import torch
+
+    # The pipeline's model and tokenizer are used directly, since calling the pipeline
+    # would tokenize the text a second time. generate() still picks up the generation
+    # settings the summarization pipeline applied to the model (beams, length penalty).
+    tokenizer = summarizer.tokenizer
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            batch_indexes = order[start:start + batch_size]
+            batch_started = time.perf_counter()
+            inputs = tokenizer.pad({"input_ids": [truncated[i] for i in batch_indexes]}, return_tensors="pt")
+            output_ids = summarizer.model.generate(
+                **{name: tensor.to(summarizer.device) for name, tensor in inputs.items()},
+                max_length=120,
+                min_length=35,
+                do_sample=False
+            )
+            outputs = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+            model_seconds = (time.perf_counter() - batch_started) / len(batch_indexes)
+            for i, output in zip(batch_indexes, outputs):
+                summaries[i] = output
+                if cache is not None:
+                    cache.put_summary(urls[i], article_texts[i], summaries[i], model_seconds, model_id)
+
+    return summaries
+
 # Summarize Article
-def summarize_article(article_text, summarizer):
-    # Limit the input text to prevent excessive memory usage
-    max_input_length = 1024  # Adjust based on model's maximum token limit
-    if len(article_text) > max_input_length:
-        article_text = article_text[:max_input_length]
-    
-    summary = summarizer(article_text, max_length=120, min_length=35, do_sample=False)
-    print(summary)
-    return summary[0]['summary_text']
\ No newline at end of file
+def summarize_article(article_text, summarizer, cache=None, url=None):
+    return summarize_articles([article_text], summarizer, cache=cache, urls=[url])[0]
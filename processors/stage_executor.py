@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+
+from processors import metrics
+
+# Marks the end of the item stream on a stage's input queue
+_DONE = object()
+
+class Stage:
+    def __init__(self, name, fn, workers=1, queue_size=4, batch_size=1):
+        # fn takes one item (or a list of items when batch_size > 1) and returns
+        # the item(s) to pass downstream, in the same order
+        self.name = name
+        self.fn = fn
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.input = queue.Queue(maxsize=queue_size)
+        self.output = None
+
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_item_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._active_workers = self.workers
+        self._lock = threading.Lock()
+
+    def timing(self):
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "max_item_seconds": round(self.max_item_seconds, 3),
+            "workers": self.workers,
+        }
+
+# Runs items through a chain of stages connected by bounded queues.
+# Every stage has its own worker threads, so different items occupy different
+# stages at the same time: I/O stages get a pool, model stages a single dedicated
+# worker. End-to-end latency then tracks the slowest stage, not the sum of them.
+class StagePipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        self.results = {}
+        self.errors = {}
+        self._extra_timings = {}
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.output = next_stage.input if next_stage else None
+
+    def _emit(self, stage, entries):
+        for entry in entries:
+            if stage.output is None:
+                idx, item = entry
+                self.results[idx] = item
+            else:
+                stage.output.put(entry)
+
+    def _next_batch(self, stage):
+        # Block for one entry, then take whatever else is already waiting
+        batch = [stage.input.get()]
+        while len(batch) < stage.batch_size and batch[-1] is not _DONE:
+            try:
+                batch.append(stage.input.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, stage, batch):
+        try:
+            with metrics.span(stage.name, article=",".join(str(idx) for idx, _ in batch)):
+                if stage.batch_size > 1:
+                    items = stage.fn([item for _, item in batch])
+                else:
+                    items = [stage.fn(batch[0][1])]
+        except Exception as e:
+            if len(batch) > 1:
+                # Find the item that broke the batch; the others still go downstream
+                print(f"Stage {stage.name} failed for items {[idx for idx, _ in batch]}: {e}; retrying one at a time")
+                for entry in batch:
+                    self._run_batch(stage, [entry])
+                return
+            idx = batch[0][0]
+            print(f"Stage {stage.name} failed for item {idx}: {e}")
+            self.errors[idx] = (stage.name, e)
+            return
+        self._emit(stage, [(idx, item) for (idx, _), item in zip(batch, items)])
+
+    def _worker(self, stage):
+        finished = False
+        while not finished:
+            batch = self._next_batch(stage)
+            if batch[-1] is _DONE:
+                batch.pop()
+                finished = True
+                # Leave the marker for this stage's other workers
+                stage.input.put(_DONE)
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._run_batch(stage, batch)
+            ended = time.perf_counter()
+
+            with stage._lock:
+                stage.items += len(batch)
+                stage.busy_seconds += ended - started
+                stage.max_item_seconds = max(stage.max_item_seconds, ended - started)
+                if stage.first_start is None:
+                    stage.first_start = started
+                stage.last_end = ended
+
+        with stage._lock:
+            stage._active_workers -= 1
+            last_worker = stage._active_workers == 0
+        if last_worker and stage.output is not None:
+            stage.output.put(_DONE)
+
+    def run(self, items, source_name=None):
+
+        # Feed items (any iterable, e.g. a generator still fetching) and return results
+        # in input order. Time spent waiting on the iterable is reported as source_name.
+        threads = []
+        for stage in self.stages:
+            for i in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage,), name=f"{stage.name}-{i}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        count = 0
+        first = self.stages[0]
+        source_seconds = 0.0
+        source_started = time.perf_counter()
+        iterator = iter(items)
+        try:
+            while True:
+                pulled = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    source_seconds += time.perf_counter() - pulled
+                first.input.put((count, item))
+                count += 1
+        finally:
+            first.input.put(_DONE)
+        if source_name:
+            self._extra_timings[source_name] = {
+                "items": count,
+                "busy_seconds": round(source_seconds, 3),
+                "wall_seconds": round(time.perf_counter() - source_started, 3),
+            }
+
+        for thread in threads:
+            thread.join()
+
+        return [self.results[idx] for idx in range(count) if idx in self.results]
+
+    def record(self, name, started, ended):
+        # Time a step that runs outside the queued stages, e.g. the final render
+        self._extra_timings[name] = {"items": 1, "wall_seconds": round(ended - started, 3)}
+
+    def timings(self):
+        timings = {stage.name: stage.timing() for stage in self.stages}
+        timings.update(self._extra_timings)
+        return timings
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Near-duplicate detection for news stories. Texts are reduced to shingles
+# (overlapping character 5-grams for short headlines, word 3-grams for article
+# bodies) and then to MinHash signatures, where the fraction of equal positions
+# estimates the Jaccard similarity of the shingle sets. Signatures are small
+# lists of ints, so the recently published stories can be kept in SQLite and
+# compared against every new candidate with a linear scan.
+MINHASH_PERMUTATIONS = int(os.getenv("STORY_MINHASH_PERMUTATIONS", "64"))
+# Estimated Jaccard similarity above which two stories count as the same. Headlines
+# only catch syndicated copies (~0.9): two different launches announced in the same
+# template ("X releases new Y model for developers") already score ~0.55, while the
+# same story rewritten by another outlet scores ~0.45, so rewrites are left to the
+# body check, where shared wire copy scores well above unrelated articles (~0).
+HEADLINE_THRESHOLD = float(os.getenv("STORY_HEADLINE_THRESHOLD", "0.7"))
+BODY_THRESHOLD = float(os.getenv("STORY_BODY_THRESHOLD", "0.5"))
+STORY_INDEX_PATH = os.getenv(
+    "STORY_INDEX_PATH",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "stories.sqlite3")
+)
+# How long a published story blocks near-duplicates from later reels
+STORY_INDEX_DAYS = float(os.getenv("STORY_INDEX_DAYS", "3"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(count):
+    # Fixed (a, b) pairs for h(x) = (a * x + b) mod p, derived from a seed so every
+    # process, and every signature in the index, uses the same permutations
+    params = []
+    for i in range(count):
+        digest = hashlib.sha256(f"minhash-{i}".encode("ascii")).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:16], "big") % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+_PERMUTATIONS = _permutations(MINHASH_PERMUTATIONS)
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(re.findall(r"\w+", text))
+
+def char_shingles(text, k=5):
+    text = normalize(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+def word_shingles(text, k=3):
+    words = normalize(text).split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash(shingles):
+    # Signature of a shingle set; empty sets get None and never match anything
+    if not shingles:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS]
+
+def similarity(signature, other):
+    if not signature or not other or len(signature) != len(other):
+        return 0.0
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
+
+def headline_signature(article):
+    # From the NewsAPI listing alone, so it is available before any download
+    return minhash(char_shingles(f"{article.get('title') or ''} {article.get('description') or ''}"))
+
+def body_signature(text):
+    return minhash(word_shingles(text))
+
+class StoryIndex:
+    def __init__(self, path=None, max_age_days=None):
+        self.path = path or STORY_INDEX_PATH
+        self.max_age = (STORY_INDEX_DAYS if max_age_days is None else max_age_days) * 86400
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS stories (
+                    url TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    headline_signature TEXT,
+                    body_signature TEXT,
+                    published_at REAL NOT NULL
+                )
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recent(self):
+        # (url, title, headline signature, body signature) of stories still inside the window
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, title, headline_signature, body_signature FROM stories WHERE published_at >= ?",
+                (time.time() - self.max_age,)
+            ).fetchall()
+        return [
+            (url, title, json.loads(headline) if headline else None, json.loads(body) if body else None)
+            for url, title, headline, body in rows
+        ]
+
+    def record(self, url, title, headline, body):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stories (url, title, headline_signature, body_signature, published_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, title or "", json.dumps(headline) if headline else None, json.dumps(body) if body else None, now)
+            )
+            self._conn.execute("DELETE FROM stories WHERE published_at < ?", (now - self.max_age,))
+
+class StoryDeduper:
+
+    # Tracks the stories accepted in this fetch plus the recently published ones,
+    # and says whether a candidate repeats any of them
+    def __init__(self, index=None, headline_threshold=None, body_threshold=None):
+        self.headline_threshold = HEADLINE_THRESHOLD if headline_threshold is None else headline_threshold
+        self.body_threshold = BODY_THRESHOLD if body_threshold is None else body_threshold
+        self.seen = index.recent() if index is not None else []
+
+    def _match(self, signature, position, threshold):
+        for url, title, *signatures in self.seen:
+            score = similarity(signature, signatures[position])
+            if score >= threshold:
+                return title or url, score
+        return None
+
+    def duplicate_headline(self, signature):
+        return self._match(signature, 0, self.headline_threshold)
+
+    def duplicate_body(self, signature):
+        return self._match(signature, 1, self.body_threshold)
+
+    def add(self, url, title, headline, body):
+        self.seen.append((url, title, headline, body))
@@ -0,0 +1,179 @@
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from processors import audio_data_processor as audio_proc
+from processors import metrics, transcript_cache
+
+# We already know what every voiceover says (it is the summary we sent to TTS),
+# so subtitles only need word timings, not speech recognition. Timings come from
+# ElevenLabs' character alignment when we have it, else from forcing the script
+# through whisper's cross-attention alignment; full ASR is the last resort.
+ALIGN_MIN_CONFIDENCE = float(os.getenv("ALIGN_MIN_CONFIDENCE", "0.8"))
+
+def _normalize_words(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.findall(r"[\w']+", text)
+
+def script_match(words, script):
+
+    # How closely the aligned words reproduce the script, from 0.0 to 1.0
+    aligned = _normalize_words(" ".join(w["word"] for w in words))
+    expected = _normalize_words(script)
+    if not aligned or not expected:
+        return 0.0
+    return SequenceMatcher(None, aligned, expected, autojunk=False).ratio()
+
+def words_to_segments(words):
+    # Split at sentence ends, like whisper's own segments, so chunking matches the ASR path
+    segments = []
+    current = []
+    for word in words:
+        current.append(word)
+        if word["word"].strip()[-1:] in ".!?":
+            segments.append({"words": current})
+            current = []
+    if current:
+        segments.append({"words": current})
+    return segments
+
+def words_from_elevenlabs(alignment, script):
+
+    # Group ElevenLabs character timings into words, returning (words, confidence)
+    words = []
+    current = ""
+    start = end = None
+    for char, char_start, char_end in zip(
+        alignment["characters"],
+        alignment["character_start_times_seconds"],
+        alignment["character_end_times_seconds"]
+    ):
+        if char.isspace():
+            if current:
+                words.append({"word": current, "start": start, "end": end})
+                current = ""
+            continue
+        if not current:
+            start = char_start
+        current += char
+        end = char_end
+    if current:
+        words.append({"word": current, "start": start, "end": end})
+
+    return words, script_match(words, script)
+
+# Share of each 30 s alignment window planned for script words when a clip is longer,
+# leaving room for a speaker who runs slower than the clip's average rate
+ALIGN_WINDOW_FILL = 0.8
+
+def window_word_count(words, seconds_per_char, seconds):
+
+    # How many of the next words fit in `seconds` at the clip's average speaking rate;
+    # always at least one, so every window makes progress
+    count = 0
+    chars = 0
+    for word in words:
+        chars += len(word) + 1
+        if count and chars * seconds_per_char > seconds:
+            break
+        count += 1
+    return count
+
+def _align_window(model, model_lock, tokenizer, audio, text, audio_file):
+    import whisper
+    from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES
+    from whisper.timing import find_alignment
+
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+    mel = whisper.pad_or_trim(mel, N_FRAMES).to(model.device)
+    text_tokens = tokenizer.encode(" " + text.strip())
+    with model_lock, metrics.span("whisper_align", article=os.path.basename(audio_file)):
+        return find_alignment(model, tokenizer, text_tokens, mel, len(audio) // HOP_LENGTH)
+
+def words_from_whisper_alignment(audio_file, script, model_name=None):
+
+    # Force-align the known script with whisper's alignment heads: one encoder pass and
+    # one decoder pass over the given tokens, no beam search. Returns (words, confidence).
+    # find_alignment sees one 30 s window, so longer clips are aligned window by window:
+    # each takes the script words expected to fit at the clip's average speaking rate
+    # and starts where the previous window's last word ended.
+    import whisper
+    from whisper.audio import CHUNK_LENGTH, HOP_LENGTH, N_SAMPLES, SAMPLE_RATE
+    from whisper.tokenizer import get_tokenizer
+
+    audio = whisper.load_audio(audio_file)
+    script_words = script.split()
+    if not script_words:
+        return [], 0.0
+
+    model, model_lock = audio_proc.get_whisper_model(model_name)
+    tokenizer = get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language="en",
+        task="transcribe"
+    )
+    seconds_per_char = len(audio) / SAMPLE_RATE / len(" ".join(script_words))
+
+    words, probabilities = [], []
+    offset = 0.0
+    k = 0
+    while k < len(script_words):
+        start_sample = int(offset * SAMPLE_RATE)
+        window = audio[start_sample:start_sample + N_SAMPLES]
+        if len(audio) - start_sample <= N_SAMPLES:
+            # The rest of the clip fits in this window, so does the rest of the script
+            count = len(script_words) - k
+        else:
+            count = window_word_count(script_words[k:], seconds_per_char, CHUNK_LENGTH * ALIGN_WINDOW_FILL)
+        timings = _align_window(model, model_lock, tokenizer, window, " ".join(script_words[k:k + count]), audio_file)
+
+        aligned = [
+            {"word": t.word, "start": offset + float(t.start), "end": offset + float(t.end)}
+            for t in timings
+            if t.word.strip()
+        ]
+        if not aligned:
+            return [], 0.0
+        words.extend(aligned)
+        probabilities.extend(float(t.probability) for t in timings)
+        k += count
+        # Always move forward, by at least one mel frame
+        offset = max(aligned[-1]["end"], offset + HOP_LENGTH / SAMPLE_RATE)
+    confidence = sum(probabilities) / len(probabilities)
+    return words, confidence
+
+def align_words(audio_file, script, alignment=None, model_name=None, min_confidence=None, use_cache=True):
+
+    # Return word-timed segments for a voiceover whose text we already know
+    min_confidence = ALIGN_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    audio_hash = transcript_cache.audio_content_hash(audio_file)
+    # Cached per whisper model, since whisper-align and the ASR fallback depend on it
+    cache_model = model_name or audio_proc.DEFAULT_WHISPER_MODEL
+    if use_cache:
+        transcript = transcript_cache.load_transcript(audio_hash, "align", cache_model)
+        if transcript is not None:
+            return transcript["segments"]
+
+    candidates = []
+    if alignment:
+        candidates.append(("elevenlabs", lambda: words_from_elevenlabs(alignment, script)))
+    candidates.append(("whisper-align", lambda: words_from_whisper_alignment(audio_file, script, model_name)))
+
+    for source, align in candidates:
+        words, confidence = align()
+        if words and confidence >= min_confidence:
+            segments = words_to_segments(words)
+            if use_cache:
+                transcript_cache.save_transcript(audio_hash, segments, source=source, model=cache_model, mode="align")
+            return segments
+        print(f"{source} alignment confidence {confidence:.2f} too low for {audio_file}")
+
+    # Nothing trustworthy: run full speech recognition, and remember that alignment
+    # already failed for this audio
+    segments = audio_proc.transcribe_words(audio_file, model_name, use_cache=use_cache)
+    if use_cache:
+        transcript_cache.save_transcript(audio_hash, segments, source="whisper", model=cache_model, mode="align")
+    return segments
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from processors import metrics
+
+# Transcripts are stored as JSON artifacts named after the SHA-256 of the audio
+# bytes, so identical audio (e.g. the "follow for more" outro) is only ever
+# transcribed once, across runs and regardless of the file name. The name also
+# carries how the words were produced ("whisper" ASR or "align" against the known
+# script) and with which whisper model, so changing either is a cache miss.
+TRANSCRIPT_CACHE_DIR = os.getenv(
+    "TRANSCRIPT_CACHE_DIR",
+    os.path.join(os.getenv("CACHE_DIR", ".cache"), "transcripts")
+)
+
+def audio_content_hash(audio_file):
+    digest = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _transcript_path(audio_hash, mode, model):
+    variant = hashlib.sha256(json.dumps([mode, model]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{audio_hash}-{variant}.json")
+
+def load_transcript(audio_hash, mode="whisper", model=None):
+
+    # Return the cached transcript for this audio, mode and model, or None on a miss
+    path = _transcript_path(audio_hash, mode, model)
+    if not os.path.exists(path):
+        metrics.cache_event("transcript", hit=False)
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            transcript = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable transcript {path}: {e}")
+        metrics.cache_event("transcript", hit=False)
+        return None
+    metrics.cache_event("transcript", hit=True)
+    return transcript
+
+def save_transcript(audio_hash, segments, source, model=None, mode="whisper"):
+
+    # Segments keep whisper's shape: [{"words": [{"word", "start", "end"}, ...]}, ...]
+    transcript = {
+        "audio_sha256": audio_hash,
+        "mode": mode,
+        "source": source,
+        "model": model,
+        "segments": [
+            {
+                "words": [
+                    {
+                        "word": w["word"],
+                        "start": float(w["start"]),
+                        "end": float(w["end"]),
+                    }
+                    for w in segment["words"]
+                ]
+            }
+            for segment in segments
+        ],
+    }
+
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    # Write to a temp file and rename so readers never see a partial artifact
+    fd, tmp_path = tempfile.mkstemp(dir=TRANSCRIPT_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(transcript, f)
+    os.replace(tmp_path, _transcript_path(audio_hash, mode, model))
+    return transcript
@@ -0,0 +1,561 @@
+import functools
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pysrt
+
+from processors import media_info
+from processors.build_graph import BuildGraph, copy_artifact, file_fingerprint, fingerprint, source_fingerprint
+
+# Named encoder settings. "final" is what gets published; "draft" and "fast"
+# trade size and quality for speed while iterating on a reel.
+RENDER_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 30, "threads": 0, "pix_fmt": "yuv420p", "faststart": False, "audio_bitrate": "128k"},
+    "fast": {"preset": "veryfast", "crf": 24, "threads": 0, "pix_fmt": "yuv420p", "faststart": True, "audio_bitrate": "192k"},
+    "final": {"preset": "medium", "crf": 20, "threads": 0, "pix_fmt": "yuv420p", "faststart": True, "audio_bitrate": "192k"},
+}
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "final")
+# libx264 by default; h264_nvenc, h264_qsv or h264_videotoolbox use the GPU/media engine
+RENDER_VIDEO_CODEC = os.getenv("RENDER_VIDEO_CODEC", "libx264")
+# "single" encodes the reel in one ffmpeg process; "segments" encodes each
+# voiceover segment in its own process and stream-copies them together;
+# "incremental" does the same but keeps segments in the build cache and only
+# re-encodes those whose inputs changed since an earlier render
+RENDER_MODE = os.getenv("RENDER_MODE", "single")
+RENDER_SEGMENT_WORKERS = int(os.getenv("RENDER_SEGMENT_WORKERS", str(os.cpu_count() or 1)))
+
+# Extra outputs made from the same composited picture as the reel. A single-pass
+# render splits its filter graph after the subtitle burn-in, so the background is
+# decoded, overlaid and subtitled once for all of them; segment renders derive
+# them from the finished reel in one extra ffmpeg pass. Video variants override
+# the profile's encoder settings ("maxrate"/"bufsize" cap the bitrate of the CRF
+# encode) and either crop to fill their frame or pad the whole 9:16 picture into
+# it; "square" pads, since the captions sit at the bottom and the image in the
+# top quarter. Images are single frames "at" seconds into the reel (default: the
+# middle of the first article). The container follows the file extension.
+OUTPUT_VARIANTS = {
+    "preview": {"kind": "video", "width": 540, "height": 960, "fit": "crop", "extension": "mp4",
+                "encoder": {"crf": 28, "maxrate": "1M", "bufsize": "2M", "audio_bitrate": "96k"}},
+    "square": {"kind": "video", "width": 1080, "height": 1080, "fit": "pad", "extension": "mp4", "encoder": {}},
+    "poster": {"kind": "image", "width": 1080, "height": 1920, "fit": "crop", "extension": "jpg", "at": None},
+    "thumbnail": {"kind": "image", "width": 360, "height": 640, "fit": "crop", "extension": "jpg", "at": None},
+}
+# Comma-separated variant names rendered next to every reel, e.g. preview,poster
+RENDER_VARIANTS = [name.strip() for name in os.getenv("RENDER_VARIANTS", "").split(",") if name.strip()]
+
+REEL_WIDTH = 1080
+REEL_HEIGHT = 1920
+# Overlay width of article images; image_handler pre-resizes downloads to it
+IMAGE_WIDTH = int(os.getenv("IMAGE_WIDTH", "900"))
+
+SUBTITLE_STYLE = (
+    "FontName=Arial,FontSize=24,PrimaryColour=&HFFFFFF&,"
+    "OutlineColour=&H000000&,Outline=2,Shadow=1,MarginV=40,MarginL=20,MarginR=20"
+)
+
+# x264 presets mapped onto the nearest setting of each hardware encoder
+_NVENC_PRESETS = {"ultrafast": "p1", "superfast": "p2", "veryfast": "p3", "faster": "p4", "fast": "p4", "medium": "p5", "slow": "p6", "slower": "p7", "veryslow": "p7"}
+_QSV_PRESETS = {"ultrafast": "veryfast", "superfast": "veryfast", "veryfast": "veryfast", "faster": "faster", "fast": "fast", "medium": "medium", "slow": "slow", "slower": "slower", "veryslow": "veryslow"}
+
+def get_render_profile(name=None):
+    name = name or RENDER_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile {name!r}, expected one of {sorted(RENDER_PROFILES)}")
+    return {"name": name, **RENDER_PROFILES[name]}
+
+def video_encoder_args(profile, codec=None):
+    # The same profile expressed in each encoder's own quality/speed knobs
+    codec = codec or RENDER_VIDEO_CODEC
+    preset, crf = profile["preset"], profile["crf"]
+    if codec == "h264_nvenc":
+        args = ["-c:v", codec, "-preset", _NVENC_PRESETS.get(preset, "p5"), "-rc", "vbr", "-cq", str(crf), "-b:v", "0"]
+    elif codec == "h264_qsv":
+        args = ["-c:v", codec, "-preset", _QSV_PRESETS.get(preset, "medium"), "-global_quality", str(crf)]
+    elif codec == "h264_videotoolbox":
+        # No CRF; map CRF 18-35 onto its 0-100 quality scale
+        args = ["-c:v", codec, "-q:v", str(max(1, min(100, 100 - (crf - 18) * 4)))]
+    else:
+        args = ["-c:v", codec, "-preset", preset, "-crf", str(crf)]
+    if profile.get("maxrate"):
+        args += ["-maxrate", profile["maxrate"], "-bufsize", profile.get("bufsize") or profile["maxrate"]]
+    return args + ["-threads", str(profile["threads"]), "-pix_fmt", profile["pix_fmt"]]
+
+def output_args(profile, codec=None):
+    args = video_encoder_args(profile, codec) + ["-c:a", "aac", "-b:a", profile["audio_bitrate"]]
+    if profile["faststart"]:
+        # Put the moov atom first so the upload can be played before it fully downloads
+        args += ["-movflags", "+faststart"]
+    return args
+
+def get_output_variant(variant):
+    # A variant name from OUTPUT_VARIANTS, or a spec dict with the same keys
+    if isinstance(variant, dict):
+        return {"name": variant.get("name", "custom"), **variant}
+    if variant not in OUTPUT_VARIANTS:
+        raise ValueError(f"Unknown output variant {variant!r}, expected one of {sorted(OUTPUT_VARIANTS)}")
+    return {"name": variant, **OUTPUT_VARIANTS[variant]}
+
+def variant_outputs(output, variants):
+    # (spec, path) per variant, written next to the reel: final_reel.preview.mp4, ...
+    root = os.path.splitext(output)[0]
+    outputs = []
+    for variant in variants or []:
+        spec = get_output_variant(variant)
+        outputs.append((spec, spec.get("output") or f"{root}.{spec['name']}.{spec['extension']}"))
+    return outputs
+
+def variant_filter(spec):
+    # Fit the 1080x1920 picture into the variant's frame
+    width, height = spec["width"], spec["height"]
+    if (width, height) == (REEL_WIDTH, REEL_HEIGHT):
+        return "null"
+    if spec.get("fit") == "pad":
+        return (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+        )
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height},setsar=1"
+    )
+
+def poster_time(spec, plan):
+    if spec.get("at") is not None:
+        return min(spec["at"], plan["total_length"])
+    start_t, end_t = plan["segments"][0]
+    return (start_t + end_t) / 2
+
+def _variant_graph(video_label, audio_label, outputs, plan):
+
+    # Split the finished picture (and audio) into the reel plus one branch per
+    # variant. Returns the filters and, per output, the labels to map.
+    n = 1 + len(outputs)
+    audio_count = 1 + sum(spec["kind"] == "video" for spec, _ in outputs)
+    filters = [
+        f"[{video_label}]split={n}" + "".join(f"[v{k}]" for k in range(n)),
+        f"[{audio_label}]asplit={audio_count}" + "".join(f"[a{k}]" for k in range(audio_count)),
+    ]
+    maps = [("[v0]", "[a0]")]
+    audio_index = 1
+    for k, (spec, _) in enumerate(outputs, start=1):
+        if spec["kind"] == "image":
+            # Only the one frame leaves the trim; split drops the rest for this branch
+            frame = round(poster_time(spec, plan) * plan["fps"])
+            filters.append(
+                f"[v{k}]trim=start_frame={frame}:end_frame={frame + 1},setpts=PTS-STARTPTS,{variant_filter(spec)}[out{k}]"
+            )
+            maps.append((f"[out{k}]", None))
+        else:
+            filters.append(f"[v{k}]{variant_filter(spec)}[out{k}]")
+            maps.append((f"[out{k}]", f"[a{audio_index}]"))
+            audio_index += 1
+    return filters, maps
+
+def variant_output_args(spec, profile, codec=None):
+    if spec["kind"] == "image":
+        return ["-frames:v", "1", "-q:v", "2", "-update", "1"]
+    return output_args({**profile, **spec.get("encoder", {})}, codec)
+
+def segment_offsets(durations):
+    # (start, end) of each voiceover on the reel timeline
+    offsets = []
+    current_start = 0.0
+    for d in durations:
+        offsets.append((current_start, current_start + d))
+        current_start += d
+    return offsets
+
+def background_start(background_duration, total_length):
+    # Random start that leaves enough background for the whole reel
+    if background_duration <= total_length:
+        return 0
+    return random.randint(0, int(background_duration - total_length))
+
+def background_filter(background_info):
+    # Scale and crop to the reel frame, unless the clip is already 1080x1920
+    if (background_info.width, background_info.height) == (REEL_WIDTH, REEL_HEIGHT):
+        return "setsar=1"
+    return (
+        f"scale={REEL_WIDTH}:{REEL_HEIGHT}:force_original_aspect_ratio=increase,"
+        f"crop={REEL_WIDTH}:{REEL_HEIGHT}:(in_w-{REEL_WIDTH})/2:(in_h-{REEL_HEIGHT})/2,setsar=1"
+    )
+
+def subtitles_filter(srt_file):
+    # libass wants forward slashes and an absolute path
+    srt_path = os.path.abspath(srt_file).replace('\\', '/')
+    return f"subtitles='{srt_path}':force_style='{SUBTITLE_STYLE}'"
+
+def render_plan(voiceover_files, background_video, bg_start=None):
+
+    # Segment boundaries on the reel timeline, snapped to whole background frames
+    # so every segment has an exact frame count. The single-pass graph and the
+    # segment-parallel jobs both cut at these boundaries, which is what makes
+    # their outputs frame-identical.
+    voice_infos = media_info.probe_many(voiceover_files)
+    background_info = media_info.probe(background_video)
+    fps = background_info.fps or 30.0
+    offsets = segment_offsets([info.duration for info in voice_infos])
+    boundaries = [0] + [round(end_t * fps) / fps for _, end_t in offsets]
+    total_length = boundaries[-1]
+    if bg_start is None:
+        bg_start = background_start(background_info.duration, total_length)
+    return {
+        "background_info": background_info,
+        "fps": fps,
+        "segments": list(zip(boundaries[:-1], boundaries[1:])),
+        "total_length": total_length,
+        "bg_start": bg_start,
+    }
+
+def _background_input(plan, start_t, end_t, background_video):
+    # -stream_loop keeps a background shorter than the reel from running out
+    seek = plan["bg_start"] + start_t
+    if plan["background_info"].duration:
+        seek %= plan["background_info"].duration
+    return ["-stream_loop", "-1", "-ss", f"{seek:.6f}", "-t", f"{end_t - start_t:.6f}", "-i", background_video]
+
+def _segment_filters(plan, i, bg_label, image_label, out_label):
+    # The background slice, with the article image decoded and scaled once and
+    # overlaid on this segment only
+    filters = [f"[{bg_label}]{background_filter(plan['background_info'])},setpts=PTS-STARTPTS[bg{i}]"]
+    if image_label is not None:
+        filters.append(f"[{image_label}]scale={IMAGE_WIDTH}:-1[img{i}]")
+        filters.append(f"[bg{i}][img{i}]overlay=(W-w)/2:(H-h)/4[{out_label}]")
+    else:
+        filters.append(f"[bg{i}]null[{out_label}]")
+    return filters
+
+def segment_images(image_files, n):
+    # Image per segment by position; None (or a short list) leaves that segment without one
+    image_files = list(image_files or [])
+    return [image_files[i] if i < len(image_files) else None for i in range(n)]
+
+def build_render_command(voiceover_files, srt_file, background_video, image_files, output, profile=None, codec=None, bg_start=None, plan=None, variants=None):
+
+    # One ffmpeg graph, restructured around the voiceover segments. Each segment
+    # reads only its own slice of the background (a separate seeked input that
+    # ffmpeg does not touch until concat reaches it), and its image is decoded
+    # and scaled once and overlaid on that slice only, instead of every image
+    # being evaluated with enable='between(...)' on every frame of the reel.
+    profile = profile if isinstance(profile, dict) else get_render_profile(profile)
+    plan = plan or render_plan(voiceover_files, background_video, bg_start)
+    segments = plan["segments"]
+
+    n = len(segments)
+    command = ["ffmpeg", "-y"]
+    for start_t, end_t in segments:
+        command.extend(_background_input(plan, start_t, end_t, background_video))
+    for v in voiceover_files:
+        command.extend(["-i", v])
+    # Only segments with an image get an input; the rest are not reindexed onto them
+    image_labels = []
+    for img in segment_images(image_files, n):
+        if img:
+            image_labels.append(f"{2 * n + sum(label is not None for label in image_labels)}:v")
+            command.extend(["-i", img])
+        else:
+            image_labels.append(None)
+
+    filters = []
+    for i in range(n):
+        filters.extend(_segment_filters(plan, i, f"{i}:v", image_labels[i], f"seg{i}"))
+
+    filters.append("".join(f"[seg{i}]" for i in range(n)) + f"concat=n={n}:v=1:a=0[video]")
+    filters.append("".join(f"[{n + i}:a]" for i in range(n)) + f"concat=n={n}:v=0:a=1[audio_out]")
+    filters.append(f"[video]{subtitles_filter(srt_file)}[v]")
+
+    # Variants ((spec, path) pairs from variant_outputs) branch off after the
+    # subtitles, so compositing is shared and only the encoders multiply
+    outputs = variants or []
+    maps = [("[v]", "[audio_out]")]
+    if outputs:
+        variant_filters, maps = _variant_graph("v", "audio_out", outputs, plan)
+        filters.extend(variant_filters)
+
+    command.extend(["-filter_complex", ";".join(filters)])
+    for k, ((video_map, audio_map), path) in enumerate(zip(maps, [output] + [path for _, path in outputs])):
+        command.extend(["-map", video_map])
+        if audio_map:
+            # Set duration to the end of the last voiceover
+            command.extend(["-map", audio_map, "-t", f"{plan['total_length']:.6f}"])
+        command.extend(output_args(profile, codec) if k == 0 else variant_output_args(outputs[k - 1][0], profile, codec))
+        command.append(path)
+    return command
+
+def build_variants_command(reel, outputs, plan, profile, codec=None):
+
+    # Variants of an already rendered reel (segment modes), all from one decode of it
+    command = ["ffmpeg", "-y", "-i", reel]
+    filters, maps = _variant_graph("0:v", "0:a", outputs, plan)
+    # The reel itself is not rewritten; its branch is discarded
+    filters.append("[v0]nullsink")
+    filters.append("[a0]anullsink")
+    command.extend(["-filter_complex", ";".join(filters)])
+    for (spec, path), (video_map, audio_map) in zip(outputs, maps[1:]):
+        command.extend(["-map", video_map])
+        if audio_map:
+            command.extend(["-map", audio_map])
+        command.extend(variant_output_args(spec, profile, codec))
+        command.append(path)
+    return command
+
+def build_segment_command(plan, i, srt_file, background_video, image_file, output, profile, codec=None):
+
+    # Video-only render of one segment. Subtitles are drawn on the reel timeline
+    # by shifting the segment to its start time around the subtitles filter.
+    start_t, end_t = plan["segments"][i]
+    command = ["ffmpeg", "-y"] + _background_input(plan, start_t, end_t, background_video)
+    if image_file:
+        command.extend(["-i", image_file])
+
+    filters = _segment_filters(plan, i, "0:v", "1:v" if image_file else None, f"seg{i}")
+    filters.append(
+        f"[seg{i}]setpts=PTS+{start_t:.6f}/TB,{subtitles_filter(srt_file)},setpts=PTS-STARTPTS[v]"
+    )
+    command.extend(["-filter_complex", ";".join(filters), "-map", "[v]", "-an"])
+    command.extend(video_encoder_args(profile, codec))
+    command.append(output)
+    return command
+
+def build_concat_command(plan, segment_list, voiceover_files, output, profile):
+
+    # Join the segments without re-encoding and mux in the voiceovers, encoded once
+    # as a single AAC stream so there are no priming gaps at segment boundaries
+    n = len(voiceover_files)
+    command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", segment_list]
+    for v in voiceover_files:
+        command.extend(["-i", v])
+    command.extend([
+        "-filter_complex", "".join(f"[{1 + i}:a]" for i in range(n)) + f"concat=n={n}:v=0:a=1[audio_out]",
+        "-map", "0:v",
+        "-map", "[audio_out]",
+        "-t", f"{plan['total_length']:.6f}",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        "-b:a", profile["audio_bitrate"],
+    ])
+    if profile["faststart"]:
+        command.extend(["-movflags", "+faststart"])
+    command.append(output)
+    return command
+
+def _run_segments(plan, jobs, workers):
+    # Run {segment index: callable returning True on success}, longest segments first
+    # so the pool drains evenly
+    order = sorted(jobs, key=lambda i: plan["segments"][i][0] - plan["segments"][i][1])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(order, executor.map(lambda i: jobs[i](), order)))
+    return [results[i] for i in sorted(results)]
+
+def _split_threads(profile, workers):
+    if not profile["threads"]:
+        # Split the cores between the concurrent encoders instead of oversubscribing
+        profile["threads"] = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    return profile
+
+def _write_segment_list(path, segment_files):
+    with open(path, "w", encoding="utf-8") as f:
+        for segment_file in segment_files:
+            f.write(f"file '{segment_file}'\n")
+
+def segment_cues(subtitles, start_t, end_t):
+    # Subtitle cues on screen during [start_t, end_t) of the reel timeline
+    return [
+        (cue.start.ordinal, cue.end.ordinal, cue.text)
+        for cue in subtitles
+        if cue.end.ordinal > start_t * 1000 and cue.start.ordinal < end_t * 1000
+    ]
+
+def segment_fingerprint(plan, i, subtitles, srt_file, background_video, image_file, profile, codec=None):
+
+    # The segment's ffmpeg command with every input file replaced by a fingerprint of
+    # what the segment uses from it, so any change to the filter graph, the encoder
+    # settings, the image, the background slice or the cues it shows is a new segment.
+    # The thread count is left out: it changes with the number of segments to encode.
+    start_t, end_t = plan["segments"][i]
+    command = build_segment_command(plan, i, srt_file, background_video, image_file, "OUTPUT", profile, codec)
+    files = {background_video: "background:" + source_fingerprint(background_video)}
+    if image_file:
+        files[image_file] = "image:" + file_fingerprint(image_file)
+    srt_path = os.path.abspath(srt_file).replace('\\', '/')
+    cues = "subtitles:" + fingerprint(segment_cues(subtitles, start_t, end_t))
+
+    args = []
+    for arg in command:
+        if args and args[-1] == "-threads":
+            args.pop()
+            continue
+        args.append(files.get(arg, arg.replace(srt_path, cues)))
+    return fingerprint("segment", args)
+
+def render_reel_segments(voiceover_files, srt_file, background_video, image_files, output, profile=None, codec=None, workers=None, bg_start=None):
+
+    # Render every segment as its own ffmpeg process, then stream-copy concat.
+    # All segments share the profile's encoder settings, so their streams join cleanly.
+    profile = dict(profile if isinstance(profile, dict) else get_render_profile(profile))
+    plan = render_plan(voiceover_files, background_video, bg_start)
+    workers = workers or RENDER_SEGMENT_WORKERS
+    _split_threads(profile, workers)
+
+    segment_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        segment_files = [os.path.join(segment_dir, f"segment_{i}.mp4") for i in range(len(plan["segments"]))]
+        images = segment_images(image_files, len(segment_files))
+        commands = [
+            build_segment_command(
+                plan, i, srt_file, background_video, images[i], segment_files[i], profile, codec
+            )
+            for i in range(len(segment_files))
+        ]
+        results = _run_segments(
+            plan, {i: functools.partial(subprocess.run, command) for i, command in enumerate(commands)}, workers
+        )
+        if any(result.returncode for result in results):
+            print(f"Error occurred during FFmpeg segment render: exit codes {[r.returncode for r in results]}")
+            return None
+
+        segment_list = os.path.join(segment_dir, "segments.txt")
+        _write_segment_list(segment_list, segment_files)
+        subprocess.run(build_concat_command(plan, segment_list, voiceover_files, output, profile), check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error occurred during FFmpeg execution: {e}")
+        return None
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+    return output
+
+def render_reel_incremental(voiceover_files, srt_file, background_video, image_files, output, profile=None, codec=None, workers=None, bg_start=None, build=None):
+
+    # Segment render through the build cache: only segments with a new fingerprint are
+    # encoded, then the reel is re-muxed from cached segments unless that exact reel
+    # was built before. Reuse needs the same background and bg_start as the earlier
+    # render; a voiceover whose length changed moves every later segment's slice of
+    # the background, so those are re-encoded too.
+    profile = dict(profile if isinstance(profile, dict) else get_render_profile(profile))
+    plan = render_plan(voiceover_files, background_video, bg_start)
+    build = build or BuildGraph()
+    subtitles = pysrt.open(srt_file, encoding="utf-8")
+    n = len(plan["segments"])
+    images = segment_images(image_files, n)
+    keys = [
+        segment_fingerprint(plan, i, subtitles, srt_file, background_video, images[i], profile, codec)
+        for i in range(n)
+    ]
+
+    # Size the encoder threads for the segments that actually need encoding
+    stale = [i for i in range(n) if not os.path.exists(build.artifact_path("segments", keys[i], "mp4"))]
+    workers = min(workers or RENDER_SEGMENT_WORKERS, max(len(stale), 1))
+    _split_threads(profile, workers)
+
+    def segment_job(i):
+        def encode(tmp_path):
+            command = build_segment_command(plan, i, srt_file, background_video, images[i], tmp_path, profile, codec)
+            return subprocess.run(command).returncode == 0
+        return functools.partial(build.build, "segments", keys[i], "mp4", encode)
+
+    segment_files = _run_segments(plan, {i: segment_job(i) for i in range(n)}, workers)
+    if not all(segment_files):
+        print(f"Error occurred during FFmpeg segment render: segments {[i for i, f in enumerate(segment_files) if not f]} failed")
+        return None
+
+    concat_args = build_concat_command(plan, "SEGMENTS", ["VOICEOVER"] * len(voiceover_files), "OUTPUT", profile)
+    reel_key = fingerprint("reel", keys, [file_fingerprint(v) for v in voiceover_files], concat_args)
+
+    def mux(tmp_path):
+        with tempfile.TemporaryDirectory(dir=build.directory) as list_dir:
+            segment_list = os.path.join(list_dir, "segments.txt")
+            _write_segment_list(segment_list, segment_files)
+            command = build_concat_command(plan, segment_list, voiceover_files, tmp_path, profile)
+            return subprocess.run(command).returncode == 0
+
+    reel = build.build("reels", reel_key, "mp4", mux)
+    build.report()
+    build.prune()
+    if reel is None:
+        print("Error occurred during FFmpeg execution: reel mux failed")
+        return None
+    return copy_artifact(reel, output)
+
+def variant_fingerprint(reel_key, spec, plan, profile, codec=None):
+    # Everything a variant's pixels depend on besides the reel itself; not its path
+    spec = {key: value for key, value in spec.items() if key != "output"}
+    frame = round(poster_time(spec, plan) * plan["fps"]) if spec["kind"] == "image" else None
+    return fingerprint("variant", reel_key, spec, variant_filter(spec), frame, variant_output_args(spec, profile, codec))
+
+def render_variants(reel, outputs, plan, profile=None, codec=None, build=None):
+
+    # Variants derived from a finished reel; True if every one was written. With a
+    # build graph each variant is cached under the reel's content plus its spec, and
+    # only the missing ones are encoded, still from one decode of the reel.
+    profile = profile if isinstance(profile, dict) else get_render_profile(profile)
+    if build is None:
+        try:
+            subprocess.run(build_variants_command(reel, outputs, plan, profile, codec), check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Error occurred during FFmpeg variant render: {e}")
+            return False
+        return True
+
+    reel_key = file_fingerprint(reel)
+    keys = [variant_fingerprint(reel_key, spec, plan, profile, codec) for spec, _ in outputs]
+    os.makedirs(build.directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=build.directory) as encode_dir:
+        encoded = {
+            k: os.path.join(encode_dir, f"{k}.{spec['extension']}")
+            for k, ((spec, _), key) in enumerate(zip(outputs, keys))
+            if not os.path.exists(build.artifact_path("variants", key, spec["extension"]))
+        }
+        if encoded:
+            stale = [(outputs[k][0], path) for k, path in encoded.items()]
+            try:
+                subprocess.run(build_variants_command(reel, stale, plan, profile, codec), check=True)
+            except subprocess.CalledProcessError as e:
+                print(f"Error occurred during FFmpeg variant render: {e}")
+                return False
+
+        for k, ((spec, path), key) in enumerate(zip(outputs, keys)):
+            # Missing variants were encoded above; build() only moves them into the cache
+            def store(tmp_path, k=k):
+                if k not in encoded:
+                    return False
+                os.replace(encoded[k], tmp_path)
+            artifact = build.build("variants", key, spec["extension"], store)
+            if artifact is None:
+                print(f"Error occurred during FFmpeg variant render: {spec['name']} missing")
+                return False
+            copy_artifact(artifact, path)
+    return True
+
+def render_reel(voiceover_files, srt_file, background_video, image_files, output, profile=None, codec=None, mode=None, bg_start=None, variants=None):
+    # "segments" renders segments in parallel, "incremental" also reuses unchanged
+    # segments, "single" is one ffmpeg process. bg_start defaults to a random point
+    # in the background. variants (names from OUTPUT_VARIANTS or spec dicts, default
+    # RENDER_VARIANTS) are written next to output; see variant_outputs for their paths.
+    mode = mode or RENDER_MODE
+    outputs = variant_outputs(output, RENDER_VARIANTS if variants is None else variants)
+    if mode in ("segments", "incremental"):
+        # Incremental renders keep their variants in the same build cache as the segments
+        build = BuildGraph() if mode == "incremental" else None
+        if build is None:
+            result = render_reel_segments(voiceover_files, srt_file, background_video, image_files, output, profile, codec, bg_start=bg_start)
+        else:
+            result = render_reel_incremental(voiceover_files, srt_file, background_video, image_files, output, profile, codec, bg_start=bg_start, build=build)
+        if result and outputs:
+            plan = render_plan(voiceover_files, background_video, bg_start)
+            if not render_variants(result, outputs, plan, profile, codec, build):
+                return None
+        return result
+
+    command = build_render_command(
+        voiceover_files, srt_file, background_video, image_files, output, profile, codec, bg_start, variants=outputs
+    )
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error occurred during FFmpeg execution: {e}")
+        return None
+    return output
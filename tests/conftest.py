@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_server import FixtureServer
+
+MEDIA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", ".fixture_media")
+
+@pytest.fixture(scope="session")
+def _fixture_server():
+    server = FixtureServer(MEDIA_DIR).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def fixture_server(_fixture_server):
+    # One server for the session, back to the recorded responses for every test
+    _fixture_server.set_newsapi_delay(0)
+    _fixture_server.set_newsapi_response()
+    _fixture_server.set_status_responses()
+    _fixture_server.set_upload_failure()
+    yield _fixture_server
+    _fixture_server.set_newsapi_delay(0)
+    _fixture_server.set_newsapi_response()
+    _fixture_server.set_status_responses()
+    _fixture_server.set_upload_failure()
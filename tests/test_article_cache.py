@@ -0,0 +1,11 @@
+from processors import news_data_processor
+from processors.article_cache import ArticleCache
+
+def test_summaries_are_keyed_by_summarizer(tmp_path):
+    cache = ArticleCache(str(tmp_path / "articles.sqlite3"))
+    hf, int8 = news_data_processor.summarizer_id("hf"), news_data_processor.summarizer_id("int8")
+    cache.put_summary("https://example.com/a", "article text", "fp32 summary", 1.0, hf)
+
+    assert cache.get_summary("https://example.com/a", "article text", hf) == "fp32 summary"
+    assert cache.get_summary("https://example.com/a", "article text", int8) is None
+    assert cache.get_summary("https://example.com/a", "edited text", hf) is None
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from handlers import elevenlabs_api_handler as tts
+
+@pytest.fixture
+def tts_server(fixture_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "ELEVENLABS_API_BASE", fixture_server.base_url)
+    monkeypatch.setattr(tts, "TTS_CACHE_DIR", str(tmp_path / "tts"))
+    monkeypatch.setattr(tts, "TTS_WITH_TIMESTAMPS", False)
+    # A fresh pooled session per test, so connection counts are this test's own
+    monkeypatch.setattr(tts, "_session", None)
+    fixture_server.set_tts_failure()
+    yield fixture_server
+    fixture_server.set_tts_failure()
+
+def _cache_files(tmp_path):
+    directory = tmp_path / "tts"
+    return sorted(os.listdir(directory)) if directory.exists() else []
+
+def test_cached_text_skips_the_request(tts_server, tmp_path):
+    first = tts.generate_voiceover("key", "Chipmakers unveil new laptop processors.", str(tmp_path / "a.mp3"))
+    requests_before = tts_server.tts_requests
+    # Same text up to whitespace and unicode form
+    second = tts.generate_voiceover("key", "Chipmakers  unveil new laptop processors.\n", str(tmp_path / "b.mp3"))
+
+    assert first and second
+    assert tts_server.tts_requests == requests_before
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
+
+def test_different_voice_is_a_cache_miss(tts_server, tmp_path):
+    tts.generate_voiceover("key", "Same words.", str(tmp_path / "a.mp3"))
+    requests_before = tts_server.tts_requests
+    tts.generate_voiceover("key", "Same words.", str(tmp_path / "b.mp3"), voice_id="other-voice")
+    assert tts_server.tts_requests == requests_before + 1
+
+def test_requests_reuse_one_pooled_connection(tts_server, tmp_path):
+    texts = [f"Story number {i} in today's reel." for i in range(4)]
+    filenames = [str(tmp_path / f"voiceover_{i}.mp3") for i in range(4)]
+    requests_before, connections_before = tts_server.tts_requests, tts_server.tts_connections
+    results = tts.generate_voiceovers("key", texts, filenames, max_workers=1)
+
+    assert results == filenames
+    assert tts_server.tts_requests == requests_before + 4
+    assert len(tts_server.tts_connections - connections_before) == 1
+
+@pytest.mark.parametrize("failure", ["error", "truncate"])
+def test_failed_synthesis_leaves_no_partial_mp3(tts_server, tmp_path, failure):
+    tts_server.set_tts_failure(failure)
+    text = "This story never gets voiced."
+    output = tmp_path / "voiceover.mp3"
+    cached_path = tts._cached_voiceover_path(text, tts.ELEVENLABS_VOICE_ID, tts.ELEVENLABS_MODEL_ID)
+
+    assert tts._synthesize_to_cache(
+        "key", text, cached_path, tts.ELEVENLABS_VOICE_ID, tts.ELEVENLABS_MODEL_ID
+    ) is False
+    assert tts.generate_voiceover("key", text, str(output)) is None
+    assert not output.exists()
+    assert not os.path.exists(cached_path)
+    assert not [name for name in _cache_files(tmp_path) if name.endswith(".part")]
+
+    # The next attempt synthesizes again instead of serving anything half-written
+    tts_server.set_tts_failure()
+    assert tts.generate_voiceover("key", text, str(output)) == str(output)
+    assert output.stat().st_size > 0
+
+@pytest.mark.parametrize("failure", ["not_json", "no_audio"])
+def test_malformed_timestamped_response_fails_only_that_voiceover(tts_server, tmp_path, monkeypatch, failure):
+    monkeypatch.setattr(tts, "TTS_WITH_TIMESTAMPS", True)
+    tts_server.set_tts_failure(failure)
+    filenames = [str(tmp_path / f"voiceover_{i}.mp3") for i in range(2)]
+
+    # Returned as failures rather than raised out of the worker pool
+    assert tts.generate_voiceovers("key", ["First story.", "Second story."], filenames) == [None, None]
+    assert not [name for name in _cache_files(tmp_path) if name.endswith((".mp3", ".part"))]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import main
+
+def _manifest(workdir):
+    item = {"idx": 0, "url": "https://example.com/a", "title": "A", "summary": "A.", "voiceover_file": str(workdir / "voiceover_0.mp3")}
+    manifest = {"job": {}, "items": [item], "srt_file": str(workdir / "final_subtitles.srt"), "output": str(workdir / "final_reel.mp4")}
+    (workdir / "final_reel.mp4").write_bytes(b"reel from an earlier run")
+    main.save_manifest(str(workdir), manifest)
+
+def test_failed_render_is_not_published(tmp_path, monkeypatch):
+    _manifest(tmp_path)
+    monkeypatch.setattr(main, "pick_reel_background", lambda job, assets: ("/nonexistent.mp4", 0))
+    monkeypatch.setattr(main, "create_video_with_ffmpeg", lambda *args, **kwargs: None)
+    job = {**main.DEFAULT_REEL_JOB, "workdir": str(tmp_path)}
+
+    with pytest.raises(SystemExit, match="Render of .* failed"):
+        main.render_command(job)
+    with open(main.manifest_path(str(tmp_path)), encoding="utf-8") as f:
+        assert "output" not in json.load(f)
+    with pytest.raises(SystemExit, match="Nothing rendered yet"):
+        main.publish_command(job)
+
+def test_failed_render_skips_publish_and_removes_the_old_reel(tmp_path, monkeypatch):
+    _manifest(tmp_path)
+    (tmp_path / "final_reel.poster.jpg").write_bytes(b"poster from an earlier run")
+    published = []
+    monkeypatch.setattr(main, "pick_reel_background", lambda job, assets: ("/nonexistent.mp4", 0))
+    monkeypatch.setattr(main, "create_video_with_ffmpeg", lambda *args, **kwargs: None)
+    monkeypatch.setattr(main, "publish_reel_output", lambda *args, **kwargs: published.append(args))
+    job = {**main.DEFAULT_REEL_JOB, "workdir": str(tmp_path), "variants": ["poster"], "publish": True}
+    manifest = main.load_manifest(str(tmp_path))
+    assets = main.reel_assets(job, manifest["items"], manifest["srt_file"])
+
+    # Raised, so a batch job's future fails and its file goes to failed/
+    with pytest.raises(RuntimeError):
+        main.render_and_publish_reel(assets)
+    assert published == []
+    assert not (tmp_path / "final_reel.mp4").exists()
+    assert not (tmp_path / "final_reel.poster.jpg").exists()
+
+def test_cached_summaries_are_counted_once_and_skip_the_model(tmp_path, monkeypatch):
+    from processors import news_data_processor
+    from processors.article_cache import ArticleCache
+
+    cache = ArticleCache(str(tmp_path / "articles.sqlite3"))
+    items = [
+        {"idx": i, "url": f"https://example.com/{i}", "title": str(i), "content": f"article {i}", "summary": None}
+        for i in range(2)
+    ]
+    for item in items:
+        cache.put_summary(item["url"], item["content"], f"summary {item['idx']}", 1.0, news_data_processor.summarizer_id())
+    main.save_manifest(str(tmp_path), {"job": {}, "items": items})
+    monkeypatch.setattr(main, "open_article_cache", lambda: cache)
+    monkeypatch.setattr(news_data_processor, "load_summarizer", lambda *args: pytest.fail("summarizer loaded"))
+
+    main.summarize_command({**main.DEFAULT_REEL_JOB, "workdir": str(tmp_path)})
+
+    assert [item["summary"] for item in main.load_manifest(str(tmp_path))["items"]] == ["summary 0", "summary 1"]
+    assert cache.stats()["summary"] == {"hits": 2, "misses": 0, "saved_seconds": 2.0}
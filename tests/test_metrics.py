@@ -0,0 +1,42 @@
+import json
+
+from processors import metrics
+from processors.metrics import MetricsRecorder
+
+def _run_job(recorder, name):
+    with recorder.span("fetch", article=name):
+        recorder.add_bytes(100)
+    with recorder.span("render", article=name):
+        recorder.cache_event("build_segments", True)
+
+def test_jsonl_export_flushes_records_but_keeps_totals(tmp_path):
+    recorder = MetricsRecorder(run_id="test")
+    path = str(tmp_path / "metrics.jsonl")
+    for job in ("a", "b", "c"):
+        _run_job(recorder, job)
+        # batch --watch exports after every job
+        recorder.export(path, "jsonl")
+
+    assert recorder.records == []
+    summary = recorder.summary()
+    assert summary["fetch"]["spans"] == 3
+    assert summary["fetch"]["bytes_in"] == 300
+    assert summary["render"]["cache"]["build_segments"] == {"hits": 3, "misses": 0}
+    with open(path, encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 6
+
+def test_prometheus_export_keeps_the_buffer_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_MAX_RECORDS", 5)
+    recorder = MetricsRecorder(run_id="test")
+    path = str(tmp_path / "metrics.prom")
+    for i in range(10):
+        _run_job(recorder, str(i))
+    assert len(recorder.records) == 5
+    assert recorder.dropped_records == 15
+
+    recorder.export(path, "prometheus")
+    assert recorder.records == []
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert 'reel_stage_spans_total{stage="fetch"} 10' in text
+    assert recorder.summary()["render"]["spans"] == 10
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from handlers import news_api_client
+from handlers.news_api_client import NewsApiClient, merge_articles, news_queries
+
+QUERIES = [{"category": "technology"}, {"category": "science"}, {"category": "business"}, {"query": "open source"}]
+
+@pytest.fixture
+def make_client(fixture_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(news_api_client, "NEWS_API_BASE", fixture_server.base_url)
+    clients = []
+
+    def make(api_key="fixture-key", **kwargs):
+        client = NewsApiClient(api_key, path=str(tmp_path / "newsapi.sqlite3"), **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+def test_concurrent_queries_merge_and_rank(fixture_server, make_client):
+    fixture_server.set_newsapi_delay(0.3)
+    client = make_client()
+    started = time.perf_counter()
+    articles = client.search(news_queries(queries=QUERIES), workers=len(QUERIES))
+    elapsed = time.perf_counter() - started
+
+    assert fixture_server.newsapi_requests >= len(QUERIES)
+    assert client.counts["requests"] == len(QUERIES)
+    # One at a time would take at least 4 x 0.3 s
+    assert elapsed < 0.3 * len(QUERIES) * 0.75
+    urls = [a["url"] for a in articles]
+    assert len(urls) == len(set(urls))
+    assert all(a["title"] != "[Removed]" for a in articles)
+    published = [a["publishedAt"] for a in articles]
+    assert published == sorted(published, reverse=True)
+
+def test_merge_ranks_more_query_hits_first_within_an_hour():
+    older = {"url": "a", "title": "A", "publishedAt": "2025-01-10T09:05:00Z"}
+    newer = {"url": "b", "title": "B", "publishedAt": "2025-01-10T09:50:00Z"}
+    previous_hour = {"url": "c", "title": "C", "publishedAt": "2025-01-10T08:59:00Z"}
+    merged = merge_articles([[older, newer, previous_hour], [older, previous_hour]])
+    assert [a["url"] for a in merged] == ["a", "b", "c"]
+
+def test_fresh_listing_costs_no_request(fixture_server, make_client):
+    client = make_client()
+    first = client.search(news_queries(queries=QUERIES))
+    requests_before = fixture_server.newsapi_requests
+    second = client.search(news_queries(queries=QUERIES))
+
+    assert fixture_server.newsapi_requests == requests_before
+    assert client.counts["fresh"] == len(QUERIES)
+    assert second == first
+
+def test_token_bucket_refuses_past_capacity(fixture_server, make_client):
+    client = make_client(daily_quota=2, burst=2)
+    requests_before = fixture_server.newsapi_requests
+    client.search(news_queries(queries=QUERIES))
+
+    assert fixture_server.newsapi_requests - requests_before == 2
+    assert client.counts["requests"] == 2
+    assert client.counts["throttled"] == 2
+    assert client.remaining() < 1
+
+def test_rate_limited_response_drains_the_bucket(fixture_server, make_client):
+    client = make_client(daily_quota=100, burst=10)
+    fixture_server.set_newsapi_response(429, {"status": "error", "code": "rateLimited"})
+
+    assert client.get(*news_queries()[0]) is None
+    assert client.remaining() < 1
+    requests_before = fixture_server.newsapi_requests
+    assert client.get(*news_queries(query="open source")[0]) is None
+    assert fixture_server.newsapi_requests == requests_before
+    assert client.counts["throttled"] == 1
+
+def test_stale_listing_served_when_newsapi_fails(fixture_server, make_client):
+    client = make_client(freshness=0)
+    query = news_queries()[0]
+    listing = client.get(*query)
+    assert listing
+
+    fixture_server.set_newsapi_response(500, {"status": "error", "code": "unexpectedError"})
+    assert client.get(*query) == listing
+    assert client.counts["stale"] == 1
+
+def test_stale_listing_served_for_non_json_body(fixture_server, make_client):
+    client = make_client(freshness=0)
+    query = news_queries()[0]
+    listing = client.get(*query)
+
+    fixture_server.set_newsapi_response(200, b"<html>proxy error</html>", "text/html")
+    assert client.get(*query) == listing
+    assert client.counts["failed"] == 1
+
+def test_non_json_body_without_cache_returns_none(fixture_server, make_client):
+    fixture_server.set_newsapi_response(200, b"<html>proxy error</html>", "text/html")
+    assert make_client().get(*news_queries()[0]) is None
+
+def test_missing_key_is_rejected(fixture_server, make_client):
+    # The key only travels in X-Api-Key; without it the server answers 401
+    client = make_client(api_key=None)
+    assert client.get(*news_queries()[0]) is None
+    assert client.counts["failed"] == 1
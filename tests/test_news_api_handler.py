@@ -0,0 +1,43 @@
+import pytest
+
+from handlers import news_api_client
+from handlers.news_api_client import NewsApiClient
+from handlers.news_api_handler import fetch_tech_news
+
+CHIPS = {
+    "title": "Chipmaker unveils 2nm laptop processor with on-die AI accelerator",
+    "description": "The new processor pairs efficiency cores with a neural engine rated at 60 TOPS.",
+    "content": "The new processor pairs efficiency cores with a neural engine rated at 60 TOPS...",
+}
+
+@pytest.fixture
+def client(fixture_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(news_api_client, "NEWS_API_BASE", fixture_server.base_url)
+    client = NewsApiClient("fixture-key", path=str(tmp_path / "newsapi.sqlite3"))
+    yield client
+    client.close()
+
+def _listing(fixture_server, *copies):
+    # Syndicated copies of one story: same title and description, different URLs
+    articles = [
+        {**CHIPS, "url": f"{fixture_server.base_url}{path}", "urlToImage": f"{fixture_server.base_url}/images/chips.jpg",
+         "publishedAt": published_at}
+        for path, published_at in copies
+    ]
+    fixture_server.set_newsapi_response(200, {"status": "ok", "articles": articles})
+
+def test_copy_is_used_when_the_first_url_fails(fixture_server, client):
+    _listing(fixture_server,
+             ("/articles/chips-wire.html", "2025-01-14T17:00:00Z"),
+             ("/articles/chips.html", "2025-01-14T16:05:00Z"))
+    articles = fetch_tech_news("fixture-key", article_count=1, client=client)
+
+    assert [a["url"] for a in articles] == [f"{fixture_server.base_url}/articles/chips.html"]
+
+def test_copies_of_a_selected_story_are_skipped(fixture_server, client):
+    _listing(fixture_server,
+             ("/articles/chips.html?via=wire", "2025-01-14T17:00:00Z"),
+             ("/articles/chips.html", "2025-01-14T16:05:00Z"))
+    articles = fetch_tech_news("fixture-key", article_count=2, client=client)
+
+    assert [a["url"] for a in articles] == [f"{fixture_server.base_url}/articles/chips.html?via=wire"]
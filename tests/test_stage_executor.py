@@ -0,0 +1,33 @@
+from processors.stage_executor import Stage, StagePipeline
+
+def test_batch_failure_only_fails_the_bad_item():
+    calls = []
+
+    def summarize(texts):
+        calls.append(list(texts))
+        if "bad" in texts:
+            raise ValueError("cannot summarize")
+        return [text.upper() for text in texts]
+
+    stage = Stage("summarize", summarize, batch_size=4, queue_size=8)
+    pipeline = StagePipeline([stage])
+    # Queued before the worker starts, so all four arrive as one batch
+    for entry in enumerate(["a", "bad", "c", "d"]):
+        stage.input.put(entry)
+    pipeline.run([])
+
+    assert calls[0] == ["a", "bad", "c", "d"]
+    assert calls[1:] == [["a"], ["bad"], ["c"], ["d"]]
+    assert pipeline.results == {0: "A", 2: "C", 3: "D"}
+    assert list(pipeline.errors) == [1]
+    assert pipeline.errors[1][0] == "summarize"
+
+def test_failed_item_is_not_passed_downstream():
+    def parse(item):
+        if item == 2:
+            raise ValueError("no content")
+        return item
+
+    pipeline = StagePipeline([Stage("parse", parse, workers=2), Stage("double", lambda item: item * 2)])
+    assert pipeline.run(range(4)) == [0, 2, 6]
+    assert list(pipeline.errors) == [2]
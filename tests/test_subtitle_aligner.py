@@ -0,0 +1,9 @@
+from processors import subtitle_aligner
+
+def test_window_word_count_plans_by_speaking_rate():
+    words = ["one", "two", "three", "four"]
+    # 0.1 s per character, each word counted with its trailing space
+    assert subtitle_aligner.window_word_count(words, 0.1, 1.0) == 2
+    assert subtitle_aligner.window_word_count(words, 0.1, 100.0) == 4
+    # A window always takes at least one word
+    assert subtitle_aligner.window_word_count(words, 10.0, 1.0) == 1
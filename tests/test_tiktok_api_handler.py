@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from handlers import tiktok_api_handler as tiktok
+from handlers import tiktok_status_watcher
+
+CHUNK = tiktok.MIN_CHUNK_SIZE
+
+@pytest.fixture
+def tiktok_server(fixture_server, monkeypatch):
+    monkeypatch.setattr(tiktok, "TIKTOK_API_BASE", fixture_server.base_url)
+    monkeypatch.setattr(tiktok_status_watcher, "TIKTOK_API_BASE", fixture_server.base_url)
+    # Fail straight away instead of backing off, so the upload is left part-done
+    monkeypatch.setattr(tiktok, "UPLOAD_RETRIES", 0)
+    return fixture_server
+
+def _video(tmp_path, chunks=3, fill=b"\0"):
+    path = tmp_path / "final_reel.mp4"
+    path.write_bytes(fill * (CHUNK * chunks))
+    return str(path)
+
+def _sent(server, before):
+    return server.upload_ranges[len(before):]
+
+def test_interrupted_upload_resumes_with_the_remaining_chunks(tiktok_server, tmp_path):
+    video = _video(tmp_path)
+    tiktok_server.set_upload_failure(after=1)
+    before = tiktok_server.upload_ranges
+    result = tiktok.post_video_to_tiktok("token", video, chunk_size=CHUNK)
+
+    assert result.startswith("Upload failed")
+    first_try = _sent(tiktok_server, before)
+    assert [(first, last) for _, first, last in first_try] == [(0, CHUNK - 1)]
+    assert os.path.exists(tiktok._state_path(video))
+
+    before = tiktok_server.upload_ranges
+    result = tiktok.post_video_to_tiktok("token", video, chunk_size=CHUNK)
+
+    assert result.startswith("Successfully")
+    second_try = _sent(tiktok_server, before)
+    # Same publish_id, and only the chunks the first attempt did not get through
+    assert {publish_id for publish_id, _, _ in second_try} == {first_try[0][0]}
+    assert [(first, last) for _, first, last in second_try] == [(CHUNK, 2 * CHUNK - 1), (2 * CHUNK, 3 * CHUNK - 1)]
+    assert not os.path.exists(tiktok._state_path(video))
+
+def test_changed_video_starts_a_new_upload(tiktok_server, tmp_path):
+    video = _video(tmp_path)
+    tiktok_server.set_upload_failure(after=1)
+    before = tiktok_server.upload_ranges
+    tiktok.post_video_to_tiktok("token", video, chunk_size=CHUNK)
+    first_id = _sent(tiktok_server, before)[0][0]
+
+    # Re-rendered in between: the saved upload no longer matches the file
+    video = _video(tmp_path, chunks=2, fill=b"\1")
+    before = tiktok_server.upload_ranges
+    result = tiktok.post_video_to_tiktok("token", video, chunk_size=CHUNK)
+
+    assert result.startswith("Successfully")
+    second_try = _sent(tiktok_server, before)
+    assert {publish_id for publish_id, _, _ in second_try} != {first_id}
+    assert [(first, last) for _, first, last in second_try] == [(0, CHUNK - 1), (CHUNK, 2 * CHUNK - 1)]
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from handlers import tiktok_status_watcher as watcher_module
+from handlers.tiktok_status_watcher import PublishStatusWatcher
+
+@pytest.fixture
+def watcher(fixture_server, monkeypatch):
+    monkeypatch.setattr(watcher_module, "TIKTOK_API_BASE", fixture_server.base_url)
+    watcher = PublishStatusWatcher(initial_delay=0.01, max_delay=0.02, timeout=5)
+    yield watcher
+    watcher.close()
+
+def _watch(watcher, timestamps=None):
+    return asyncio.run(watcher.watch("token", "fixture_1", timestamps))
+
+def test_publish_complete_reports_live_latency(watcher, fixture_server):
+    result = _watch(watcher, {"init": 0.0})
+    assert result["status"] == "PUBLISH_COMPLETE"
+    assert "published_to_live_s" in result["metrics"]
+
+@pytest.mark.parametrize("status", [401, 400])
+def test_client_errors_are_terminal(watcher, fixture_server, status):
+    fixture_server.set_status_responses([(status, {"error": {"code": "access_token_invalid"}})])
+    before = fixture_server.status_requests
+    result = _watch(watcher)
+
+    assert result["status"] == "FAILED"
+    assert result["polls"] == 1
+    assert fixture_server.status_requests - before == 1
+    assert str(status) in result["fail_reason"]
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_server_errors_and_rate_limits_are_retried(watcher, fixture_server, status):
+    fixture_server.set_status_responses([(status, {"error": {"code": "busy"}})] * 2)
+    result = _watch(watcher)
+    assert result["status"] == "PUBLISH_COMPLETE"
+    assert result["polls"] == 3
+
+def test_failed_post_has_no_live_latency(watcher, fixture_server):
+    fixture_server.set_status_responses([(200, {"data": {"status": "FAILED", "fail_reason": "spam_risk"}})])
+    result = _watch(watcher, {"init": 0.0})
+    assert result["status"] == "FAILED"
+    assert result["fail_reason"] == "spam_risk"
+    assert not any(name.endswith("_to_live_s") for name in result["metrics"])
+
+def test_submitted_watch_reports_final_status(watcher, fixture_server):
+    fixture_server.set_status_responses([(503, {}), (200, {"data": {"status": "FAILED", "fail_reason": "spam_risk"}})])
+    seen = []
+    watcher.submit("token", "fixture_1", on_status=seen.append).result()
+    # A callback that raises still leaves the status for wait_all
+    watcher.submit("token", "fixture_2", on_status=lambda status: 1 / 0)
+    statuses = watcher.wait_all()
+
+    assert [s["status"] for s in seen] == ["FAILED"]
+    assert sorted(s["publish_id"] for s in statuses) == ["fixture_1", "fixture_2"]
@@ -0,0 +1,41 @@
+import pytest
+
+from processors import subtitle_aligner, transcript_cache
+
+SEGMENTS = [{"words": [{"word": "Hello", "start": 0.0, "end": 0.4}, {"word": "world.", "start": 0.5, "end": 0.9}]}]
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_DIR", str(tmp_path / "transcripts"))
+
+def test_transcript_is_keyed_by_mode_and_model():
+    transcript_cache.save_transcript("abc", SEGMENTS, source="whisper", model="base", mode="whisper")
+
+    assert transcript_cache.load_transcript("abc", "whisper", "base")["segments"] == SEGMENTS
+    assert transcript_cache.load_transcript("abc", "whisper", "small") is None
+    assert transcript_cache.load_transcript("abc", "align", "base") is None
+    assert transcript_cache.load_transcript("def", "whisper", "base") is None
+
+def _alignment(text):
+    # One character every 0.1 s
+    return {
+        "characters": list(text),
+        "character_start_times_seconds": [i * 0.1 for i in range(len(text))],
+        "character_end_times_seconds": [i * 0.1 + 0.1 for i in range(len(text))],
+    }
+
+def test_aligned_words_are_cached_per_model(tmp_path, monkeypatch):
+    audio = tmp_path / "voice.mp3"
+    audio.write_bytes(b"not really audio")
+    calls = []
+    words_from_elevenlabs = subtitle_aligner.words_from_elevenlabs
+    monkeypatch.setattr(subtitle_aligner, "words_from_elevenlabs", lambda *a: calls.append(a) or words_from_elevenlabs(*a))
+
+    script = "Hello world."
+    first = subtitle_aligner.align_words(str(audio), script, _alignment(script), model_name="base")
+    again = subtitle_aligner.align_words(str(audio), script, _alignment(script), model_name="base")
+    assert first == again
+    assert len(calls) == 1
+
+    subtitle_aligner.align_words(str(audio), script, _alignment(script), model_name="small")
+    assert len(calls) == 2
@@ -0,0 +1,68 @@
+import os
+import subprocess
+
+import pytest
+
+from processors import video_renderer
+from processors.build_graph import BuildGraph
+
+PLAN = {"segments": [(0.0, 1.0)], "total_length": 1.0, "fps": 30}
+
+@pytest.fixture(scope="module")
+def reel(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("reel") / "final_reel.mp4")
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", "testsrc2=size=1080x1920:rate=30:duration=1",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path
+    ], check=True)
+    return path
+
+def _outputs(directory):
+    return video_renderer.variant_outputs(os.path.join(directory, "reel.mp4"), ["preview", "poster"])
+
+def test_variants_are_reused_from_the_build_cache(reel, tmp_path):
+    build = BuildGraph(str(tmp_path / "build"))
+    first = _outputs(str(tmp_path / "first"))
+    assert video_renderer.render_variants(reel, first, PLAN, "draft", build=build)
+    assert build.counts["variants"] == {"reused": 0, "built": 2}
+
+    second = _outputs(str(tmp_path / "second"))
+    assert video_renderer.render_variants(reel, second, PLAN, "draft", build=build)
+    assert build.counts["variants"] == {"reused": 2, "built": 2}
+    for (_, a), (_, b) in zip(first, second):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            assert fa.read() == fb.read()
+
+    # Another spec of the same reel is a new artifact
+    thumbnail = video_renderer.variant_outputs(str(tmp_path / "reel.mp4"), ["thumbnail"])
+    assert video_renderer.render_variants(reel, thumbnail, PLAN, "draft", build=build)
+    assert build.counts["variants"] == {"reused": 2, "built": 3}
+
+def test_failed_variant_render_is_reported(tmp_path):
+    broken = tmp_path / "broken.mp4"
+    broken.write_bytes(b"not a video")
+    outputs = _outputs(str(tmp_path))
+    build = BuildGraph(str(tmp_path / "build"))
+
+    assert video_renderer.render_variants(str(broken), outputs, PLAN, "draft", build=build) is False
+    assert not any(os.path.exists(path) for _, path in outputs)
+    assert not os.path.exists(os.path.join(build.directory, "variants"))
+
+def test_images_stay_on_their_own_segment(reel):
+    # Three segments, the middle article without an image
+    plan = {
+        "segments": [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)], "total_length": 3.0, "fps": 30, "bg_start": 0,
+        "background_info": video_renderer.media_info.probe(reel),
+    }
+    command = video_renderer.build_render_command(
+        [reel] * 3, "subs.srt", reel, ["first.jpg", None, "third.jpg"], "out.mp4", "draft", plan=plan
+    )
+    inputs = [command[k + 1] for k, arg in enumerate(command) if arg == "-i"]
+    assert inputs[6:] == ["first.jpg", "third.jpg"]
+    graph = command[command.index("-filter_complex") + 1]
+    width = video_renderer.IMAGE_WIDTH
+    assert f"[6:v]scale={width}:-1[img0]" in graph
+    assert f"[7:v]scale={width}:-1[img2]" in graph
+    assert "[img1]" not in graph
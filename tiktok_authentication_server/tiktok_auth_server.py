@@ -1,10 +1,17 @@
-import os, secrets
+import os, secrets, sys
 from flask import Flask, redirect, request, jsonify, session
 import requests
 from dotenv import load_dotenv
 
-app = Flask(__name__)
+# .env first: the token store reads TIKTOK_TOKEN_FILE / CACHE_DIR when imported
 load_dotenv()
+
+# Share the token store with the reel pipeline; run from the repo root so both
+# resolve the same TIKTOK_TOKEN_FILE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from handlers.tiktok_token_store import TOKEN_URL, save_token, token_record, TIKTOK_TOKEN_FILE
+
+app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)  # Required to securely store session data
 
 # Configuration: Replace these with your actual TikTok app credentials
@@ -15,7 +22,6 @@ REDIRECT_URI = os.getenv("TIKTOK_REDIRECT_URI")
 
 # TikTok OAuth2 endpoints (subject to change, check TikTok docs for updates)
 AUTHORIZATION_BASE_URL = "https://www.tiktok.com/v2/auth/authorize/"
-TOKEN_URL = "https://open.tiktokapis.com/v2/oauth/token/"
 
 @app.route("/")
 def index():
@@ -71,6 +77,11 @@ def auth():
         return f"Failed to retrieve token: {token_response.text}", 400
 
     token_info = token_response.json()
+    # Persist the tokens so main.py / batch.py can use and refresh them
+    record = token_record(token_info)
+    save_token(record)
+    print(f"Saved TikTok tokens to {TIKTOK_TOKEN_FILE}")
+
     # Optionally, you can also inspect token_info.get("scopes") if needed
     return jsonify({
         "open_id": token_info.get("open_id"),
@@ -80,6 +91,7 @@ def auth():
         "refresh_expires_in": token_info.get("refresh_expires_in"),
         "scope": token_info.get("scope"),
         "token_type": token_info.get("token_type"),
+        "saved_to": TIKTOK_TOKEN_FILE,
     })
 
 if __name__ == "__main__":